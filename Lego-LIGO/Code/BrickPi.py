@@ -39,6 +39,9 @@
 # If a function returns 0, it completed successfully. If it returns -1, there was an error (most likely a communications error).
 
 # Function BrickPiRx() (background function that receives UART messages from the BrickPi) can return 0 (success), -1 (undefined error that shouldn't have happened, e.g. a filesystem error), -2 (timeout: the RPi didn't receive any UART communication from the BrickPi within the specified time), -4 (the message was too short to even contain a valid header), -5 (communication checksum error), or -6 (the number of bytes received was less than specified by the length byte).
+# Checksum errors are now recovered from by resynchronising on the next valid message (see BrickPiReceiver), so -5 is
+# only counted. BrickPi.RxErrors counts each of -2, -4, -5 and -6, and BrickPi.RxStale the replies thrown away for
+# not matching the message sent.
 
 #For the code to work - sudo pip install -U future
 
@@ -74,6 +77,15 @@ ser.baudrate = 500000
 
 # DEBUG = 1  # Remove to hide errors
 
+# BrickPiUpdateValues only talks to the cores (core 0 has PORT_A/PORT_B and PORT_1/PORT_2, core 1 the
+# others) with a motor enabled, an encoder offset to send or a sensor set up by BrickPiSetupSensors (see
+# SensorsSetUp). False updates both every time.
+SKIP_IDLE_CORES = True
+# When both cores are updated, send both messages and then read both replies, rather than waiting for
+# each reply in turn. Off by default: the cores share the UART, so their replies can run into each
+# other, and as replies carry no address a lost reply from core 0 would be taken as core 1's.
+PIPELINE_CORES = False
+
 # The I2C speed (see below) for the ultrasound is hard
 # coded to 7 in the firmware of the BrickPi. Unfortunately
 # this speed is not very robust and sometimes causes the
@@ -208,7 +220,18 @@ INDEX_GREEN = 1
 INDEX_BLUE  = 2
 INDEX_BLANK = 3
 
-Array = [0] * 256
+# Frames are assembled in place in TxBuffer and received into RxBuffer, both made once, so sending
+# and receiving allocate no buffers
+TxBuffer = bytearray(3 + 256) # destination, checksum, byte count, then the message
+TxView = memoryview(TxBuffer)
+RxBuffer = bytearray(4 * (2 + 256)) # received bytes, room for a few replies (checksum, byte count, then the message)
+RxView = memoryview(RxBuffer)
+EmptyArray = bytearray(256) # copied over Array to clear it
+NoBytes = bytearray() # the InArray of a failed BrickPiRx
+if p_version==2:
+    Array = bytearray(256) # Python 2's memoryview gives 1 character strings, so the message is copied into TxBuffer
+else:
+    Array = TxView[3:] # the message part of TxBuffer
 BytesReceived = None
 Bit_Offset    = 0
 Retried = 0
@@ -224,7 +247,7 @@ class BrickPiStruct:
 
     Sensor         = [None] * 4
     SensorArray    = [ [None] * 4 for i in range(4) ]
-    SensorType     = [0] * 4
+    SensorType     = [None] * 4 # None for no sensor, which is set up as TYPE_SENSOR_RAW
     SensorSettings = [ [None] * 8 for i in range(4) ]
 
     SensorI2CDevices = [None] * 4
@@ -235,6 +258,9 @@ class BrickPiStruct:
     SensorI2COut     = [ [ [None] * 16 for i in range(8) ] for i in range(4) ]
     SensorI2CIn      = [ [ [None] * 16 for i in range(8) ] for i in range(4) ]
     Timeout = 0
+
+    RxErrors = {-2: 0, -4: 0, -5: 0, -6: 0} # times BrickPiRx has had each error
+    RxStale = 0 # replies thrown away for not being to the message sent, e.g. ones that came after a retry
 BrickPi = BrickPiStruct()
 
 #PSP Mindsensors class
@@ -306,11 +332,10 @@ def BrickPiChangeAddress(OldAddr, NewAddr):
     Array[BYTE_MSG_TYPE] = MSG_TYPE_CHANGE_ADDR;
     Array[BYTE_NEW_ADDRESS] = NewAddr;
     BrickPiTx(OldAddr, 2, Array)
-    res, BytesReceived, InArray = BrickPiRx(0.005000)
+    res, BytesReceived, InArray = BrickPiRx(0.005000, MSG_TYPE_CHANGE_ADDR)
     if res :
         return -1
-    for i in range(len(InArray)):
-        Array[i] = InArray[i]
+    Array[:len(InArray)] = InArray
     if not (BytesReceived == 1 and Array[BYTE_MSG_TYPE] == MSG_TYPE_CHANGE_ADDR):
         return -1
     return 0
@@ -323,11 +348,10 @@ def BrickPiSetTimeout():
         Array[BYTE_TIMEOUT + 2] = (BrickPi.Timeout // 65536   ) & 0xFF
         Array[BYTE_TIMEOUT + 3] = (BrickPi.Timeout // 16777216) & 0xFF
         BrickPiTx(BrickPi.Address[i], 5, Array)
-        res, BytesReceived, InArray = BrickPiRx(0.002500)
+        res, BytesReceived, InArray = BrickPiRx(0.002500, MSG_TYPE_TIMEOUT_SETTINGS)
         if res :
             return -1
-        for j in range(len(InArray)):
-            Array[j] = InArray[j]
+        Array[:len(InArray)] = InArray
         if not (BytesReceived == 1 and Array[BYTE_MSG_TYPE] == MSG_TYPE_TIMEOUT_SETTINGS):
             return -1
     return 0
@@ -403,19 +427,15 @@ def motorRotateDegree(power,deg,port,sampling_time=.1,delay_when_stopping=.05):
     return 0
 
 def GetBits( byte_offset, bit_offset, bits):
+    # Reads the bits the field covers as whole bytes, then shifts and masks, rather than a bit at a time
     global Bit_Offset
+    position = byte_offset*8 + bit_offset + Bit_Offset
+    first = position // 8
     result = 0
-    i = bits
-    while i:
-        result *= 2
-
-        if p_version==2:
-            result |= ((Array[(byte_offset + ((bit_offset + Bit_Offset + (i-1)) // 8))] >> ((bit_offset + Bit_Offset + (i-1)) % 8)) & 0x01)
-        else:
-            result |= ((Array[int((byte_offset + ((bit_offset + Bit_Offset + (i-1)) // 8)))] >> ((bit_offset + Bit_Offset + (i-1)) % 8)) & 0x01)
-        i -= 1
+    for byte in reversed(Array[first:(position + bits + 7) // 8]):
+        result = (result << 8) | byte
     Bit_Offset += bits
-    return result
+    return (result >> (position % 8)) & ((1 << bits) - 1)
 
 
 def BitsNeeded(value):
@@ -427,19 +447,164 @@ def BitsNeeded(value):
 
 
 def AddBits(byte_offset, bit_offset, bits, value):
+    # ORs the field into the bytes it covers a whole byte at a time, rather than a bit at a time
     global Bit_Offset
-    for i in range(bits):
+    position = byte_offset*8 + bit_offset + Bit_Offset
+    value = (int(value) & ((1 << bits) - 1)) << (position % 8)
+    index = position // 8
+    while value:
+        Array[index] |= value & 0xFF
+        value >>= 8
+        index += 1
+    Bit_Offset += bits
+
+
+class BitPacker:
+    # Packs the fields of a frame into one Python int, least significant bit first as AddBits does,
+    # then writes out the whole bytes at once. Used by BrickPiUpdateValues.
+    def __init__(self):
+        self.value = 0
+        self.bits = 0
+
+    def add(self, bits, value):
+        self.value |= (int(value) & ((1 << bits) - 1)) << self.bits
+        self.bits += bits
+
+    def write(self, OutArray, byte_offset):
+        # ORs the packed bytes into OutArray from byte_offset and returns how many there are
+        count = (self.bits + 7) // 8
+        value = self.value
+        for i in range(count):
+            OutArray[byte_offset + i] |= value & 0xFF
+            value >>= 8
+        return count
+
+
+class BitReader:
+    # Reads fields packed as GetBits does from InArray[byte_offset:end]. The bytes are joined into one
+    # Python int once, then each field is a shift and a mask.
+    def __init__(self, InArray, byte_offset, end):
         if p_version==2:
-            if(int(value) & 0x01):
-                Array[(byte_offset + ((bit_offset + Bit_Offset + i)//8))] |= (0x01 << ((bit_offset + Bit_Offset + i) % 8));
+            self.value = 0
+            for byte in reversed(InArray[byte_offset:end]):
+                self.value = (self.value << 8) | byte
         else:
-            if(int(value) & 0x01):
-                # Python3 Change: Cast to integer type right after "Array["
-                Array[int((byte_offset + ((bit_offset + Bit_Offset + i)//8)))] |= (0x01 << ((bit_offset + Bit_Offset + i) % 8));
+            self.value = int.from_bytes(bytes(InArray[byte_offset:end]), 'little')
+        self.offset = 0
+
+    def get(self, bits):
+        result = (self.value >> self.offset) & ((1 << bits) - 1)
+        self.offset += bits
+        return result
+
+
+def GetBitsPerBit(byte_offset, bit_offset, bits):
+    # The original GetBits, one bit at a time. Kept as the reference for BrickPiBenchmarkBits.
+    global Bit_Offset
+    result = 0
+    i = bits
+    while i:
+        result *= 2
+        result |= ((Array[int((byte_offset + ((bit_offset + Bit_Offset + (i-1)) // 8)))] >> ((bit_offset + Bit_Offset + (i-1)) % 8)) & 0x01)
+        i -= 1
+    Bit_Offset += bits
+    return result
+
+
+def AddBitsPerBit(byte_offset, bit_offset, bits, value):
+    # The original AddBits, one bit at a time. Kept as the reference for BrickPiBenchmarkBits.
+    global Bit_Offset
+    for i in range(bits):
+        if(int(value) & 0x01):
+            Array[int((byte_offset + ((bit_offset + Bit_Offset + i)//8)))] |= (0x01 << ((bit_offset + Bit_Offset + i) % 8));
         value//=2
     Bit_Offset += bits
 
 
+def BrickPiBenchmarkBits(frames = 20000):
+    # Packs and unpacks MSG_TYPE_VALUES frames for random motor speeds, encoder offsets and replies with
+    # the original bit-at-a-time AddBits/GetBits, the byte-at-a-time ones and BitPacker/BitReader, checks
+    # they all give identical bytes and values, and prints the frames per second of each.
+    # Run with: python BrickPi.py
+    global Array
+    global Bit_Offset
+    import random
+    random.seed(1)
+    cases = []
+    for frame in range(200):
+        speeds = [random.randint(-300, 300) for port in range(4)]
+        offsets = [random.choice([0, random.randint(-100000, 100000)]) for port in range(4)]
+        reply = [MSG_TYPE_VALUES] + [random.randint(0, 255) for byte in range(20)]
+        cases.append((speeds, offsets, reply))
+
+    def pack_words(i):
+        Array = [0] * 256
+        packer = BitPacker()
+        BrickPiPackValues(i, packer.add)
+        return Array[:packer.write(Array, 1) + 1]
+
+    def pack_bits(i):
+        global Array
+        global Bit_Offset
+        Array = [0] * 256
+        Bit_Offset = 0
+        BrickPiPackValues(i, lambda bits, value: AddBitsPerBit(1, 0, bits, value))
+        return Array[:(Bit_Offset + 7) // 8 + 1]
+
+    def pack_addbits(i):
+        global Array
+        global Bit_Offset
+        Array = [0] * 256
+        Bit_Offset = 0
+        BrickPiPackValues(i, lambda bits, value: AddBits(1, 0, bits, value))
+        return Array[:(Bit_Offset + 7) // 8 + 1]
+
+    def unpack_getbits(i, reply):
+        global Array
+        global Bit_Offset
+        Array = reply + [0] * (256 - len(reply))
+        Bit_Offset = 0
+        BrickPiUnpackValues(i, lambda bits: GetBits(1, 0, bits))
+
+    def unpack_words(i, reply):
+        BrickPiUnpackValues(i, BitReader(reply, 1, len(reply)).get)
+
+    def unpack_bits(i, reply):
+        global Array
+        global Bit_Offset
+        Array = reply + [0] * (256 - len(reply))
+        Bit_Offset = 0
+        BrickPiUnpackValues(i, lambda bits: GetBitsPerBit(1, 0, bits))
+
+    saved = (BrickPi.MotorSpeed[:], BrickPi.EncoderOffset[:], BrickPi.MotorEnable[:], BrickPi.Encoder[:], BrickPi.Sensor[:], Array)
+    BrickPi.MotorEnable = [1] * 4
+    results = {}
+    for name, pack, unpack in (('per bit', pack_bits, unpack_bits), ('AddBits', pack_addbits, unpack_getbits),
+                               ('word', pack_words, unpack_words)):
+        sent = []
+        read = []
+        BrickPi.Encoder = [None] * 4
+        BrickPi.Sensor = [None] * 4
+        st = time.time()
+        for frame in range(frames):
+            speeds, offsets, reply = cases[frame % len(cases)]
+            BrickPi.MotorSpeed = speeds[:]
+            BrickPi.EncoderOffset = offsets[:]
+            for i in range(2):
+                sent.append(pack(i)[1:])
+                unpack(i, reply)
+                read.append(BrickPi.Encoder[:] + BrickPi.Sensor[:])
+        took = time.time() - st
+        results[name] = (sent, read)
+        print("%-8s %10.0f frames/s" % (name, frames/took))
+    BrickPi.MotorSpeed, BrickPi.EncoderOffset, BrickPi.MotorEnable, BrickPi.Encoder, BrickPi.Sensor, Array = saved
+    if results['per bit'] == results['AddBits'] == results['word']:
+        print("Frames and replies are identical")
+        return 0
+    print("Frames or replies differ")
+    return -1
+
+
 def BrickPiSetupSensors():
     global Array
     global Bit_Offset
@@ -449,12 +614,15 @@ def BrickPiSetupSensors():
         Retried = 0
         while Retried < 4:
             #Retry Setup from here, if failed
+            if Retried:
+                Receiver.drain()
 
-            Array = [0] * 256
+            Array[:] = EmptyArray
             Bit_Offset = 0
             Array[BYTE_MSG_TYPE] = MSG_TYPE_SENSOR_TYPE
-            Array[BYTE_SENSOR_1_TYPE] = BrickPi.SensorType[PORT_1 + i*2 ]
-            Array[BYTE_SENSOR_2_TYPE] = BrickPi.SensorType[PORT_2 + i*2 ]
+            for ii in range(2):
+                Type = BrickPi.SensorType[i*2 + ii]
+                Array[BYTE_SENSOR_1_TYPE + ii] = TYPE_SENSOR_RAW if Type is None else Type
             for ii in range(2):
                 port = i*2 + ii
             #Jan's US fix###########
@@ -489,13 +657,13 @@ def BrickPiSetupSensors():
                             for out_byte in range(BrickPi.SensorI2CWrite[port][device]):
                                 AddBits(3,0,8, BrickPi.SensorI2COut[port][device][out_byte])
 
-            BrickPiFlush() # Toss out any old Rx data. This helps to make sure everything is fresh, and for the correct "core".
             tx_bytes = (((Bit_Offset + 7) // 8) + 3) #eq to UART_TX_BYTES
             BrickPiTx(BrickPi.Address[i], tx_bytes , Array)
 
-            result, BytesReceived, InArray = BrickPiRx(5) # Timeout set to 5 seconds to setup EV3 sensors successfully
-            for i in range(len(InArray)):
-                Array[i]=InArray[i]
+            # Old replies of other types are skipped by BrickPiRx, and one of this type that came too late
+            # has been drained before the retry, so the Rx data does not need to be tossed out first
+            result, BytesReceived, InArray = BrickPiRx(5, MSG_TYPE_SENSOR_TYPE) # Timeout set to 5 seconds to setup EV3 sensors successfully
+            Array[:len(InArray)] = InArray
             if (result or BytesReceived != 1 or Array[BYTE_MSG_TYPE] != MSG_TYPE_SENSOR_TYPE):
                 Retried += 1
                 if 'DEBUG' in globals():
@@ -509,6 +677,11 @@ def BrickPiSetupSensors():
                 if DEBUG == 1:
                     print("Retry Failed")
             return -1
+        for port in (i*2, i*2 + 1):
+            if BrickPi.SensorType[port] is None:
+                SensorsSetUp.discard(port)
+            else:
+                SensorsSetUp.add(port)
 
     if 'DEBUG' in globals():
         if DEBUG == 1:
@@ -516,84 +689,208 @@ def BrickPiSetupSensors():
     return 0
 
 
+def BrickPiPackValues(i, add):
+    # Packs the MSG_TYPE_VALUES fields for core i (encoder offsets, motors and I2C writes) by calling
+    # add(bits, value) for each field in order. The layout is kept in one place so BitPacker and the
+    # bit-at-a-time AddBits (see BrickPiBenchmarkBits) are given exactly the same fields.
+    for ii in range(2):
+        port = (i * 2) + ii
+        if(BrickPi.EncoderOffset[port]):
+            Temp_Value = BrickPi.EncoderOffset[port]
+            add(1,1)
+            Temp_ENC_DIR = 0
+            if Temp_Value < 0 :
+                Temp_ENC_DIR = 1
+                Temp_Value *= -1
+            Temp_BitsNeeded = BitsNeeded(Temp_Value)
+            add(5, Temp_BitsNeeded)
+            Temp_BitsNeeded += 1
+            Temp_Value *= 2
+            Temp_Value |= Temp_ENC_DIR
+            add(Temp_BitsNeeded, Temp_Value)
+        else:
+            add(1,0)
+
+    for ii in range(2):
+        port = (i *2) + ii
+        speed = BrickPi.MotorSpeed[port]
+        direc = 0
+        if speed<0 :
+            direc = 1
+            speed *= -1
+        if speed>255:
+            speed = 255
+        add(10,((((speed & 0xFF) << 2) | (direc << 1) | (BrickPi.MotorEnable[port] & 0x01)) & 0x3FF))
+
+    for ii in range(2):
+        port =  (i * 2) + ii
+        #if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V):
+    #Jan's US Fix##########
+        #old# if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V):
+        if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT):
+    #######################
+            for device in range(BrickPi.SensorI2CDevices[port]):
+                if not (BrickPi.SensorSettings[port][device] & BIT_I2C_SAME):
+                    add(4, BrickPi.SensorI2CWrite[port][device])
+                    add(4, BrickPi.SensorI2CRead[port][device])
+                    for out_byte in range(BrickPi.SensorI2CWrite[port][device]):
+                        add(8, BrickPi.SensorI2COut[port][device][out_byte])
+                device += 1
+
+
+def BrickPiUnpackValues(i, get):
+    # Reads the fields of a MSG_TYPE_VALUES reply from core i into BrickPi by calling get(bits) for
+    # each field in order, as BrickPiPackValues does for the request.
+    Temp_BitsUsed = []
+    Temp_BitsUsed.append(get(5))
+    Temp_BitsUsed.append(get(5))
+
+    for ii in range(2):
+        Temp_EncoderVal = get(Temp_BitsUsed[ii])
+        if Temp_EncoderVal & 0x01 :
+            Temp_EncoderVal //= 2
+            BrickPi.Encoder[ii + i*2] = Temp_EncoderVal*(-1)
+        else:
+            BrickPi.Encoder[ii + i*2] = Temp_EncoderVal // 2
+
+    for ii in range(2):
+        port = ii + (i * 2)
+        #print BrickPi.SensorType[port]
+        if BrickPi.SensorType[port] == TYPE_SENSOR_TOUCH :
+            BrickPi.Sensor[port] = get(1)
+        #elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
+    #Jan's US fix##########
+    #old# elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
+        elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
+    #######################
+            BrickPi.Sensor[port] = get(8)
+        elif BrickPi.SensorType[port] == TYPE_SENSOR_COLOR_FULL:
+            BrickPi.Sensor[port] = get(3)
+            BrickPi.SensorArray[port][INDEX_BLANK] = get(10)
+            BrickPi.SensorArray[port][INDEX_RED] = get(10)
+            BrickPi.SensorArray[port][INDEX_GREEN] = get(10)
+            BrickPi.SensorArray[port][INDEX_BLUE] = get(10)
+        #elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V :
+    #Jan's US fix##########
+        #old# elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V :
+        elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT:
+        #######################
+            BrickPi.Sensor[port] = get(BrickPi.SensorI2CDevices[port])
+            for device in range(BrickPi.SensorI2CDevices[port]):
+                if (BrickPi.Sensor[port] & ( 0x01 << device)) :
+                    for in_byte in range(BrickPi.SensorI2CRead[port][device]):
+                        BrickPi.SensorI2CIn[port][device][in_byte] = get(8)
+        elif BrickPi.SensorType[port] in [ TYPE_SENSOR_EV3_COLOR_M3, TYPE_SENSOR_EV3_GYRO_M3 ]:
+            BrickPi.Sensor[port] = get(32)
+        elif BrickPi.SensorType[port] in [ TYPE_SENSOR_EV3_INFRARED_M2 ]:
+            BrickPi.Sensor[port] = get(32)
+            ###############################################################################################################################################
+            # print "Raw returned: "+str(BrickPi.Sensor[port])
+            if 'DEBUG' in globals():
+                if BrickPi.Sensor[port] > 4278190080:
+                    print ("IR SENSOR RETURNED ERROR")
+        elif BrickPi.SensorType[port] in range(TYPE_SENSOR_EV3_US_M0,TYPE_SENSOR_EV3_INFRARED_M5+1):
+            BrickPi.Sensor[port] = get(16)
+        else:   #For all the light, color and raw sensors
+            BrickPi.Sensor[ii + (i * 2)] = get(10)
+
+        #Jan's US fix##########
+        if BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT :
+            if(BrickPi.Sensor[port] & ( 0x01 << US_I2C_IDX)) :
+                BrickPi.Sensor[port] = BrickPi.SensorI2CIn[port][US_I2C_IDX][0]
+            else:
+                BrickPi.Sensor[port] = -1
+    #######################
+
+    #######################
+    # EV3 Gyro Mode 0, Adjust sign
+        if BrickPi.SensorType[port] == TYPE_SENSOR_EV3_GYRO_M0 :
+            if BrickPi.Sensor[port] >= 32767:               # Negative number.  This seems to return a 2 byte number.
+                BrickPi.Sensor[port] = BrickPi.Sensor[port] - 65535
+    # else:                                 # Positive Number print str(gyro)
+    #######################
+    # EV3 Gyro Mode 1, Adjust sign
+        elif BrickPi.SensorType[port] == TYPE_SENSOR_EV3_GYRO_M1 :
+            # print "Gyro m1!"
+            if BrickPi.Sensor[port] >= 32767:               # Negative number.  This seems to return a 2 byte number.
+                BrickPi.Sensor[port] = BrickPi.Sensor[port] - 65535
+    # else:                                 # Positive Number print str(gyro)
+
+        # print BrickPi.SensorType[port]
+
+
+CoreUsed = [True, True] # if each core was in use at its last update, so the first update goes to both
+# The ports BrickPiSetupSensors has set up a sensor on, TYPE_SENSOR_RAW included. Kept apart from SensorType,
+# as a raw sensor's type is 0 and the BrickPi only reads the sensors it has been sent
+SensorsSetUp = set()
+
+
+def BrickPiCoresToUpdate():
+    # The cores BrickPiUpdateValues talks to (see SKIP_IDLE_CORES). A core that has just stopped being used
+    # is updated once more, so that a motor being disabled is sent.
+    cores = []
+    for i in range(2):
+        used = False
+        for port in (i * 2, i * 2 + 1):
+            if BrickPi.MotorEnable[port] or BrickPi.EncoderOffset[port] or port in SensorsSetUp:
+                used = True
+        if used or CoreUsed[i] or not SKIP_IDLE_CORES:
+            cores.append(i)
+        CoreUsed[i] = used
+    return cores
+
+
+def BrickPiSendValues(i):
+    # Puts together the MSG_TYPE_VALUES message for core i in Array and sends it
+    Array[:] = EmptyArray
+    Array[BYTE_MSG_TYPE] = MSG_TYPE_VALUES
+    packer = BitPacker()
+    BrickPiPackValues(i, packer.add)
+    tx_bytes = packer.write(Array, 1) + 1 #eq to UART_TX_BYTES
+
+    BrickPiTx(BrickPi.Address[i], tx_bytes, Array)
+
+
+def BrickPiReceiveValues(i):
+    # Receives the reply to BrickPiSendValues from core i and reads it into BrickPi. Returns 0 on success.
+    # Old replies of other types are skipped by BrickPiRx, and BrickPiUpdateValues drains any that came too
+    # late before a retry, so the Rx data does not need to be tossed out first
+    result, BytesReceived, InArray = BrickPiRx(0.007500, MSG_TYPE_VALUES) #check timeout
+    #print("Result",result)
+    Array[:len(InArray)] = InArray
+    if result != -2 :
+        BrickPi.EncoderOffset[(i * 2) + PORT_A] = 0
+        BrickPi.EncoderOffset[(i * 2) + PORT_B] = 0
+    if (result or (Array[BYTE_MSG_TYPE] != MSG_TYPE_VALUES)):
+        if 'DEBUG' in globals():
+            if DEBUG == 1:
+                print("BrickPiRx Error : %d" % result)
+        return -1
+    BrickPiUnpackValues(i, BitReader(Array, 1, len(InArray)).get)
+    return 0
+
+
 def BrickPiUpdateValues():
-    global Array
-    global Bit_Offset
     global Retried
-    i = 0
-    while i < 2 :
+    cores = BrickPiCoresToUpdate()
+    failed = False # if the cores left have already had a reply fail
+    if PIPELINE_CORES and len(cores) > 1:
+        for i in cores:
+            BrickPiSendValues(i)
+        # below: any core whose reply did not come is retried on its own
+        cores = [i for i in cores if BrickPiReceiveValues(i)]
+        failed = True
+    for i in cores:
         Retried = 0
         while Retried < 4:
             #Retry Communication from here, if failed
-
-            Array = [0] * 256
-            Array[BYTE_MSG_TYPE] = MSG_TYPE_VALUES
-            Bit_Offset = 0
-
-            for ii in range(2):
-                port = (i * 2) + ii
-                if(BrickPi.EncoderOffset[port]):
-                    Temp_Value = BrickPi.EncoderOffset[port]
-                    AddBits(1,0,1,1)
-                    Temp_ENC_DIR = 0
-                    if Temp_Value < 0 :
-                        Temp_ENC_DIR = 1
-                        Temp_Value *= -1
-                    Temp_BitsNeeded = BitsNeeded(Temp_Value)
-                    AddBits(1,0,5, Temp_BitsNeeded)
-                    Temp_BitsNeeded += 1
-                    Temp_Value *= 2
-                    Temp_Value |= Temp_ENC_DIR
-                    AddBits(1,0, Temp_BitsNeeded, Temp_Value)
-                else:
-                    AddBits(1,0,1,0)
-
-            for ii in range(2):
-                port = (i *2) + ii
-                speed = BrickPi.MotorSpeed[port]
-                direc = 0
-                if speed<0 :
-                    direc = 1
-                    speed *= -1
-                if speed>255:
-                    speed = 255
-                AddBits(1,0,10,((((speed & 0xFF) << 2) | (direc << 1) | (BrickPi.MotorEnable[port] & 0x01)) & 0x3FF))
-
-            for ii in range(2):
-                port =  (i * 2) + ii
-                #if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V):
-            #Jan's US Fix##########
-                #old# if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V):
-                if(BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT):
-            #######################
-                    for device in range(BrickPi.SensorI2CDevices[port]):
-                        if not (BrickPi.SensorSettings[port][device] & BIT_I2C_SAME):
-                            AddBits(1,0,4, BrickPi.SensorI2CWrite[port][device])
-                            AddBits(1,0,4, BrickPi.SensorI2CRead[port][device])
-                            for out_byte in range(BrickPi.SensorI2CWrite[port][device]):
-                                AddBits(1,0,8, BrickPi.SensorI2COut[port][device][out_byte])
-                        device += 1
-
-            if p_version==2:
-                tx_bytes = (((Bit_Offset + 7) // 8 ) + 1) #eq to UART_TX_BYTES
-            else:
-                tx_bytes = int(((Bit_Offset + 7) // 8 ) + 1) #eq to UART_TX_BYTES
-
-            BrickPiFlush() # Toss out any old Rx data. This helps to make sure everything is fresh, and for the correct "core".
-            BrickPiTx(BrickPi.Address[i], tx_bytes, Array)
-
-            result, BytesReceived, InArray = BrickPiRx(0.007500) #check timeout
-            #print("Result",result)
-            for j in range(len(InArray)):
-                Array[j]=InArray[j]
-            if result != -2 :
-                BrickPi.EncoderOffset[(i * 2) + PORT_A] = 0
-                BrickPi.EncoderOffset[(i * 2) + PORT_B] = 0
-            if (result or (Array[BYTE_MSG_TYPE] != MSG_TYPE_VALUES)):
+            if Retried or failed:
+                # below: replies carry no address, so a reply that came after the timeout would be
+                # taken as the retry's
+                Receiver.drain()
+            BrickPiSendValues(i)
+            if BrickPiReceiveValues(i):
                 Retried += 1
-                if 'DEBUG' in globals():
-                    if DEBUG == 1:
-                        print("BrickPiRx Error : %d" % result)
             else:
                 Retried = 10 # exit loop
 
@@ -602,86 +899,6 @@ def BrickPiUpdateValues():
                 if DEBUG == 1:
                     print("Retry Failed")
             return -1
-
-        Bit_Offset = 0
-
-        Temp_BitsUsed = []
-        Temp_BitsUsed.append(GetBits(1,0,5))
-        Temp_BitsUsed.append(GetBits(1,0,5))
-
-        for ii in range(2):
-            Temp_EncoderVal = GetBits(1,0, Temp_BitsUsed[ii])
-            if Temp_EncoderVal & 0x01 :
-                Temp_EncoderVal //= 2
-                BrickPi.Encoder[ii + i*2] = Temp_EncoderVal*(-1)
-            else:
-                BrickPi.Encoder[ii + i*2] = Temp_EncoderVal // 2
-
-        for ii in range(2):
-            port = ii + (i * 2)
-            #print BrickPi.SensorType[port]
-            if BrickPi.SensorType[port] == TYPE_SENSOR_TOUCH :
-                BrickPi.Sensor[port] = GetBits(1,0,1)
-            #elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
-        #Jan's US fix##########
-        #old# elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
-            elif BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_SS :
-        #######################
-                BrickPi.Sensor[port] = GetBits(1,0,8)
-            elif BrickPi.SensorType[port] == TYPE_SENSOR_COLOR_FULL:
-                BrickPi.Sensor[port] = GetBits(1,0,3)
-                BrickPi.SensorArray[port][INDEX_BLANK] = GetBits(1,0,10)
-                BrickPi.SensorArray[port][INDEX_RED] = GetBits(1,0,10)
-                BrickPi.SensorArray[port][INDEX_GREEN] = GetBits(1,0,10)
-                BrickPi.SensorArray[port][INDEX_BLUE] = GetBits(1,0,10)
-            #elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V :
-        #Jan's US fix##########
-            #old# elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V :
-            elif BrickPi.SensorType[port] == TYPE_SENSOR_I2C or BrickPi.SensorType[port] == TYPE_SENSOR_I2C_9V or BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT:
-            #######################
-                BrickPi.Sensor[port] = GetBits(1,0, BrickPi.SensorI2CDevices[port])
-                for device in range(BrickPi.SensorI2CDevices[port]):
-                    if (BrickPi.Sensor[port] & ( 0x01 << device)) :
-                        for in_byte in range(BrickPi.SensorI2CRead[port][device]):
-                            BrickPi.SensorI2CIn[port][device][in_byte] = GetBits(1,0,8)
-            elif BrickPi.SensorType[port] in [ TYPE_SENSOR_EV3_COLOR_M3, TYPE_SENSOR_EV3_GYRO_M3 ]:
-                BrickPi.Sensor[port] = GetBits(1,0,32)
-            elif BrickPi.SensorType[port] in [ TYPE_SENSOR_EV3_INFRARED_M2 ]:
-                BrickPi.Sensor[port] = GetBits(1,0,32)
-                ###############################################################################################################################################
-                # print "Raw returned: "+str(BrickPi.Sensor[port])
-                if 'DEBUG' in globals():
-                    if BrickPi.Sensor[port] > 4278190080:
-                        print ("IR SENSOR RETURNED ERROR")
-            elif BrickPi.SensorType[port] in range(TYPE_SENSOR_EV3_US_M0,TYPE_SENSOR_EV3_INFRARED_M5+1):
-                BrickPi.Sensor[port] = GetBits(1,0,16)
-            else:   #For all the light, color and raw sensors
-                BrickPi.Sensor[ii + (i * 2)] = GetBits(1,0,10)
-
-            #Jan's US fix##########
-            if BrickPi.SensorType[port] == TYPE_SENSOR_ULTRASONIC_CONT :
-                if(BrickPi.Sensor[port] & ( 0x01 << US_I2C_IDX)) :
-                    BrickPi.Sensor[port] = BrickPi.SensorI2CIn[port][US_I2C_IDX][0]
-                else:
-                    BrickPi.Sensor[port] = -1
-        #######################
-
-        #######################
-        # EV3 Gyro Mode 0, Adjust sign
-            if BrickPi.SensorType[port] == TYPE_SENSOR_EV3_GYRO_M0 :
-                if BrickPi.Sensor[port] >= 32767:               # Negative number.  This seems to return a 2 byte number.
-                    BrickPi.Sensor[port] = BrickPi.Sensor[port] - 65535
-        # else:                                 # Positive Number print str(gyro)
-        #######################
-        # EV3 Gyro Mode 1, Adjust sign
-            elif BrickPi.SensorType[port] == TYPE_SENSOR_EV3_GYRO_M1 :
-                # print "Gyro m1!"
-                if BrickPi.Sensor[port] >= 32767:               # Negative number.  This seems to return a 2 byte number.
-                    BrickPi.Sensor[port] = BrickPi.Sensor[port] - 65535
-        # else:                                 # Positive Number print str(gyro)
-
-            # print BrickPi.SensorType[port]
-        i += 1
     return 0
 
 
@@ -701,90 +918,123 @@ def BrickPiFlush():
         time.sleep(.001) #time.sleep(.000250) # If the BrickPi is in interrupt listening to a configured (57600 baud) EV3 sensor, it could be about 170uS between bytes. 250uS should be safe.
 
 def BrickPiTx(dest, ByteCount, OutArray):
+    # The frame is put together in TxBuffer (where Array already is, on Python 3) and sent in one write
+    ByteCount = int(ByteCount)
+    if OutArray is not Array or p_version==2:
+        TxBuffer[3:3 + ByteCount] = bytearray(OutArray[:ByteCount])
+    TxBuffer[0] = dest
+    TxBuffer[2] = ByteCount
     if p_version==2:
-        # print ('a',p_version)
-        tx_buffer = ''
-        tx_buffer+=chr(dest)
-        tx_buffer+=chr((dest+ByteCount+sum(OutArray[:ByteCount]))%256)
-        tx_buffer+=chr(ByteCount)
-        for i in OutArray[:ByteCount]:
-            tx_buffer+=chr(i)
-        ser.write(tx_buffer)
+        TxBuffer[1] = (dest + ByteCount + sum(TxBuffer[3:3 + ByteCount])) % 256
     else:
-        # print (p_version,'b')
-        intByteCount = int(ByteCount)
-        tx_buffer = ''
-        tx_buffer+=chr(dest)
-        tx_buffer+=chr((dest+intByteCount+sum(OutArray[:intByteCount]))%256)
-        tx_buffer+=chr(intByteCount)
-
-        for i in OutArray[:intByteCount]:
-            tx_buffer+=chr(i)
-
-        byte_tx_buffer = bytes(tx_buffer, 'iso-8859-1')
-        ser.write(byte_tx_buffer)
-
-
-def BrickPiRx(timeout):
-    rx_buffer = ''
-    ser.timeout=0
-    ot = time.time()
-
-    while( ser.inWaiting() <= 0):
-        if time.time() - ot >= timeout :
-            return -2, 0 , []
-
+        TxBuffer[1] = (dest + ByteCount + sum(TxView[3:3 + ByteCount])) % 256
+    ser.write(TxView[:3 + ByteCount])
+
+
+class BrickPiReceiver:
+    # Splits the bytes from the serial port into reply frames (checksum, byte count, then the message).
+    # Bytes that come after a frame are kept in RxBuffer for the next one rather than flushed. A frame
+    # with a bad checksum is dropped a byte at a time until the next valid frame lines up (resync), and
+    # valid frames with the wrong message type (stale replies) are skipped. A late reply of the right
+    # type cannot be told from the next one, so it is drained before a retry. In the normal case this
+    # reads exactly the header and then the message, as before.
+    def __init__(self):
+        self.start = 0 # RxBuffer[start:end] has been received but not used yet
+        self.end = 0
+
+    def drain(self):
+        # Drops the bytes held and any still coming in (see BrickPiFlush), before a message is sent again
+        self.start = self.end = 0
+        BrickPiFlush()
+
+    def fill(self, count):
+        # Blocks (using the port's timeout) until count bytes from start are held, False if they do not come
+        if self.start + count > len(RxBuffer):
+            held = self.end - self.start
+            RxBuffer[:held] = RxBuffer[self.start:self.end]
+            self.start, self.end = 0, held
+        while self.end - self.start < count:
+            got = ser.readinto(RxView[self.end:self.start + count])
+            if not got:
+                return False
+            self.end += got
+        return True
+
+    def valid(self, position):
+        # If a whole frame with a correct checksum is held at position
+        length = RxBuffer[position + 1]
+        if position + 2 + length > self.end:
+            return False
+        if p_version==2:
+            CheckSum = sum(RxBuffer[position + 1:position + 2 + length])
+        else:
+            CheckSum = sum(RxView[position + 1:position + 2 + length])
+        return (CheckSum % 256) == RxBuffer[position] #Checksum equals sum(InArray)+len(InArray)
+
+    def resync(self):
+        # Moves start to the next whole valid frame held, if there is one
+        for position in range(self.start + 1, self.end - 1):
+            if self.valid(position):
+                self.start = position
+                return True
+        return False
+
+    def frame(self, msg_type):
+        # Returns the next valid frame whose message is of msg_type (any if None) as (0, bytes, InArray),
+        # or the error as BrickPiRx does
+        resyncing = False
+        while True:
+            if not self.fill(3):
+                result = -2 if self.end == self.start else -4
+                break
+            length = RxBuffer[self.start + 1]
+            # below: a header that cannot be right is dropped straight away, rather than waiting for
+            # the number of bytes it gives
+            header = length > 0 and RxBuffer[self.start + 2] in MSG_TYPES
+            if header and not self.fill(2 + length) and not self.resync():
+                result = -6
+                break
+            length = RxBuffer[self.start + 1]
+            if not (header and self.valid(self.start)):
+                if not resyncing:
+                    BrickPi.RxErrors[-5] += 1
+                    resyncing = True
+                self.start += 1
+                continue
+            position = self.start + 2
+            self.start = position + length
+            if msg_type is not None and (length == 0 or RxBuffer[position] != msg_type):
+                BrickPi.RxStale += 1
+                continue
+            if p_version==2:
+                return 0, length, RxBuffer[position:position + length]
+            return 0, length, RxView[position:position + length]
+        # below: what is held cannot be made into a frame, so it is dropped rather than tried again
+        self.start = self.end = 0
+        BrickPi.RxErrors[result] += 1
+        return result, 0 , NoBytes
+
+Receiver = BrickPiReceiver()
+MSG_TYPES = [MSG_TYPE_CHANGE_ADDR, MSG_TYPE_SENSOR_TYPE, MSG_TYPE_VALUES, MSG_TYPE_E_STOP, MSG_TYPE_TIMEOUT_SETTINGS]
+
+
+def BrickPiRx(timeout, msg_type = None):
+    # Receives the reply to the message of msg_type (any message if None), using BrickPiReceiver.
+    # InArray is a view of RxBuffer, so it is only valid until the next BrickPiRx and should be copied
+    # (into Array) straight away.
+    # Blocks in the serial port's own read (using its timeout) rather than polling. The port's timeout is
+    # only changed when a different one is asked for, as changing it reconfigures the port.
     if not ser.isOpen():
-        return -1, 0 , []
-
-    if p_version==2:
-        try:
-            while ser.inWaiting():
-                while ser.inWaiting():
-                    rx_buffer += ( ser.read(ser.inWaiting()) )
-                time.sleep(.001) # This is required. If the BrickPi is in interrupt listening to a configured (57600 baud) EV3 sensor, it could be about 170uS between bytes. 250uS should be safe.
-        except:
-            print(("Unexpected error: ", sys.exc_info()[0]))
-            return -1, 0 , []
-    else:
-        buff_in = 0
-        try:
-            while ser.inWaiting():
-                while ser.inWaiting():
-                    buff_in = ser.inWaiting()
-                    buff_read = bytes((ser.read(buff_in)))
-                    string_in = ''
-                    for i in buff_read:
-                        # print(chr(i))
-                        string_in+=chr(i)
-
-                    rx_buffer += (string_in)
-                time.sleep(.001) # This is required. If the BrickPi is in interrupt listening to a configured (57600 baud) EV3 sensor, it could be about 170uS between bytes. 250uS should be safe.
-        except:
-            # print ("Unexpected error: ", sys.exc_info()[0])
-            return -1, 0 , []
-
-    # print("Buffer: " + rx_buffer)
-    # print("Buffer Type: " + str(type(rx_buffer)))
-
-    RxBytes=len(rx_buffer)
-
-    if RxBytes < 2 :
-        return -4, 0 , []
-
-    if RxBytes < ord(rx_buffer[1])+2 :
-        return -6, 0 , []
-
-    CheckSum = 0
-    for i in rx_buffer[1:]:
-        CheckSum += ord(i)
-
-    InArray = []
-    for i in rx_buffer[2:]:
-        InArray.append(ord(i))
-    if (CheckSum % 256) != ord(rx_buffer[0]) : #Checksum equals sum(InArray)+len(InArray)
-        return -5, 0 , []
-
-    InBytes = RxBytes - 2
-
-    return 0, InBytes, InArray
+        return -1, 0 , NoBytes
+
+    if ser.timeout != timeout:
+        ser.timeout = timeout
+    try:
+        return Receiver.frame(msg_type)
+    except:
+        # print ("Unexpected error: ", sys.exc_info()[0])
+        Receiver.start = Receiver.end = 0
+        return -1, 0 , NoBytes
+
+if __name__ == "__main__":
+    BrickPiBenchmarkBits()
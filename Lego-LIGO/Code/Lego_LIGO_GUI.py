@@ -40,21 +40,33 @@ Section 2: import modules to be used. Prints to let the user know why the GUI is
 print('Loading Modules...')
 import sys
 import os
+import argparse
+import hashlib
+import json
 import matplotlib
 import time
 from time import sleep
+import itertools
+import bisect
+import traceback
+from collections import OrderedDict
+from queue import Queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 try:
     from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QSizePolicy, QMainWindow
     from PyQt5.QtGui import QIcon, QImage, QPalette, QBrush, QPixmap
-    from PyQt5.QtCore import QSize, Qt
+    from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+    from PyQt5.QtCore import QSize, Qt, QPointF, QThread, pyqtSignal
     matplotlib.use('Qt5Agg')
     from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 except ImportError:
     from PyQt4.QtGui import QApplication, QMainWindow, QPushButton, QWidget, QLabel
     from PyQt4.QtGui import QIcon, QImage, QPalette, QBrush, QSizePolicy, QPixmap
+    from PyQt4.QtGui import QPainter, QPen, QColor, QPolygonF
     from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg as FigureCanvas
-    from PyQt4.QtCore import QSize, Qt
+    from PyQt4.QtCore import QSize, Qt, QPointF, QThread, pyqtSignal
     matplotlib.use('Qt4Agg')
 
 import matplotlib.pyplot as plt
@@ -66,6 +78,7 @@ try:#checks BrickPi+
     BrickPi.MotorEnable[PORT_B] = 1#enable ports
     BrickPi.MotorEnable[PORT_A] = 1#enable ports
     BrickPiSetupSensors() #Send the properties of sensors to BrickPi
+    BrickPiUpdateValues() #reads the encoders, so positions (section 11.a) are measured from here
 
 except ImportError:
     pass
@@ -114,6 +127,62 @@ PARAMS = {
     'Fast_power_multiplier' : 2,
     #time multiplier for fast forward and fast rewind buttons in self-movement and calibrate mode
     'Fast_time_multiplier' : 3,
+    #memory, in bytes, that loaded and transformed waveforms may use before the least recently used are dropped
+    'cache_budget' : 64*1024*1024,
+    #keeps a binary '.npy' copy of each csv file in 'cache_folder', which loads much faster than the csv
+    'binary_sidecars' : True,
+    #where the binary copies (section 5.e), waveform pyramids (section 6.q) and schedules (section 12.b)
+    #made from the csv files are kept, so nothing is added to the test code folder
+    'cache_folder' : os.path.expanduser('~')+os.sep+'.cache'+os.sep+'LEGO_LIGO',
+    #fraction of the largest strain that peaks and troughs must differ by to count as
+    #stationary points, stops noise in real data becoming motor movements. 0 keeps every one
+    'stationary_hysteresis' : 0,
+    #files larger than this, in bytes, are read and played a chunk at a time (section 6.h)
+    'stream_above_bytes' : 32*1024*1024,
+    'stream_chunk_rows' : 4096, #lines read at a time when streaming
+    #how time_spacing mode picks its points: 'sinc' low-pass filters first (section 6.o) so the
+    #mirror does not stutter, 'stride' just takes every i-th point, which is faster
+    'resample_method' : 'sinc',
+    #joins preset movements that are nearly in a straight line (section 12.h), fewer movements means
+    #less time spent talking to the BrickPi. Largest change to the mirror position allowed, in degrees, 0 is off
+    'simplify_tolerance' : 0,
+    #the most movements the 'pyramid' motor mode may use, it follows the peaks and troughs (section 6.q.v)
+    #of the waveform pyramid (section 6.q) level with no more points than this
+    'pyramid_segments' : 200,
+    'preprocess_workers' : 4, #processes used by 'preprocess' (section 17), one per Raspberry Pi 3 core
+    'motor_update_rate' : 100, #times a second the motor powers are sent to the BrickPi while moving
+    #seconds before each motor update that are spun through rather than slept, as sleep can wake late
+    'timer_spin' : 0.0005,
+    #moves the mirrors by reading the motor encoders (section 11.a) rather than by timing alone
+    'position_feedback' : True,
+    'encoder_sign' : -1, #-1 if the encoder counts up when the mirror position (section 11) goes down
+    'position_gain' : 2, #extra motor power for each degree a mirror is from where it should be
+    'position_min_power' : 15, #least power that moves a motor, used to close the last few degrees
+    'position_tolerance' : 1, #degrees from its target at which a movement has finished
+    'position_timeout' : 1, #most seconds spent reaching the target once a movement's time is up
+    #how presets are played: 'segments' sends each movement to motor (section 14) in turn, 'ticks' works
+    #out the power for every motor update before starting (section 12.k)
+    'preset_player' : 'segments',
+    #how the power changes through each preset movement when played as 'ticks': 'constant' as motor
+    #(section 14), or 'trapezoid' or 's-curve' ramps that keep within 'max_acceleration' (section 12.m).
+    #Ramps are only used as 'ticks', and refuse files with movements the motors cannot make with them
+    'motion_profile' : 'constant',
+    'max_acceleration' : 5000, #fastest change in motor power, in power per second (255 in about 0.05 s)
+    #motor ports of any other mirrors (PORT_C is 2, PORT_D is 3), returned to 0 along with mirrors X and Y
+    'extra_ports' : [],
+    'seek_step' : 10, #seconds the fast forward and fast rewind buttons move a playing preset by
+    #measured speed of each motor (section 11.b), made by 'characterise' (section 17). Without it every
+    #motor is taken to move 'pwrcoef' degrees a second for each unit of power
+    'motor_profile' : os.path.dirname(os.path.abspath(__file__))+os.sep+'motor_profile.json',
+    'characterise_seconds' : 1, #longest time each power is run for when characterising the motors
+    #touch sensors the mirrors are homed against at startup (section 14.h) instead of being calibrated by
+    #hand. Motor port: (sensor port, mirror position as section 11 where the sensor is pressed), e.g.
+    #{0: (0, 170), 1: (1, 170)} for touch sensors in S1 and S2 (PORT_1 is 0). Empty to calibrate by hand
+    'endstops' : {},
+    'home_fast_power' : 60, #power the mirrors first approach the endstops at (as it would be with 'pwrcoef')
+    'home_slow_power' : 15, #power they approach at again, after backing off, for an accurate position
+    'home_backoff' : 10, #degrees the mirrors back off from the endstops
+    'home_timeout' : 10, #most seconds spent looking for the endstops
     }
 
 
@@ -121,7 +190,7 @@ def files_in_folder(folder_name):
     """
     Section 4:
         Loads csv files in the folder
-        if "csv" ensures only csv files are given as an option
+        The folder is only looked through again when it has changed (section 4.a)
 
     Parameters
     --------
@@ -129,15 +198,86 @@ def files_in_folder(folder_name):
 
     Returns
     --------
-    files = list of csv files only
+    files = sorted list of csv files only
     """
-    load_files = os.listdir(folder_name) #folder_name passed into function
-    files = [x for x in load_files if "csv" in x] #reduces load_files to csv files only
-    return files
+    return catalog(folder_name).refresh()
+
+class FolderCatalog(object):
+    """
+    Section 4.a: Remembers the csv files in a folder, and details about each, so the folder is
+        not listed every time files_in_folder (section 4) is called.
+        Adding, removing or renaming a file changes the folder's modification time, which is
+            when the list is made again.
+
+    Parameters
+    ----------
+    folder_name = name of the test code folder
+    """
+    def __init__(self, folder_name):
+        self.folder_name = folder_name
+        self.mtime = None
+        self.files = []
+        self.info = {}
+
+    def refresh(self):
+        """Lists the folder again if it has changed and returns the sorted csv files"""
+        mtime = os.stat(self.folder_name).st_mtime_ns
+        if mtime != self.mtime:
+            #only names ending in .csv, not every name containing 'csv'
+            self.files = sorted(x for x in os.listdir(self.folder_name) if x.lower().endswith('.csv')
+                                and os.path.isfile(self.folder_name+os.sep+x))
+            self.info = dict((name, self.info[name]) for name in self.files if name in self.info)
+            self.mtime = mtime
+        return self.files
+
+    def details(self, file_name):
+        """
+        Details of a csv file, worked out the first time they are asked for and again once
+            the file has changed
+
+        Returns
+        --------
+        info = dictionary of 'size' (bytes), 'mtime', 'duration' (seconds, as in the file),
+            'samples' (data lines) and 'peak' (largest absolute strain)
+        """
+        key = file_key(self.folder_name, file_name)
+        if file_name in self.info and self.info[file_name]['key'] == key:
+            return self.info[file_name]
+        if long_file(self.folder_name, file_name):
+            scan = waveform_info(self.folder_name, file_name)
+            samples = scan['rows']
+            duration = scan['end'] - scan['start']
+            peak = scan['peak']
+            if peak is None:
+                peak = max(np.max(np.abs(chunk[:, 1])) for chunk in read_csv_chunks(self.folder_name, file_name))
+        else:
+            data = read_csvfile_in_folder(self.folder_name, file_name)
+            samples = len(data)
+            duration = np.max(data[:, 0]) - np.min(data[:, 0])
+            peak = np.max(np.abs(data[:, 1]))
+        self.info[file_name] = {'key': key, 'size': key[2], 'mtime': key[1], 'duration': float(duration),
+                                'samples': samples, 'peak': float(peak)}
+        return self.info[file_name]
+
+CATALOGS = {}
+
+def catalog(folder_name):
+    """Section 4.b: The FolderCatalog (section 4.a) for folder_name, made when first needed"""
+    if folder_name not in CATALOGS:
+        CATALOGS[folder_name] = FolderCatalog(folder_name)
+    return CATALOGS[folder_name]
+
+def data_folder():
+    """Section 4.c: The test code folder for the platform chosen in section 1"""
+    if RP is True:
+        return PARAMS['RPFOLDER']
+    return PARAMS['FOLDER']
 
 def read_csvfile_in_folder(folder_name, file_name):
     """
     Section 5: Reads the csv file
+        The data is kept in WAVEFORMS (section 5.a) so the file is only read again once
+            it has changed on disk
 
     Parameters
     ----------
@@ -149,15 +289,171 @@ def read_csvfile_in_folder(folder_name, file_name):
     --------
     data = 2D array (2 columns), time in the first column and strain in the second column
     """
-    data = np.loadtxt(folder_name+os.sep+file_name, delimiter=',',
-                      skiprows=PARAMS['LINES_TO_SKIP'])
+    key = file_key(folder_name, file_name) + (PARAMS['LINES_TO_SKIP'],)
+    data = WAVEFORMS.get(key)
+    if data is None:
+        if PARAMS['binary_sidecars'] is True:
+            data = read_sidecar(folder_name, file_name)
+        else:
+            data = np.loadtxt(folder_name+os.sep+file_name, delimiter=',',
+                              skiprows=PARAMS['LINES_TO_SKIP'])
+        data.setflags(write=False) #shared through the cache so must not be altered
+        WAVEFORMS.put(key, data)
     return data
 
+def sidecar_path(folder_name, file_name):
+    """Section 5.d: The binary copy of a csv file, in 'cache_folder' (section 5.g). Named after the
+                'LINES_TO_SKIP' it was read with, so changing it reads the csv file again"""
+    return cache_path(folder_name, file_name, '.skip{}.npy'.format(PARAMS['LINES_TO_SKIP']))
+
+def read_sidecar(folder_name, file_name):
+    """
+    Section 5.e: Reads the time, strain data from the binary copy of the csv file.
+        The copy is memory-mapped so only the parts that are used are read from the SD card.
+        It is given the same modification time as the csv file, so when the two differ
+            the csv file has been edited and the copy is made again.
+        If 'cache_folder' cannot be written to the csv file is read as in section 5.
+
+    Returns
+    --------
+    data = 2D array (2 columns), time in the first column and strain in the second column
+    """
+    path = folder_name+os.sep+file_name
+    sidecar = sidecar_path(folder_name, file_name)
+    info = os.stat(path)
+    try:
+        if os.stat(sidecar).st_mtime_ns == info.st_mtime_ns:
+            return np.load(sidecar, mmap_mode='r')
+    except (OSError, IOError, ValueError):
+        pass #missing or unreadable, so made again below
+    data = np.loadtxt(path, delimiter=',', skiprows=PARAMS['LINES_TO_SKIP'])
+    try:
+        write_atomically(sidecar, lambda tempfile: np.save(tempfile, data), info)
+    except (OSError, IOError):
+        pass
+    return data
+
+def write_atomically(path, save, source=None):
+    """
+    Section 5.f: Writes a file through a temporary copy, so a file that is being read is
+        never half written, even if the program is stopped part way through.
+        The temporary copy is named after the process and thread writing it, so two writing the
+            same file (e.g. the playlist's, section 14.f) do not write over each other's copy.
+        The folder is made if it does not exist yet.
+
+    Parameters
+    -----------
+    save = function given the open temporary file to write to
+    source = os.stat of the csv file the new file was made from. If given the new file
+        takes its modification time (see section 5.e)
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temp = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    with open(temp, 'wb') as tempfile:
+        save(tempfile)
+    if source is not None:
+        os.utime(temp, ns=(source.st_atime_ns, source.st_mtime_ns))
+    os.replace(temp, path) #only ever replaces a complete file
+
+def cache_path(folder_name, file_name, suffix):
+    """
+    Section 5.g: Where a file made from a csv file is kept: in a folder of 'cache_folder' for each test
+        code folder, named after the folder and a hash of its full path so two with the same name do
+        not share one. The whole csv file name is kept, so 'x.csv' and 'x.txt' do not share files.
+
+    Parameters
+    -----------
+    suffix = added to the csv file name, e.g. '.skip1.npy'
+    """
+    folder = os.path.abspath(folder_name)
+    name = '{}-{}'.format(os.path.basename(folder), hashlib.md5(folder.encode('utf-8')).hexdigest()[:8])
+    return PARAMS['cache_folder']+os.sep+name+os.sep+file_name+suffix
+
+class WaveformCache(object):
+    """
+    Section 5.a: Keeps loaded and transformed waveforms in memory so that pressing a
+        Preset button only reads the csv file once.
+        Entries are dropped least recently used first once 'cache_budget' bytes are held.
+        Used from the GUI and motor worker (section 14.c) threads, so changes are made under a lock.
+
+    Parameters
+    ----------
+    budget = integer, the number of bytes the stored arrays may take up. If None 'cache_budget' is read
+        each time something is stored, so it can be changed while the program runs
+    """
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the stored value (marking it as recently used) or None if it is not stored"""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            value = self.entries.pop(key)
+            self.entries[key] = value
+            return value[0]
+
+    def put(self, key, value):
+        """Stores value, dropping the least recently used entries until it fits in the budget"""
+        size = array_bytes(value)
+        budget = PARAMS['cache_budget'] if self.budget is None else self.budget
+        with self.lock:
+            if key in self.entries:
+                self.used -= self.entries.pop(key)[1]
+            if size > budget:
+                return #larger than the whole budget, so would only push everything else out
+            while self.used + size > budget:
+                self.used -= self.entries.popitem(last=False)[1][1]
+            self.entries[key] = (value, size)
+            self.used += size
+
+    def clear(self):
+        """Empties the cache"""
+        with self.lock:
+            self.entries.clear()
+            self.used = 0
+
+WAVEFORMS = WaveformCache()
+
+def array_bytes(value):
+    """Section 5.b: Counts the bytes held by the numpy arrays in value (an array or anything else
+                with nbytes, or a tuple or dictionary of them). Memory-mapped arrays (section 5.e) count
+                as nothing, as the operating system reads them in and drops them itself"""
+    if isinstance(value, np.memmap):
+        return 0
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sum(array_bytes(i) for i in value)
+    if isinstance(value, dict):
+        return sum(array_bytes(i) for i in value.values())
+    return 0
+
+def file_key(folder_name, file_name):
+    """
+    Section 5.c: Identifies a version of a file on disk, so editing or replacing a csv file
+        means its old cached data is no longer used
+
+    Returns
+    --------
+    key = tuple of the path, modification time and size of the file
+    """
+    path = folder_name+os.sep+file_name
+    info = os.stat(path)
+    return (path, info.st_mtime, info.st_size)
+
 def degree_velocity(folder, file, type):
     """
     Section 6: Transforms the time, strain data for motor and graph to use
         type is to allow the function to be called by different functions and manipulate
              the data in the desired way
+        Results are kept in WAVEFORMS (section 5.a) along with the PARAMS they depend on,
+            so repeat calls for the same file and type do not redo the work
 
 
     Returns
@@ -166,13 +462,39 @@ def degree_velocity(folder, file, type):
     warning = if the motor cannot achieve the required power
 
     """
-    old_data = read_csvfile_in_folder(folder, file) #call time, strain data
+    key = file_key(folder, file) + (type,) + tuple(PARAMS[name] for name in DV_PARAMS)
+    result = WAVEFORMS.get(key)
+    if result is None:
+        if type == 'pyramid':
+            result = transform_data(pyramid_turns(folder, file, PARAMS['pyramid_segments']), 'all_points')
+        else:
+            result = transform_data(read_csvfile_in_folder(folder, file), type)
+        result[0].setflags(write=False) #shared through the cache so must not be altered
+        WAVEFORMS.put(key, result)
+    return result
+
+#the PARAMS that change the result of degree_velocity, so are part of its cache key
+DV_PARAMS = ('LINES_TO_SKIP', 'data_point_spacing', 'time_scale', 'degree_max', 'presetbuffer',
+             'stationary_hysteresis', 'resample_method', 'pyramid_segments')
+
+def transform_data(old_data, type):
+    """
+    Section 6.a: The calculation behind degree_velocity (section 6), working on the time,
+        strain data already read from the file
+
+    Returns
+    ----------
+    dv_data = array of columns:times, velocity, degrees, degree differences, time differences and strain
+    warning = if the motor cannot achieve the required power
+    """
 
     #below: allows for original data to have -ve times
     time_total = (np.max(old_data[:, 0]) - np.min(old_data[:, 0]))*PARAMS['time_scale']
     i = int((len(old_data)*PARAMS['data_point_spacing'])/time_total) #rounds to 0 dp then integer
     if i > 0:
         new_data = old_data[0::i] #inculdes first data point
+        if PARAMS['resample_method'] == 'sinc' and (type == 'time_spacing' or type == 'warning_check'):
+            new_data = decimate(old_data, i, len(old_data)/time_total) #filtered, so still includes first data point
     elif i <= 0:
         new_data = old_data
     if type == 'time_spacing':
@@ -180,16 +502,7 @@ def degree_velocity(folder, file, type):
     if type == 'all_points':
         data=old_data
     if type == 'motor_stationary_points':
-        count = 0
-        stptdata = []
-        for i in range(0, (len(old_data[:, 1]) - 2)): #goes twice past to check both ways
-            count += 1
-            ths = old_data[:, 1][count]
-            prv = old_data[:, 1][count-1]
-            nxt = old_data[:, 1][count+1]
-            if ((ths - prv > 0) and (nxt-ths < 0)) or ((ths-prv < 0) and (nxt-ths > 0)):
-                stptdata.append([old_data[:, 0][count], old_data[:, 1][count]])
-        data = np.asarray(stptdata)
+        data = old_data[stationary_points(old_data[:, 1], PARAMS['stationary_hysteresis'])]
     if type == 'warning_check':
         #only checks when in time_spacing mode
         data = new_data
@@ -204,16 +517,574 @@ def degree_velocity(folder, file, type):
     #assumes new final time step is same as previous final:
     new_times = np.append(times[1:], (times[len(times) - 1] + final_time_diff))
     time_diff = new_times - times
-    degree_diff = degrees - old_degrees
-    velocity = (degrees - old_degrees)/(time_diff)
-    strain = degrees/1800#approximately for LEGO LIGO
-
-    dv_data = np.c_[times, velocity, degrees, degree_diff, time_diff, strain] #converts 4 columns to a numpy array
+    dv_data = dv_columns(times, degrees, old_degrees, time_diff)
     warning = False
     if np.max(degrees - old_degrees) > 10000*PARAMS['data_point_spacing']: #coefficient is for motor speed limit
         warning = True
     return dv_data, warning
 
+def stationary_points(strain, hysteresis=0):
+    """
+    Section 6.b: Finds the peaks and troughs of the strain, where the gradient changes sign.
+        Equal neighbouring values (plateaus) are skipped when looking at the gradient, so a
+            flat-topped peak gives one point in the middle of the flat section.
+        hysteresis is a fraction of the largest strain. When above 0, peaks and troughs
+            less than this apart are treated as noise and ignored.
+
+    Returns
+    --------
+    points = integer array, positions of the peaks and troughs in strain
+    """
+    direction = np.sign(np.diff(strain))
+    moving = np.flatnonzero(direction) #ignores plateaus
+    turns = np.flatnonzero(direction[moving[1:]] != direction[moving[:-1]])
+    #a turn lies on the (possibly 1 point long) plateau between two moving steps
+    points = (moving[turns] + 1 + moving[turns + 1])//2
+    if hysteresis > 0 and len(points) > 0:
+        points = hysteresis_filter(strain, points, direction[moving[turns]],
+                                   hysteresis*np.max(np.abs(strain)))
+    return points
+
+def hysteresis_filter(strain, points, kinds, threshold):
+    """
+    Section 6.c: Removes peaks and troughs that are closer than threshold to the turning
+        point before them. Of neighbouring peaks (or troughs) the most extreme is kept.
+        Only loops over the turning points, which are far fewer than the data points.
+
+    Parameters
+    -----------
+    points = integer array, positions of the peaks and troughs in strain
+    kinds = array, 1 for each peak and -1 for each trough
+    threshold = the smallest strain change counted as a movement
+    """
+    kept = hysteresis_points(zip(points, kinds, strain[points]), threshold, strain[0])
+    return np.asarray(list(kept), dtype=int)
+
+def hysteresis_points(turns, threshold, start):
+    """
+    Section 6.c.i: The loop behind section 6.c, written as a generator so the streaming
+        mode (section 6.h) can filter turning points as they are found.
+        The latest kept point is held back until the next one is found, since a more
+            extreme point of the same kind replaces it.
+
+    Parameters
+    -----------
+    turns = iterable of (point, kind, strain value) for each peak and trough
+    threshold = the smallest strain change counted as a movement
+    start = the first strain value in the file
+    """
+    held = None
+    for point, kind, value in turns:
+        if held is not None and kind == held[1]:
+            if (value - held[2])*kind > 0: #further in the same direction
+                held = (point, kind, value)
+        elif abs(value - (held[2] if held is not None else start)) >= threshold:
+            if held is not None:
+                yield held[0]
+            held = (point, kind, value)
+    if held is not None:
+        yield held[0]
+
+def stationary_points_loop(old_data):
+    """Section 6.d: The original stationary point search of section 6, kept to benchmark
+                section 6.b against"""
+    count = 0
+    stptdata = []
+    for i in range(0, (len(old_data[:, 1]) - 2)): #goes twice past to check both ways
+        count += 1
+        ths = old_data[:, 1][count]
+        prv = old_data[:, 1][count-1]
+        nxt = old_data[:, 1][count+1]
+        if ((ths - prv > 0) and (nxt-ths < 0)) or ((ths-prv < 0) and (nxt-ths > 0)):
+            stptdata.append([old_data[:, 0][count], old_data[:, 1][count]])
+    return np.asarray(stptdata)
+
+def benchmark_stationary_points(folder, repeats=5):
+    """
+    Section 6.e: Times the original stationary point loop (section 6.d) against section 6.b
+        for every csv file in folder and prints the speed-up
+    """
+    print('{:<35}{:>10}{:>12}{:>12}{:>10}{:>8}'.format('File', 'Points', 'Loop [ms]', 'NumPy [ms]',
+                                                     'Speed-up', 'Same'))
+    for file in files_in_folder(folder):
+        old_data = np.array(read_csvfile_in_folder(folder, file))
+        st = time.time()
+        for i in range(repeats):
+            looped = stationary_points_loop(old_data)
+        loop_time = (time.time() - st)/repeats
+        st = time.time()
+        for i in range(repeats):
+            found = old_data[stationary_points(old_data[:, 1])]
+        numpy_time = (time.time() - st)/repeats
+        print('{:<35}{:>10}{:>12.2f}{:>12.2f}{:>10.1f}{:>8}'.format(
+            file, len(old_data), loop_time*1000, numpy_time*1000, loop_time/numpy_time,
+            str(len(looped) == len(found) and np.array_equal(looped, found))))
+
+def lowpass_taps(rate, i):
+    """
+    Section 6.m: Windowed-sinc low-pass filter for keeping every i-th point of data with
+        rate points per second (after 'time_scale').
+        Cuts off at half the new rate so the mirror is not asked to follow detail the time
+            spacing cannot show (which would alias). Kept in TAPS for each pair of rates.
+
+    Returns
+    --------
+    taps = array of 16*i + 1 filter coefficients adding up to 1
+    """
+    key = (round(rate, 9), round(rate/i, 9))
+    if key not in TAPS:
+        half = 8*i
+        n = np.arange(-half, half + 1)
+        taps = np.sinc(n/i)*np.blackman(2*half + 1) #sinc(n/i) cuts off at 1/(2i) of the old rate
+        TAPS[key] = taps/np.sum(taps)
+    return TAPS[key]
+
+TAPS = {}
+
+def fir_points(data, taps, first, count, i):
+    """
+    Section 6.n: Filters the strain of data with taps, but only at every i-th point from first
+        up to (not including) count. Points are numbered from len(taps)//2 into data.
+
+    Returns
+    --------
+    points = array of columns: time, filtered strain
+    """
+    half = len(taps)//2
+    centres = np.arange(first, count, i)
+    if len(centres) == 0:
+        return np.empty((0, 2))
+    strain = np.ascontiguousarray(data[first:, 1])
+    #below: each row is the len(taps) strain values around a centre, without copying
+    windows = np.lib.stride_tricks.as_strided(strain, shape=(len(centres), len(taps)),
+                                              strides=(strain.strides[0]*i, strain.strides[0]))
+    return np.c_[data[centres + half, 0], windows.dot(taps)]
+
+def decimate(old_data, i, rate):
+    """
+    Section 6.o: Keeps every i-th point of old_data after low-pass filtering it (section 6.m).
+        The ends are padded with copies of the first and last points.
+
+    Parameters
+    -----------
+    rate = points per second (after 'time_scale') of old_data
+    """
+    taps = lowpass_taps(rate, i)
+    half = len(taps)//2
+    padded = np.concatenate((np.repeat(old_data[:1], half, axis=0), old_data,
+                             np.repeat(old_data[-1:], half, axis=0)))
+    return fir_points(padded, taps, 0, len(old_data), i)
+
+def stream_decimate(chunks, i, rate):
+    """
+    Section 6.o.i: decimate (section 6.o) for the streaming mode (section 6.h). The last
+        len(taps) - 1 points of each chunk are carried over as the filter needs them.
+    """
+    taps = lowpass_taps(rate, i)
+    half = len(taps)//2
+    carry = None
+    row = 0 #number of points already filtered
+    for chunk in chunks:
+        if carry is None:
+            carry = np.repeat(chunk[:1], half, axis=0)
+        data = np.concatenate((carry, chunk))
+        count = len(data) - 2*half #points with all their neighbours available
+        if count > 0:
+            yield fir_points(data, taps, (-row) % i, count, i)
+            row += count
+            carry = data[count:]
+        else:
+            carry = data
+    data = np.concatenate((carry, np.repeat(carry[-1:], half, axis=0)))
+    yield fir_points(data, taps, (-row) % i, len(data) - 2*half, i)
+
+def resample_error(folder, file):
+    """
+    Section 6.p: How far the 'time_spacing' points of each resampling method are from the
+        full waveform, in mirror degrees, when straight lines are drawn between them
+
+    Returns
+    --------
+    errors = dictionary of method: (root mean square error, largest error)
+    """
+    old_data = np.asarray(read_csvfile_in_folder(folder, file))
+    time_total = (np.max(old_data[:, 0]) - np.min(old_data[:, 0]))*PARAMS['time_scale']
+    i = max(1, int((len(old_data)*PARAMS['data_point_spacing'])/time_total))
+    scale = PARAMS['degree_max']*PARAMS['presetbuffer']/np.max(np.abs(old_data[:, 1]))
+    errors = {}
+    for method in ('stride', 'sinc'):
+        if method == 'sinc' and i > 1:
+            points = decimate(old_data, i, len(old_data)/time_total)
+        else:
+            points = old_data[0::i]
+        error = (np.interp(old_data[:, 0], points[:, 0], points[:, 1]) - old_data[:, 1])*scale
+        errors[method] = (np.sqrt(np.mean(error**2)), np.max(np.abs(error)))
+    return errors
+
+class WaveformPyramid(object):
+    """
+    Section 6.q: The waveform at a series of detail levels, each with half the points of the one
+        before, made once per file and shared by the plot, the file buttons and the motor.
+        Each point of a level is a bucket of 2**level points of the file, stored as the time and
+            strain of both its lowest and highest point, so peaks and troughs are never lost.
+        Long files (section 6.h) start at a coarser level so the pyramid stays small.
+
+    Parameters
+    ----------
+    levels = array of columns: time of lowest, lowest strain, time of highest, highest strain,
+        for every bucket of every level one after the other
+    offsets = integer array, where each level starts and ends in levels
+    first_level = the level of the first buckets in levels
+    ends = array of the first and last (time, strain) points of the file
+    samples = number of points in the file
+    """
+    def __init__(self, levels, offsets, first_level, ends, samples):
+        self.levels = levels
+        self.offsets = offsets
+        self.first_level = int(first_level)
+        self.ends = ends
+        self.samples = int(samples)
+        self.nbytes = levels.nbytes + offsets.nbytes + ends.nbytes #for WaveformCache (section 5.a)
+
+    @classmethod
+    def build(cls, chunks, first_level):
+        """
+        Makes the pyramid from chunks of time, strain data. Every chunk but the last must have a
+            multiple of 2**first_level points so the buckets line up.
+        """
+        size = 2**first_level
+        buckets = []
+        first = last = None
+        samples = 0
+        for chunk in chunks:
+            if first is None:
+                first = chunk[0]
+            last = chunk[-1]
+            samples += len(chunk)
+            padding = (-len(chunk)) % size #the last bucket is filled with copies of the last point
+            chunk = np.concatenate((chunk, np.repeat(chunk[-1:], padding, axis=0)))
+            times = chunk[:, 0].reshape(-1, size)
+            strain = chunk[:, 1].reshape(-1, size)
+            rows = np.arange(len(times))
+            lowest = np.argmin(strain, axis=1)
+            highest = np.argmax(strain, axis=1)
+            buckets.append(np.c_[times[rows, lowest], strain[rows, lowest], times[rows, highest], strain[rows, highest]])
+        levels = [np.concatenate(buckets)]
+        while len(levels[-1]) > 1:
+            levels.append(halve_buckets(levels[-1]))
+        offsets = np.cumsum([0] + [len(level) for level in levels])
+        return cls(np.concatenate(levels), offsets, first_level, np.array([first, last]), samples)
+
+    def level_for(self, budget):
+        """The most detailed level with no more than budget points (see points)"""
+        buckets = max(1, (budget - 2)//2) #2 points per bucket and the 2 ends
+        level = int(np.ceil(np.log2(max(1.0, self.samples/buckets))))
+        return min(max(level, self.first_level), self.first_level + len(self.offsets) - 2)
+
+    def points(self, level):
+        """
+        Returns
+        --------
+        points = array of columns: time, strain. The lowest and highest points of each bucket of
+            level in time order, between the first and last points of the file
+        """
+        index = level - self.first_level
+        buckets = self.levels[self.offsets[index]:self.offsets[index + 1]]
+        low_first = (buckets[:, 0] <= buckets[:, 2])[:, None]
+        points = np.empty((len(buckets), 2, 2))
+        points[:, 0] = np.where(low_first, buckets[:, 0:2], buckets[:, 2:4])
+        points[:, 1] = np.where(low_first, buckets[:, 2:4], buckets[:, 0:2])
+        points = np.concatenate((self.ends[:1], points.reshape(-1, 2), self.ends[1:]))
+        return points[np.append(True, np.diff(points[:, 0]) > 0)] #drops repeated points
+
+def halve_buckets(buckets):
+    """Section 6.q.i: Joins neighbouring pairs of buckets of WaveformPyramid (section 6.q)"""
+    if len(buckets) % 2:
+        buckets = np.concatenate((buckets, buckets[-1:]))
+    left = buckets[0::2]
+    right = buckets[1::2]
+    low_left = (left[:, 1] <= right[:, 1])[:, None]
+    high_left = (left[:, 3] >= right[:, 3])[:, None]
+    return np.c_[np.where(low_left, left[:, 0:2], right[:, 0:2]), np.where(high_left, left[:, 2:4], right[:, 2:4])]
+
+def pyramid_path(folder, file):
+    """Section 6.q.ii: The stored WaveformPyramid (section 6.q) of a csv file, kept in 'cache_folder' (section 5.g)"""
+    return cache_path(folder, file, '.skip{}.levels.npz'.format(PARAMS['LINES_TO_SKIP']))
+
+def load_pyramid(folder, file):
+    """
+    Section 6.q.iii: Gives the WaveformPyramid (section 6.q) of a csv file. It is kept in WAVEFORMS
+        (section 5.a) and on disk, made again when the file's modification time changes (as section 5.e)
+    """
+    path = folder+os.sep+file
+    info = os.stat(path)
+    if long_file(folder, file):
+        #below: the largest power of 2 lines that fits in a chunk, so the buckets line up
+        first_level = int(np.log2(PARAMS['stream_chunk_rows']))
+    else:
+        first_level = 1
+    key = file_key(folder, file) + ('pyramid', PARAMS['LINES_TO_SKIP'], first_level)
+    pyramid = WAVEFORMS.get(key)
+    if pyramid is not None:
+        return pyramid
+    stored = pyramid_path(folder, file)
+    try:
+        if os.stat(stored).st_mtime_ns == info.st_mtime_ns:
+            with np.load(stored) as saved:
+                if int(saved['first_level']) == first_level:
+                    pyramid = WaveformPyramid(saved['levels'], saved['offsets'], first_level,
+                                              saved['ends'], saved['samples'])
+    except (OSError, IOError, KeyError, ValueError):
+        pass #not made yet, or unreadable
+    if pyramid is None:
+        if first_level == 1:
+            chunks = [np.asarray(read_csvfile_in_folder(folder, file))]
+        else:
+            chunks = read_csv_chunks(folder, file, 2**first_level)
+        pyramid = WaveformPyramid.build(chunks, first_level)
+        try:
+            write_atomically(stored, lambda tempfile: np.savez(
+                tempfile, levels=pyramid.levels, offsets=pyramid.offsets, first_level=first_level,
+                ends=pyramid.ends, samples=pyramid.samples), info)
+        except (OSError, IOError):
+            pass
+    WAVEFORMS.put(key, pyramid)
+    return pyramid
+
+def pyramid_points(folder, file, budget):
+    """
+    Section 6.q.iv: The time, strain points of a csv file that best show it with no more than
+        budget points, from its WaveformPyramid (section 6.q), or every point if they fit
+    """
+    pyramid = load_pyramid(folder, file)
+    if budget >= pyramid.samples and not long_file(folder, file):
+        return read_csvfile_in_folder(folder, file)
+    return pyramid.points(pyramid.level_for(budget))
+
+def pyramid_turns(folder, file, budget):
+    """
+    Section 6.q.v: The points the 'pyramid' motor mode moves the mirrors to: the peaks and troughs
+        (section 6.b) of pyramid_points (section 6.q.iv), so no more than budget.
+        The lowest and highest points of each bucket are not used themselves, as at coarse levels
+            they can be far apart in strain but very close in time, which no motor could follow.
+    """
+    points = pyramid_points(folder, file, budget)
+    return points[stationary_points(points[:, 1], PARAMS['stationary_hysteresis'])]
+
+def dv_columns(times, degrees, old_degrees, time_diff):
+    """
+    Section 6.f: Puts together the dv_data columns described in section 6
+
+    Parameters
+    -----------
+    times = array, start time of each movement
+    degrees = array, degree position at the end of each movement
+    old_degrees = array, degree position at the start of each movement
+    time_diff = array, time each movement takes
+    """
+    degree_diff = degrees - old_degrees
+    velocity = (degrees - old_degrees)/(time_diff)
+    strain = degrees/1800#approximately for LEGO LIGO
+    return np.c_[times, velocity, degrees, degree_diff, time_diff, strain] #converts the columns to a numpy array
+
+def long_file(folder, file):
+    """Section 6.g: True if the file is too large to be read all at once and should be streamed (section 6.h)"""
+    return os.path.getsize(folder+os.sep+file) > PARAMS['stream_above_bytes']
+
+def stream_dv_data(folder, file, type):
+    """
+    Section 6.h: Gives the same dv_data as degree_velocity (section 6) but as a series of smaller
+        arrays, reading PARAMS['stream_chunk_rows'] lines of the file at a time.
+        Memory use does not depend on the length of the file. The file is read twice, once
+            to find the largest strain used for scaling and once to give the data, unless a header
+            line declares 'peak_strain=<value>'.
+        Times in the file must be in ascending order.
+
+    Yields
+    ----------
+    dv_data = array of columns:times, velocity, degrees, degree differences, time differences and strain
+    """
+    info = waveform_info(folder, file)
+    peak = info['peak']
+    if peak is None:
+        peak = 0
+        for points in select_points(folder, file, type, info):
+            if len(points) > 0:
+                peak = max(peak, np.max(np.abs(points[:, 1])))
+    scale = PARAMS['degree_max']*PARAMS['presetbuffer']/peak
+    start = None
+    previous = None #the last point, which needs the next point's time for its time difference
+    old_degree = 0
+    time_diff = None
+    for points in select_points(folder, file, type, info):
+        if len(points) == 0:
+            continue
+        if start is None:
+            start = points[0, 0] #time 0 is the first point used, as in section 6
+        times = (points[:, 0] - start)*PARAMS['time_scale']
+        degrees = points[:, 1]*scale
+        if previous is not None:
+            times = np.append(previous[0], times)
+            degrees = np.append(previous[1], degrees)
+        time_diff = np.diff(times)
+        if len(time_diff) > 0:
+            yield dv_columns(times[:-1], degrees[:-1], np.append(old_degree, degrees[:-2]), time_diff)
+            old_degree = degrees[-2]
+        previous = (times[-1], degrees[-1])
+    #assumes the final time step is the same as the previous final, as in section 6
+    yield dv_columns(np.array([previous[0]]), np.array([previous[1]]), np.array([old_degree]), time_diff[-1:])
+
+def stream_warning(folder, file):
+    """Section 6.h.i: The 'warning_check' of section 6 worked out from the streamed data (section 6.h)"""
+    largest = max(np.max(dv_data[:, 3]) for dv_data in stream_dv_data(folder, file, 'warning_check'))
+    return bool(largest > 10000*PARAMS['data_point_spacing']) #coefficient is for motor speed limit
+
+def speed_warning(folder, file):
+    """Section 6.h.ii: True if the motor cannot achieve the speed the file needs. Long files are streamed.
+                With a 'motion_profile' in use (section 12.a.iii) this is whether any movement of the file
+                    in PARAMS['mode'] needs more acceleration or power than the motor has (section 12.m)"""
+    if profile_used():
+        if long_file(folder, file):
+            chunks = stream_dv_data(folder, file, PARAMS['mode'])
+        else:
+            chunks = [degree_velocity(folder, file, PARAMS['mode'])[0]]
+        return not all(profile_feasible(dv_schedule(simplify_dv_data(dv_data, PARAMS['simplify_tolerance'])[0]))
+                       for dv_data in chunks)
+    if long_file(folder, file):
+        return stream_warning(folder, file)
+    return degree_velocity(folder, file, 'warning_check')[1]
+
+def waveform_info(folder, file):
+    """
+    Section 6.i: A fast look over the file without reading the data, used by section 6.h
+
+    Returns
+    --------
+    info = dictionary of
+        'rows' = number of data lines
+        'start', 'end' = first and last times in the file
+        'peak' = largest strain declared in a header line as 'peak_strain=<value>', otherwise None
+    """
+    path = folder+os.sep+file
+    peak = None
+    with open(path, 'rb') as csvfile:
+        header = [csvfile.readline() for i in range(PARAMS['LINES_TO_SKIP'])]
+        first = csvfile.readline()
+        rows = 0
+        block = tail = first
+        while block: #counts line endings without reading the numbers
+            rows += block.count(b'\n')
+            tail = block
+            block = csvfile.read(1024*1024)
+        if tail and not tail.endswith(b'\n'):
+            rows += 1 #the final line has no line ending
+        csvfile.seek(max(0, csvfile.tell() - 4096))
+        last = [line for line in csvfile.read().splitlines() if line.strip()][-1]
+    for line in header:
+        for field in line.decode('utf-8', 'replace').replace(',', ' ').split():
+            if field.startswith('peak_strain='):
+                peak = float(field.split('=')[1])
+    return {'rows': rows, 'start': float(first.split(b',')[0]), 'end': float(last.split(b',')[0]),
+            'peak': peak}
+
+def read_csv_chunks(folder, file, rows=None):
+    """Section 6.j: Yields the time, strain data rows (by default PARAMS['stream_chunk_rows']) lines at a time"""
+    if rows is None:
+        rows = PARAMS['stream_chunk_rows']
+    with open(folder+os.sep+file) as csvfile:
+        for i in range(PARAMS['LINES_TO_SKIP']):
+            csvfile.readline()
+        while True:
+            lines = [line for line in itertools.islice(csvfile, rows) if line.strip()]
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=',', ndmin=2)
+
+def select_points(folder, file, type, info):
+    """
+    Section 6.k: Yields the time, strain points section 6 would use for type, a chunk at a time
+
+    Parameters
+    -----------
+    info = dictionary from waveform_info (section 6.i)
+    """
+    if type == 'pyramid':
+        yield pyramid_turns(folder, file, PARAMS['pyramid_segments'])
+        return
+    if type == 'motor_stationary_points':
+        turns = stream_turns(read_csv_chunks(folder, file))
+        if PARAMS['stationary_hysteresis'] > 0:
+            peak = info['peak']
+            if peak is None:
+                peak = max(np.max(np.abs(chunk[:, 1])) for chunk in read_csv_chunks(folder, file))
+            kept = hysteresis_points(((tuple(turn[:2]), turn[2], turn[1]) for turn in stream_turn_rows(turns)),
+                                     PARAMS['stationary_hysteresis']*peak, first_strain(folder, file))
+            for chunk in chunked(kept):
+                yield np.asarray(chunk)
+        else:
+            for chunk in turns:
+                yield chunk[:, :2]
+        return
+    #below: as in section 6, time_spacing and warning_check keep every i-th line
+    i = 1
+    if type != 'all_points':
+        time_total = (info['end'] - info['start'])*PARAMS['time_scale']
+        i = max(1, int((info['rows']*PARAMS['data_point_spacing'])/time_total))
+    if i > 1 and PARAMS['resample_method'] == 'sinc':
+        for chunk in stream_decimate(read_csv_chunks(folder, file), i, info['rows']/time_total):
+            yield chunk
+        return
+    row = 0
+    for chunk in read_csv_chunks(folder, file):
+        yield chunk[(-row) % i::i] #keeps the lines whose number in the file divides by i
+        row += len(chunk)
+
+def stream_turns(chunks):
+    """
+    Section 6.l: The peaks and troughs of section 6.b found one chunk at a time.
+        The end of each chunk, from its last change in strain, is carried over to the next
+            so turning points across the join are found once.
+
+    Yields
+    --------
+    turns = array of columns: time, strain and 1 for a peak or -1 for a trough
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = np.concatenate((carry, chunk))
+        direction = np.sign(np.diff(chunk[:, 1]))
+        moving = np.flatnonzero(direction)
+        if len(moving) == 0:
+            carry = chunk[-1:] #no movement yet, so no turning point can involve the earlier points
+            continue
+        changes = np.flatnonzero(direction[moving[1:]] != direction[moving[:-1]])
+        points = (moving[changes] + 1 + moving[changes + 1])//2
+        yield np.c_[chunk[points], direction[moving[changes]]]
+        carry = chunk[moving[-1]:]
+
+def stream_turn_rows(turns):
+    """Section 6.l.i: Yields the turning points of section 6.l one row at a time"""
+    for chunk in turns:
+        for turn in chunk:
+            yield turn
+
+def chunked(rows):
+    """Section 6.l.ii: Groups rows into lists of at most PARAMS['stream_chunk_rows']"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == PARAMS['stream_chunk_rows']:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def first_strain(folder, file):
+    """Section 6.l.iii: The first strain value in the file"""
+    for chunk in read_csv_chunks(folder, file):
+        return chunk[0, 1]
+
 class Window():
     """Section 7: Class for describing the Widget Window dimensions, positioning and title"""
     title = 'LEGO-LIGO'#Widget title
@@ -326,6 +1197,16 @@ class CreateButton():
         buttonname.setFixedSize(buttonwidth, buttonheight)
         buttonname.move(Window.width*9/10, Window.height*32/40)
         buttonname.setToolTip("Home")
+    def playbackstyle(self, buttonname, name, yposition, tooltip):
+        """For the buttons controlling a playing preset, in a column between the exit and home buttons"""
+        buttonwidth = Window.height/8
+        buttonheight = Window.height/8
+        buttonname.setStyleSheet("background-color: rgba(0,0,0,0)")
+        buttonname.setIcon(QIcon(IMAGE_LOCATION+os.sep+'{}.png'.format(name)))
+        buttonname.setIconSize(QSize(buttonwidth, buttonheight))
+        buttonname.setFixedSize(buttonwidth, buttonheight)
+        buttonname.move(Window.width*9/10, Window.height*(1 + 6*yposition)/40)
+        buttonname.setToolTip(tooltip)
     def tickstyle(self, buttonname):
         """for the set calibration button"""
         buttonwidth = Window.height/8
@@ -415,11 +1296,11 @@ def plot(self, file, clear=False):
             self.fig = Figure(figsize=((Window.width - 100)/dpi, (Window.height - Window.fnt16hght)/dpi),
                               dpi=dpi, facecolor='None')#in inches
             if RP is True:
-                self.dv_data = degree_velocity(PARAMS['RPFOLDER'], files_in_folder(PARAMS['\
-RPFOLDER'])[file], 'all_points')[0] #ensures only called once
+                self.dv_data = plot_data(PARAMS['RPFOLDER'], files_in_folder(PARAMS['\
+RPFOLDER'])[file]) #ensures only called once
             else:
-                self.dv_data = degree_velocity(PARAMS['FOLDER'], files_in_folder(PARAMS['\
-FOLDER'])[file], 'all_points')[0] #ensures only called once
+                self.dv_data = plot_data(PARAMS['FOLDER'], files_in_folder(PARAMS['\
+FOLDER'])[file]) #ensures only called once
             FigureCanvas.__init__(self, self.fig)
             self.setParent(parent)
 
@@ -447,68 +1328,708 @@ FOLDER'])[file], 'all_points')[0] #ensures only called once
             self.show()
     PlotCanvas(self)
 
+def plot_data(folder, file):
+    """Section 10.a: The dv_data (section 6) to plot. Uses the level of the waveform pyramid (section 6.q)
+                with about 2 points for each pixel across the screen, as more could not be seen"""
+    return transform_data(pyramid_points(folder, file, 2*Window.width), 'all_points')[0]
+
+def thumbnail(folder, file, width, height):
+    """Section 10.b: A small white line drawing of the waveform for the file buttons, from the
+                waveform pyramid (section 6.q) level with about one point per pixel"""
+    points = pyramid_points(folder, file, width)
+    times = points[:, 0] - points[0, 0]
+    strain = points[:, 1]/max(np.max(np.abs(points[:, 1])), 1e-300)
+    xs = times*(width - 1)/max(times[-1], 1e-300)
+    ys = (1 - strain)*(height - 1)/2
+    pixmap = QPixmap(width, height)
+    pixmap.fill(Qt.transparent)
+    painter = QPainter(pixmap)
+    painter.setPen(QPen(QColor('white')))
+    painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())]))
+    painter.end()
+    return pixmap
+
 def position_tracker(mapower, matime, mbpower, mbtime):
     """Section 11: Keeps track of approximate motor positions by altering global variables MXPos and MYPos
-                This is very rough and is a reason for the constant requirement of re-calibrating the motors"""
-    madegree = mapower*matime*PARAMS['pwrcoef']
-    mbdegree = mbpower*mbtime*PARAMS['pwrcoef']
+                This is very rough and is a reason for the constant requirement of re-calibrating the motors
+                With the encoders (section 11.a) these are the positions the mirrors are moved to
+                The speed of each motor comes from section 11.b"""
+    madegree = float(MOTORS.speed(0, mapower))*matime
+    mbdegree = float(MOTORS.speed(1, mbpower))*mbtime
     global MXPos
     MXPos -= madegree
     global MYPos
     MYPos -= mbdegree
 
+class PositionService(object):
+    """
+    Section 11.a: Measures the mirror positions with the motor encoders, which BrickPiUpdateValues
+        reads on every update at 2 counts to a degree. Positions go the same way as MXPos and MYPos
+        (set by 'encoder_sign') and are 0 where the mirrors were calibrated.
+        MXPos and MYPos (section 11) are then where the mirrors should be, and drive (section 14.a)
+            keeps moving the motors until the encoders agree, so errors do not build up.
+        Without the encoders ('position_feedback' off, or no BrickPi) section 11 is used on its own.
+    """
+    def __init__(self):
+        self.zeros = {} #encoder count at the 0 position of each port, the first reading until calibrated
+        self.others = {} #as MXPos and MYPos, for the mirrors on 'extra_ports'
+        self.homed = False #if both mirrors have been calibrated against their endstops (section 14.h)
+
+    def active(self):
+        try:
+            return (PARAMS['position_feedback'] is True
+                    and None not in (BrickPi.Encoder[PORT_A], BrickPi.Encoder[PORT_B]))
+        except NameError: #BrickPi is not installed
+            return False
+
+    def degrees(self, port, estimate):
+        """The measured position of the mirror on port, or estimate (from section 11) without the encoders"""
+        if not self.active() or BrickPi.Encoder[port] is None:
+            return estimate
+        if port not in self.zeros:
+            self.enable([port]) #so the zero is not an old count
+        count = BrickPi.Encoder[port]
+        return PARAMS['encoder_sign']*(count - self.zeros.setdefault(port, count))/2
+
+    def enable(self, ports):
+        """Enables the motors on ports. If any were off their encoders are then read once, as with
+            SKIP_IDLE_CORES (BrickPi.py) a core with nothing enabled is not updated and its counts are old"""
+        off = [port for port in ports if not BrickPi.MotorEnable[port]]
+        for port in off:
+            BrickPi.MotorEnable[port] = 1
+        if off:
+            BrickPiUpdateValues()
+
+    def expected(self, port):
+        """Where the mirror on port should be: MXPos or MYPos (section 11) for PORT_A and PORT_B"""
+        if port == PORT_A:
+            return MXPos
+        if port == PORT_B:
+            return MYPos
+        return self.others.get(port, 0)
+
+    def set_expected(self, port, position):
+        global MXPos
+        global MYPos
+        if port == PORT_A:
+            MXPos = position
+        elif port == PORT_B:
+            MYPos = position
+        else:
+            self.others[port] = position
+
+    def mirrors(self):
+        """The measured MXPos, MYPos"""
+        if not self.active():
+            return MXPos, MYPos
+        return self.degrees(PORT_A, MXPos), self.degrees(PORT_B, MYPos)
+
+    def reached(self, port, target, estimate):
+        """If the mirror on port is within 'position_tolerance' of target"""
+        if not self.active():
+            return estimate == target
+        return abs(target - self.degrees(port, estimate)) <= PARAMS['position_tolerance']
+
+    def power(self, port, speed, target):
+        """The motor power for port: speed, corrected by how far the mirror is from target"""
+        error = target - self.degrees(port, target)
+        power = speed - PARAMS['position_gain']*error #more power makes the position go down (section 11)
+        if abs(error) > PARAMS['position_tolerance'] and abs(power) < PARAMS['position_min_power']:
+            power = -np.sign(error)*PARAMS['position_min_power']
+        return int(round(max(-255, min(255, power))))
+
+    def calibrate(self, port, position):
+        """Calibrates one port: the mirror is at position now (see section 14.h)"""
+        self.set_expected(port, position)
+        if self.active():
+            self.enable([port])
+        if self.active() and BrickPi.Encoder[port] is not None:
+            self.zeros[port] = BrickPi.Encoder[port] - 2*PARAMS['encoder_sign']*position
+
+    def zero(self):
+        """Calibrates: the current positions become 0"""
+        global MXPos
+        global MYPos
+        MXPos = 0
+        MYPos = 0
+        self.others = {}
+        if self.active():
+            self.enable([PORT_A, PORT_B] + PARAMS['extra_ports'])
+            self.zeros = dict((port, BrickPi.Encoder[port]) for port in [PORT_A, PORT_B] + PARAMS['extra_ports']
+                              if BrickPi.Encoder[port] is not None)
+
+POSITIONS = PositionService()
+
+class MotorModel(object):
+    """
+    Section 11.b: How fast the motor on each port turns for a given power, so each motor's own
+        speed and its dead zone (powers too small to turn it) are allowed for. Measured by
+        characterise (section 14.g) and kept in the 'motor_profile' file, so it is only done once.
+        The speed between the measured powers is interpolated from the table of section 14.g.ii, and
+            carried on along the last two measurements above them, so a motor that is not linear is
+            followed. The fitted gain*(power - dead_zone) of section 14.g.i is kept to describe it.
+        Without a profile a motor moves gain*power degrees a second, with gain 'pwrcoef' and no
+            dead zone, as section 11 always had it.
+        Speeds are signed like the power, so a positive speed makes the mirror position go down.
+        Ports are numbered as in BrickPi.py: 0 is PORT_A (mirror X) and 1 is PORT_B (mirror Y).
+    """
+    def __init__(self):
+        self.ports = {} #port: (gain, dead_zone)
+        self.tables = {} #port: (power, speed), as section 14.g.ii
+
+    def load(self, path):
+        """Reads the profile at path, if there is one"""
+        self.ports = {}
+        self.tables = {}
+        if path and os.path.isfile(path):
+            with open(path) as profile:
+                profile = json.load(profile)
+            self.ports = dict((int(port), (fit['gain'], fit['dead_zone'])) for port, fit in profile['ports'].items())
+            self.tables = dict((int(port), motor_table(np.array(rows, dtype=float)))
+                               for port, rows in profile['measurements'].items())
+
+    def save(self, path, fits, measurements):
+        """Writes fits (port: (gain, dead_zone)) and the measurements they came from to path, then uses them"""
+        profile = {'ports': dict((str(port), {'gain': gain, 'dead_zone': dead_zone}) for port, (gain, dead_zone) in fits.items()),
+                   'measurements': dict((str(port), rows) for port, rows in measurements.items()),
+                   'made': time.strftime('%Y-%m-%d %H:%M:%S')}
+        write_atomically(path, lambda profilefile: profilefile.write(json.dumps(profile, indent=1).encode()))
+        self.load(path)
+
+    def fit(self, port):
+        """The (gain, dead_zone) of port"""
+        return self.ports.get(port, (PARAMS['pwrcoef'], 0))
+
+    def proportional(self, port):
+        """The gain of port if it turns at gain*power, otherwise None"""
+        gain, dead_zone = self.fit(port)
+        return gain if dead_zone == 0 and port not in self.tables else None
+
+    def speed(self, port, power):
+        """Degrees a second the motor on port turns at power, works on arrays"""
+        power = np.asarray(power, dtype=float)
+        if port in self.tables:
+            powers, speeds = self.tables[port]
+            return np.sign(power)*interpolate(np.abs(power), powers, speeds)
+        gain, dead_zone = self.fit(port)
+        return np.sign(power)*gain*np.maximum(np.abs(power) - dead_zone, 0)
+
+    def power(self, port, speed):
+        """The (unrounded) power that turns the motor on port at speed, works on arrays. 0 stays 0"""
+        speed = np.asarray(speed, dtype=float)
+        if port in self.tables:
+            powers, speeds = self.tables[port]
+            return np.sign(speed)*interpolate(np.abs(speed), speeds, powers)
+        gain, dead_zone = self.fit(port)
+        return np.sign(speed)*(dead_zone*(speed != 0) + np.abs(speed)/gain)
+
+    def columns(self, function, values):
+        """self.speed or self.power of an array with columns: port A, port B"""
+        return np.column_stack([function(0, values[:, 0]), function(1, values[:, 1])])
+
+    def key(self):
+        """The fits and tables, for schedule_params (section 12.c)"""
+        return (tuple(sorted(self.ports.items())),
+                tuple(sorted((port, tuple(np.concatenate(table).tolist())) for port, table in self.tables.items())))
+
+def interpolate(x, xp, fp):
+    """Section 11.b.i: np.interp of x (array), carried on in a straight line past the last of xp"""
+    slope = (fp[-1] - fp[-2])/(xp[-1] - xp[-2])
+    return np.where(x > xp[-1], fp[-1] + slope*(x - xp[-1]), np.interp(x, xp, fp))
+
+MOTORS = MotorModel()
+MOTORS.load(PARAMS['motor_profile'])
+
 def movemotor(self, file):
     """Section 12: used for providing the motor function (section 14) with the correct information
                 when in preset mode.
             Takes the dv_data and iterates through to provide the motor with enough
-                power and for long enough to make the necessary movement"""
-    self.dv_data = degree_velocity(PARAMS['RPFOLDER'], files_in_folder(PARAMS['\
-RPFOLDER'])[file], PARAMS['mode'])[0] #ensures only called once
-    mapower = (self.dv_data[:, 3])/(self.dv_data[:, 4]*PARAMS['pwrcoef'])
-    count = 0
-    for i in mapower:
-        motor(i, self.dv_data[:, 4][count], -mapower[count], self.dv_data[:, 4][count], 'preset', 'GraphUI') #dv_data[:, 4] is time_diff
-        count += 1
+                power and for long enough to make the necessary movement
+            Long files are streamed (section 6.h) so only part of the dv_data is held at once,
+                and can only be seeked (section 14.d) within the part being played
+            Run by the motor worker (section 14.c), which it tells which file it is playing,
+                how far through it is and, once it has finished, how the timing went (section 14.b)"""
+    name = files_in_folder(PARAMS['RPFOLDER'])[file]
+    self.motors.nowplaying.emit(file)
+    TIMER.reset()
+    if long_file(PARAMS['RPFOLDER'], name):
+        info = waveform_info(PARAMS['RPFOLDER'], name)
+        total = (info['end'] - info['start'])*PARAMS['time_scale']
+        for self.dv_data in stream_dv_data(PARAMS['RPFOLDER'], name, PARAMS['mode']):
+            if CONTROL.aborted.is_set():
+                break
+            self.dv_data = simplify_dv_data(self.dv_data, PARAMS['simplify_tolerance'])[0]
+            start = self.dv_data[0, 0]
+            play_schedule(dv_schedule(self.dv_data), progress=lambda played: self.motors.moved(start + played, total),
+                          offset=start)
+    else:
+        #precompiled by section 12.a, so no calculation is needed before the motors move
+        schedule = load_schedule(PARAMS['RPFOLDER'], name, PARAMS['mode'])
+        total = float(np.sum(schedule['duration'] + PARAMS['stop_buffer']))
+        play_schedule(schedule, progress=lambda played: self.motors.moved(played, total))
+    self.motors.timing.emit(TIMER.summary())
+
+def play_next(self, file):
+    """Section 12.n: Plays a file of a playlist (section 15.e) straight on from the one before, from
+            wherever the mirrors are. It has been prepared while the one before played (section 14.f),
+            so it starts without a pause. Skipped, and shown on the status bar, if the motor cannot achieve
+            the speed it needs"""
+    name = files_in_folder(PARAMS['RPFOLDER'])[file]
+    if self.prefetcher.warning(PARAMS['RPFOLDER'], name):
+        self.motors.skipped.emit(file)
+        return
+    movemotor(self, file)
+
+def compile_schedule(folder, file, mode):
+    """
+    Section 12.a: Works out everything movemotor (section 12) needs to play a file, so it can
+        be done before the file is chosen (see 'compile' in section 17)
+
+    Returns
+    ----------
+    schedule = dictionary of
+        'power' = integer array of columns: port A power, port B power, for each movement
+        'duration' = array, time each movement takes in seconds
+        'position' = array of columns: expected MXPos, MYPos at the end of each movement,
+            relative to the positions when the schedule starts
+        'warning' = if the motor cannot achieve the required power (section 6)
+        'segments' = number of movements before simplifying (section 12.h)
+        'max_error' = largest difference, in degrees, simplifying made to the mirror position
+    """
+    if long_file(folder, file):
+        chunks = list(stream_dv_data(folder, file, mode))
+    else:
+        chunks = [degree_velocity(folder, file, mode)[0]]
+    dv_data = np.concatenate(chunks)
+    segments = len(dv_data)
+    dv_data, max_error = simplify_dv_data(dv_data, PARAMS['simplify_tolerance'])
+    schedule = dv_schedule(dv_data)
+    if profile_used():
+        warning = not profile_feasible(schedule)
+    else:
+        warning = speed_warning(folder, file)
+    schedule.update(warning=warning, segments=segments, max_error=max_error)
+    return schedule
+
+def profile_feasible(schedule):
+    """Section 12.a.ii: If every movement of a schedule can be made within the motor's limits (section 12.m)"""
+    return bool(np.all(schedule_profile(schedule)[2]))
+
+def profile_used():
+    """Section 12.a.iii: If presets are shaped by a 'motion_profile' (section 12.m), which is only done
+                when they are played as 'ticks' (section 12.k)"""
+    return PARAMS['preset_player'] == 'ticks' and PARAMS['motion_profile'] != 'constant'
+
+def dv_schedule(dv_data):
+    """Section 12.a.i: The 'power', 'duration' and 'position' of a schedule (section 12.a) for dv_data (section 6).
+                The power for each speed comes from each motor's own model (section 11.b)"""
+    speed = dv_data[:, 3]/dv_data[:, 4]
+    power = np.round(MOTORS.columns(MOTORS.power, np.c_[speed, -speed])).astype(int) #as motor (section 14) rounds it
+    #below: as position_tracker (section 11) works it out
+    position = -np.cumsum(MOTORS.columns(MOTORS.speed, power)*dv_data[:, 4:5], axis=0)
+    return {'power': power, 'duration': dv_data[:, 4].copy(), 'position': position}
+
+def schedule_path(folder, file, mode):
+    """Section 12.b: The precompiled schedule of a csv file for mode, kept in 'cache_folder' (section 5.g)"""
+    return cache_path(folder, file, '.{}.npz'.format(mode))
+
+def schedule_params(mode):
+    """Section 12.c: The PARAMS a schedule was made with, so one made with old PARAMS is not used"""
+    return repr((mode, PARAMS['pwrcoef'], PARAMS['simplify_tolerance'], PARAMS['preset_player'],
+                 PARAMS['motion_profile'], PARAMS['max_acceleration'], MOTORS.key())
+                + tuple(PARAMS[name] for name in DV_PARAMS))
+
+def save_schedule(folder, file, mode):
+    """Section 12.d: Compiles (section 12.a) and stores the schedule of a csv file for mode"""
+    schedule = compile_schedule(folder, file, mode)
+    info = os.stat(folder+os.sep+file)
+    write_atomically(schedule_path(folder, file, mode), lambda tempfile: np.savez(
+        tempfile, source=np.array([info.st_mtime_ns, info.st_size]), params=np.array(schedule_params(mode)),
+        **schedule))
+    return schedule
+
+def load_schedule(folder, file, mode):
+    """
+    Section 12.e: Gives the schedule (section 12.a) of a csv file for mode.
+        A stored schedule is used if it was made from the current file with the current PARAMS,
+            otherwise it is compiled and stored again.
+    """
+    key = file_key(folder, file) + ('schedule', schedule_params(mode))
+    schedule = WAVEFORMS.get(key)
+    if schedule is not None:
+        return schedule
+    info = os.stat(folder+os.sep+file)
+    schedule = None
+    try:
+        with np.load(schedule_path(folder, file, mode)) as stored:
+            if (list(stored['source']) == [info.st_mtime_ns, info.st_size]
+                    and str(stored['params']) == schedule_params(mode)):
+                schedule = dict((name, stored[name]) for name in ('power', 'duration', 'position'))
+                schedule['warning'] = bool(stored['warning'])
+                schedule['segments'] = int(stored['segments'])
+                schedule['max_error'] = float(stored['max_error'])
+    except (OSError, IOError, KeyError, ValueError):
+        pass #not compiled yet, or unreadable
+    if schedule is None:
+        try:
+            schedule = save_schedule(folder, file, mode)
+        except (OSError, IOError): #folder cannot be written to
+            schedule = compile_schedule(folder, file, mode)
+    WAVEFORMS.put(key, schedule)
+    return schedule
+
+def preset_warning(folder, file):
+    """Section 12.e.i: True if the motor cannot achieve the speed a preset file needs, checked before it is played.
+                From its stored schedule (section 12.e), except for long files, which movemotor (section 12)
+                    streams rather than compiling whole, so they are streamed through section 6.h.ii here too"""
+    if long_file(folder, file):
+        return speed_warning(folder, file)
+    return load_schedule(folder, file, PARAMS['mode'])['warning']
+
+def play_schedule(schedule, UI='GraphUI', progress=None, offset=0):
+    """Section 12.f: Moves the motors through a schedule (section 12.a). Converted to plain
+                python numbers first so no numpy work is done between movements.
+                progress is called with the seconds played (with the 'stop_buffer's) after each movement.
+                Paused, seeked and aborted by CONTROL (section 14.d), part way through a movement by
+                    section 14.a.i and then here before the next movement. Seek times are
+                    offset seconds ahead of the schedule's own, e.g. for a part of a streamed file
+                With 'preset_player' as 'ticks' the schedule is played by section 12.l instead"""
+    if PARAMS['preset_player'] == 'ticks' and RP is True:
+        play_ticks(tick_schedule(schedule, PARAMS['motor_update_rate']), progress, offset)
+        return
+    power = schedule['power'].tolist()
+    duration = schedule['duration'].tolist()
+    ends = np.cumsum(schedule['duration'] + PARAMS['stop_buffer']) #index of the movements by time
+    starts = np.concatenate([[[MXPos, MYPos]], schedule['position'] + [MXPos, MYPos]]) #positions at each movement
+    movement = 0
+    while movement < len(duration):
+        CONTROL.playing.wait()
+        if CONTROL.aborted.is_set():
+            break
+        seek = CONTROL.take_seek()
+        if seek is not None:
+            movement = int(np.searchsorted(ends, seek - offset, side='right'))
+            movement = min(max(movement, 0), len(duration) - 1)
+            move_axes({PORT_A: starts[movement][0], PORT_B: starts[movement][1]}, PARAMS['return_pwr'])
+        motor(power[movement][0], duration[movement], power[movement][1], duration[movement], 'preset', UI)
+        movement += 1
+        if progress is not None:
+            progress(ends[movement - 1])
+
+def compile_folder(folder, modes):
+    """Section 12.g: Stores the schedules of every csv file in folder for each mode and prints a summary"""
+    for file in files_in_folder(folder):
+        for mode in modes:
+            st = time.time()
+            schedule = save_schedule(folder, file, mode)
+            print('{:<35}{:<25}{:>6} ->{:>6} movements, max error{:>6.2f} degrees{:>7.1f} s{}'.format(
+                file, mode, schedule['segments'], len(schedule['duration']), schedule['max_error'],
+                time.time() - st, '  SPEED WARNING' if schedule['warning'] else ''))
+
+def tick_schedule(schedule, rate):
+    """
+    Section 12.k: Works out the motor powers for every update of a schedule (section 12.a), rate
+        updates a second, so section 12.l only has to send them.
+        Each movement is followed by 'stop_buffer' seconds at 0 power, as in section 14.a, or with
+            a 'motion_profile' is shaped by section 12.m, which starts and ends at 0 power by itself.
+        Where the mirrors should be is worked out for the start of every update, by the time from the
+            start of the schedule, and each update is given the power that moves them between these
+            (section 12.k.i). What is lost rounding to whole updates and whole powers is made up in the
+            next update, so it does not add up over the movements.
+
+    Returns
+    --------
+    ticks = dictionary of
+        'power' = integer array of columns: port A power, port B power, for each update
+        'position' = array of columns: where MXPos, MYPos are at each update with these powers
+            (section 11.b), relative to the positions when the schedule starts
+        'rate' = updates a second
+        'end' = MXPos, MYPos at the end with these powers, relative to the start. For a schedule the
+            motors can achieve, within an update's rounding of the schedule's last 'position'
+    """
+    duration = schedule['duration']
+    if len(duration) == 0:
+        return {'power': np.zeros((0, 2), dtype=int), 'position': np.zeros((0, 2)), 'rate': rate, 'end': np.zeros(2)}
+    shape = PARAMS['motion_profile']
+    starts = np.append(0, np.cumsum(duration + (PARAMS['stop_buffer'] if shape == 'constant' else 0)))
+    times = np.arange(int(np.ceil(starts[-1]*rate)) + 1)/rate #start of each update, then the end of the last
+    movement = np.minimum(np.searchsorted(starts, times, side='right') - 1, len(duration) - 1)
+    elapsed = (times - starts[movement])[:, None]
+    if shape == 'constant':
+        speed = MOTORS.columns(MOTORS.speed, schedule['power'])
+        gone = np.minimum(elapsed, duration[movement][:, None]) #seconds moved at speed
+        whole = duration[:, None]
+    else:
+        peak, ramp, feasible = schedule_profile(schedule)
+        speed = peak*PARAMS['pwrcoef'] #as section 11.b, at the peak of each movement
+        gone = profile_distance(elapsed, duration[movement][:, None], ramp[movement], shape)
+        whole = duration[:, None] - ramp
+    #below: positions at the start of each movement, then at the start of each update
+    before = np.concatenate([np.zeros((1, 2)), -np.cumsum(speed*whole, axis=0)])
+    wanted = before[movement] - speed[movement]*gone
+    power = np.column_stack([carry_powers(-np.diff(wanted[:, port])*rate, port) for port in (0, 1)])
+    position = np.concatenate([np.zeros((1, 2)), -np.cumsum(MOTORS.columns(MOTORS.speed, power), axis=0)/rate])
+    return {'power': power, 'position': position[:-1], 'rate': rate, 'end': position[-1]}
+
+def carry_powers(speed, port):
+    """
+    Section 12.k.i: Whole powers, no more than 255, for the motor on port to turn at speed (array, degrees
+        a second as section 11.b) in each update. Each update is given whichever power (or 0) turns it
+        nearest its speed, and the difference is added to the speed of the next update.
+        For a motor that turns at gain*power the powers made up to each update are then the degrees
+            asked for by then, rounded, so they are worked out at once from the cumulative sum. Otherwise
+            (a dead zone, a measured motor or a power more than 255) each update depends on the one before,
+            so it is looped over on plain python numbers, with the speed of every whole power looked up.
+    """
+    gain = MOTORS.proportional(port)
+    if gain:
+        powers = np.diff(np.append(0, np.floor(np.cumsum(speed)/gain + 0.5))).astype(int)
+        if len(powers) == 0 or np.max(np.abs(powers)) <= 255:
+            return powers
+    turns = MOTORS.speed(port, np.arange(256)).tolist() #MOTORS.speed (section 11.b) of each whole power
+    powers = []
+    owed = 0.0
+    for wanted in speed.tolist():
+        wanted += owed
+        sign = 1 if wanted > 0 else -1
+        above = min(bisect.bisect_left(turns, abs(wanted)), 255) #slowest power at least as fast
+        power = min((0, max(above - 1, 0), above), key=lambda power: abs(abs(wanted) - turns[power]))
+        owed = wanted - sign*turns[power]
+        powers.append(sign*power)
+    return np.array(powers, dtype=int)
+
+def motion_profile(power, duration, acceleration, shape):
+    """
+    Section 12.m: Shapes each movement's power so it speeds up and slows down no faster than
+        acceleration (power per second) and never needs more than the motor's 255, while moving
+        the same number of degrees as the constant power of the schedule (section 12.a) in the
+        same time. Worked out for every movement at once.
+        'trapezoid' ramps the power in straight lines, 's-curve' eases in and out of the ramps
+            (as a sine squared), which takes longer for the same acceleration.
+
+    Parameters
+    -----------
+    power = array, constant power of each movement (mean power of the shaped one)
+    duration = array, time each movement takes in seconds
+    shape = 'trapezoid' or 's-curve'
+
+    Returns
+    --------
+    peak = array, the power reached in the middle of each movement
+    ramp = array, seconds spent speeding up, and slowing down, in each movement
+    feasible = boolean array, False where the movement cannot be made within the limits. These are
+        given the most the limits allow
+    """
+    stretch = np.pi/2 if shape == 's-curve' else 1 #ramp time of the shape compared with a straight ramp
+    power = np.asarray(power, dtype=float)
+    #below: from the degrees moved, peak*(duration - ramp), with ramp = stretch*peak/acceleration
+    discriminant = duration**2 - 4*stretch*np.abs(power)*duration/acceleration
+    peak = (duration - np.sqrt(np.maximum(discriminant, 0)))*acceleration/(2*stretch)
+    feasible = (discriminant >= 0) & (peak <= 255)
+    peak = np.sign(power)*np.minimum(peak, 255)
+    return peak, stretch*np.abs(peak)/acceleration, feasible
+
+def schedule_profile(schedule):
+    """
+    Section 12.m.ii: motion_profile (section 12.m) of each movement of a schedule (section 12.a).
+        The profile is shaped in the speed of each motor (section 11.b), given as the power that
+            would have that speed with 'pwrcoef', so a dead zone does not shorten the movements.
+            A movement that needs more than the motor's 255 power is not feasible.
+
+    Returns
+    --------
+    peak, ramp, feasible = as section 12.m, with peak the speed as a 'pwrcoef' power
+    """
+    speed = MOTORS.columns(MOTORS.speed, schedule['power'])/PARAMS['pwrcoef']
+    peak, ramp, feasible = motion_profile(speed, schedule['duration'][:, None], PARAMS['max_acceleration'],
+                                          PARAMS['motion_profile'])
+    feasible &= np.abs(MOTORS.columns(MOTORS.power, peak*PARAMS['pwrcoef'])) <= 255
+    return peak, ramp, feasible
+
+def profile_distance(elapsed, duration, ramp, shape):
+    """
+    Section 12.m.i: How far a movement shaped by section 12.m has gone after elapsed seconds, as the seconds
+        it would take at its peak power. Its power rises over ramp seconds, holds, then falls over the
+        last ramp seconds, so this is the area under that, ending at duration - ramp.
+    """
+    ramp = np.maximum(ramp, 1e-9)
+    elapsed = np.clip(elapsed, 0, duration)
+    side = np.minimum(elapsed, duration - elapsed) #seconds from the nearer end of the movement
+    rising = np.minimum(side, ramp)
+    if shape == 's-curve': #the power rises as a sine squared
+        area = rising/2 - ramp*np.sin(np.pi*rising/ramp)/(2*np.pi)
+    else:
+        area = rising**2/(2*ramp)
+    area = area + np.maximum(side - ramp, 0) #ramp/2 by the end of the ramp, then at the peak power
+    return np.where(elapsed <= duration/2, area, duration - ramp - area)
+
+def play_ticks(ticks, progress=None, offset=0):
+    """
+    Section 12.l: Sends the powers of section 12.k to the motors, one row each update, against
+        deadlines kept by TIMER (section 14.b), so there is no work between movements.
+        With the encoders read (section 11.a) each power is corrected by how far the mirror is from
+            where it should be.
+        CONTROL (section 14.d) is checked before every update, so a pause, seek or abort happens
+            within one update. A seek moves the mirrors to where they should be at the new time
+            first (section 14.e). Seek times are offset seconds ahead of the ticks' own.
+        progress is called with the seconds played ten times a second.
+    """
+    global MXPos
+    global MYPos
+    power = ticks['power'].tolist()
+    xstart, ystart = MXPos, MYPos
+    targets = (ticks['position'] + [xstart, ystart]).tolist()
+    feedback = POSITIONS.active()
+    rate = ticks['rate']
+    step = max(int(rate//10), 1)
+    index = [0]
+    def update():
+        spa, spb = power[index[0]]
+        if feedback:
+            x, y = targets[index[0]]
+            spa = POSITIONS.power(PORT_A, spa, x)
+            spb = POSITIONS.power(PORT_B, spb, y)
+        BrickPi.MotorSpeed[PORT_A] = spa
+        BrickPi.MotorSpeed[PORT_B] = spb
+        BrickPiUpdateValues()
+        index[0] += 1
+    while index[0] < len(power) and not CONTROL.aborted.is_set():
+        seek = CONTROL.take_seek()
+        if seek is not None:
+            MXPos, MYPos = targets[index[0]]
+            index[0] = min(max(int(round((seek - offset)*rate)), 0), len(power) - 1)
+            move_axes({PORT_A: targets[index[0]][0], PORT_B: targets[index[0]][1]}, PARAMS['return_pwr'])
+        if CONTROL.playing.is_set():
+            TIMER.run(1/rate, update)
+            if progress is not None and index[0] % step == 0:
+                progress(index[0]/rate)
+        else: #paused, the motors are held still but kept updated
+            BrickPi.MotorSpeed[PORT_A] = 0
+            BrickPi.MotorSpeed[PORT_B] = 0
+            TIMER.run(1/rate, BrickPiUpdateValues)
+    BrickPi.MotorSpeed[PORT_A] = 0 #prevents 'coasting'
+    BrickPi.MotorSpeed[PORT_B] = 0
+    TIMER.run(PARAMS['stop_buffer'], BrickPiUpdateValues)
+    if index[0] == len(power):
+        MXPos, MYPos = xstart + ticks['end'][0], ystart + ticks['end'][1]
+    elif index[0]:
+        MXPos, MYPos = targets[index[0] - 1]
+
+def simplify_dv_data(dv_data, tolerance):
+    """
+    Section 12.h: Joins up neighbouring movements that are nearly in a straight line (in time,
+        degree position) into one, so fewer motor commands are sent. Uses the Ramer-Douglas-Peucker
+        method, measuring how far the mirror position moves from the original in degrees.
+        The start and end of each movement is kept exactly where it is not joined.
+
+    Parameters
+    -----------
+    tolerance = largest change, in degrees, allowed to the mirror position. 0 changes nothing
+
+    Returns
+    --------
+    dv_data = as in section 6, with the joined movements
+    max_error = the largest change made to the mirror position, in degrees
+    """
+    if tolerance <= 0 or len(dv_data) < 2:
+        return dv_data, 0.0
+    #below: the mirror position at the start of the first movement and the end of each one
+    times = np.append(dv_data[0, 0], dv_data[:, 0] + dv_data[:, 4])
+    degrees = np.append(dv_data[0, 2] - dv_data[0, 3], dv_data[:, 2])
+    keep = np.zeros(len(times), dtype=bool)
+    keep[[0, -1]] = True
+    sections = [(0, len(times) - 1)]
+    while sections:
+        first, last = sections.pop()
+        if last - first < 2:
+            continue
+        inside = slice(first + 1, last)
+        line = degrees[first] + (degrees[last] - degrees[first])*(times[inside] - times[first])/(times[last] - times[first])
+        error = np.abs(degrees[inside] - line)
+        worst = np.argmax(error)
+        if error[worst] > tolerance:
+            keep[first + 1 + worst] = True
+            sections.append((first, first + 1 + worst))
+            sections.append((first + 1 + worst, last))
+    kept_times = times[keep]
+    kept_degrees = degrees[keep]
+    max_error = np.max(np.abs(np.interp(times, kept_times, kept_degrees) - degrees))
+    return (dv_columns(kept_times[:-1], kept_degrees[1:], kept_degrees[:-1], np.diff(kept_times)),
+            float(max_error))
+
+def preprocess_file(folder, file, modes):
+    """
+    Section 12.i: Makes everything kept for a csv file: the binary copy (section 5.e),
+        the waveform pyramid used for plotting (section 6.q) and the schedule, with its speed
+        warning, for each mode (section 12.e). Anything already up to date is left alone.
+        Run in a separate process by section 12.j, so only plain values are returned.
+
+    Returns
+    --------
+    file = the csv file, so results can be matched up in any order
+    timings = list of (step, seconds taken)
+    warnings = dictionary of mode: if the motor cannot achieve the speed the mode needs (section 6)
+    """
+    timings = []
+    st = time.time()
+    if not long_file(folder, file):
+        read_csvfile_in_folder(folder, file)
+        timings.append(('read', time.time() - st))
+    st = time.time()
+    load_pyramid(folder, file)
+    timings.append(('levels', time.time() - st))
+    warnings = OrderedDict() #in the order of modes, for printing
+    for mode in modes:
+        st = time.time()
+        warnings[mode] = load_schedule(folder, file, mode)['warning']
+        timings.append((mode, time.time() - st))
+    return file, timings, warnings
+
+def preprocess_folder(folder, modes, workers):
+    """
+    Section 12.j: Runs section 12.i on every csv file in folder, spread over workers processes
+        (the Raspberry Pi 3 has 4 cores), and prints how long each file took as it finishes.
+        A file that fails is reported and the rest carry on.
+
+    Returns
+    --------
+    failed = list of the csv files that could not be preprocessed
+    """
+    st = time.time()
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(preprocess_file, folder, file, modes), file)
+                       for file in files_in_folder(folder))
+        for future in as_completed(futures):
+            try:
+                file, timings, warnings = future.result()
+            except Exception as error:
+                failed.append(futures[future])
+                print('{:<35}failed: {}'.format(futures[future], error))
+                continue
+            print('{:<35}{:>7.2f} s  ({}){}'.format(
+                file, sum(seconds for step, seconds in timings),
+                ', '.join('{} {:.2f} s'.format(step, seconds) for step, seconds in timings),
+                speed_warnings(warnings)))
+    print('{} files in {:.2f} s wall-clock with {} workers'.format(len(futures), time.time() - st, workers))
+    return failed
+
+def speed_warnings(warnings):
+    """Section 12.j.i: Names the modes of section 12.i's warnings the motor cannot achieve the speed of, for printing"""
+    failed = [mode for mode, warning in warnings.items() if warning]
+    return '  SPEED WARNING: {}'.format(', '.join(failed)) if failed else ''
 
 def resetxpos():
     """Section 13.a used for returning the x mirror to its 0 position"""
-    global MXPos
-    if MXPos == 0:
-        position_tracker(0, 0, 0, 0)
-    else:
-        stx = time.time()
-        ti = np.abs(MXPos/(PARAMS['return_pwr']*PARAMS['pwrcoef']))
-        if MXPos < 0:
-            mapower = -PARAMS['return_pwr']
-        elif MXPos > 0:
-            mapower = PARAMS['return_pwr']
-        while time.time() - stx < ti:
-            BrickPi.MotorSpeed[PORT_A] = mapower
-            BrickPiUpdateValues()
-            while ti + PARAMS['stop_buffer'] > time.time() - stx >= ti:
-                BrickPi.MotorSpeed[PORT_A] = 0 #prevents 'coasting'
-                BrickPiUpdateValues()
-        position_tracker(mapower, ti, 0, 0)
+    move_axes({PORT_A: 0}, PARAMS['return_pwr'])
 
 def resetypos():
     """Section 13.b used for returning the y mirror to its 0 position"""
-    global MYPos
-    if MYPos == 0:
-        position_tracker(0, 0, 0, 0)
-    else:
-        sty = time.time()
-        ti = np.abs(MYPos/(PARAMS['return_pwr']*PARAMS['pwrcoef']))
-        if MYPos > 0:
-            mbpower = PARAMS['return_pwr']
-        elif MYPos < 0:
-            mbpower = -PARAMS['return_pwr']
-        while time.time() - sty < ti:
-            BrickPi.MotorSpeed[PORT_B] = mbpower
-            BrickPiUpdateValues()
-            while ti + PARAMS['stop_buffer'] > time.time() - sty >= ti:
-                BrickPi.MotorSpeed[PORT_B] = 0 #prevents 'coasting'
-                BrickPiUpdateValues()
-        position_tracker(0, 0, mbpower, ti)
+    move_axes({PORT_B: 0}, PARAMS['return_pwr'])
+
+def resetpositions():
+    """Section 13.c used for returning every mirror ('extra_ports' too) to its 0 position at the same time"""
+    move_axes(dict((port, 0) for port in [PORT_A, PORT_B] + PARAMS['extra_ports']), PARAMS['return_pwr'])
 
 def motor(mapower, matime, mbpower, mbtime, type, UI):
     """Section 14: used for moving the motor"""
@@ -520,17 +2041,9 @@ def motor(mapower, matime, mbpower, mbtime, type, UI):
         elif spa > 0:
             direction = 'backward'
         if RP is True:
-            runtime = np.abs(matime)
-            st = time.time()
-            while time.time() - st < runtime:
-                UI.label.setText("Mirror X is moving {}".format(direction))
-                QApplication.processEvents()
-                BrickPi.MotorSpeed[PORT_A] = spa
-                BrickPiUpdateValues()
-                while runtime + PARAMS['stop_buffer'] > time.time() - st >= runtime:
-                    BrickPi.MotorSpeed[PORT_A] = 0 #prevents 'coasting'
-                    BrickPiUpdateValues()
-                    UI.label.setText("Mirror X has moved {}".format(direction))
+            UI.label.setText("Mirror X is moving {}".format(direction))
+            drive([(PORT_A, spa)], np.abs(matime), [MXPos])
+            UI.label.setText("Mirror X has moved {}".format(direction))
 
     if type == 'MirrorYTimed':
         spb = int(round(mbpower))
@@ -540,31 +2053,487 @@ def motor(mapower, matime, mbpower, mbtime, type, UI):
         elif spb < 0:
             direction = 'forward'
         if RP is True:
-            runtime = np.abs(mbtime)
-            st = time.time()
-            while time.time() - st < runtime:
-                UI.label.setText("Mirror X is moving {}".format(direction))
-                QApplication.processEvents()
-                BrickPi.MotorSpeed[PORT_B] = spb
-                BrickPiUpdateValues()
-                while runtime + PARAMS['stop_buffer'] > time.time() - st >= runtime:
-                    BrickPi.MotorSpeed[PORT_B] = 0 #prevents 'coasting'
-                    BrickPiUpdateValues()
-                    UI.label.setText("Mirror Y has moved {}".format(direction))
+            UI.label.setText("Mirror Y is moving {}".format(direction))
+            drive([(PORT_B, spb)], np.abs(mbtime), [MYPos])
+            UI.label.setText("Mirror Y has moved {}".format(direction))
     if type == 'preset':
         spa = int(round(mapower))
         spb = int(round(mbpower))
         position_tracker(spa, matime, spb, mbtime)
         if RP is True:
-            st = time.time()
-            while time.time() - st < matime:#matime and mbtime are identical
-                BrickPi.MotorSpeed[PORT_A] = spa
-                BrickPi.MotorSpeed[PORT_B] = spb
-                BrickPiUpdateValues()
-                while matime + PARAMS['stop_buffer'] > time.time() - st >= matime:
-                    BrickPi.MotorSpeed[PORT_A] = 0 #prevents 'coasting'
-                    BrickPi.MotorSpeed[PORT_B] = 0
+            #below: matime and mbtime are identical. Any error is made up in the next movement, so the
+            #timing of the preset is kept
+            played = drive([(PORT_A, spa), (PORT_B, spb)], matime, [MXPos, MYPos], settle=False)
+            if played < matime: #ended part way by CONTROL (section 14.d), so the rest is taken off again
+                position_tracker(-spa, matime - played, -spb, mbtime - played)
+
+def drive(speeds, runtime, targets=None, settle=True):
+    """
+    Section 14.a: Runs the motors for runtime seconds, then stops them for 'stop_buffer' seconds
+        to prevent 'coasting'. Timed by TIMER (section 14.b)
+        Given targets, and with the encoders read (section 11.a), the movement is followed
+            instead (section 14.a.i) and ends once the targets are reached.
+
+    Parameters
+    -----------
+    speeds = list of (port, power)
+    targets = list of the mirror positions (as section 11) to end at, one for each port in speeds
+    settle = if False a followed movement ends when its time is up, even if the targets are not reached
+
+    Returns
+    --------
+    played = seconds run, less than runtime if a preset was paused part way and then ended (section 14.a.i)
+    """
+    if targets is None:
+        targets = [None]*len(speeds)
+    return drive_axes([(port, speed, runtime, target) for (port, speed), target in zip(speeds, targets)], settle)
+
+def drive_axes(moves, settle=True):
+    """
+    Section 14.a.i: Runs any of the motor ports, each for its own time, in one loop, so every
+        BrickPiUpdateValues carries all of them and it takes as long as the longest move.
+        The loop is split where each move's time ends, so each port stops on its own deadline.
+        Then all are stopped for 'stop_buffer' seconds.
+        If every move has a target and the encoders are read (section 11.a) each mirror is moved in
+            a straight line from where it is to its target, with the power corrected at each update
+            by how far it is from where it should be by then. If settle, once the time is up the
+            motors keep correcting until the targets are reached, for at most 'position_timeout' seconds.
+        CONTROL (section 14.d) is checked before every update, so a preset is paused, seeked or aborted
+            part way through a movement: while paused the motors are held still and the movement
+            carries on when resumed, an abort or a seek ends it where it is.
+
+    Parameters
+    -----------
+    moves = list of (port, power, seconds, target), target is the mirror position (as section 11)
+        to end at, or None
+
+    Returns
+    --------
+    played = seconds of the moves run, less than the longest if ended part way by CONTROL
+    """
+    moves = [move for move in moves if move[2] > 0]
+    if not moves:
+        return 0
+    feedback = POSITIONS.active() and None not in [target for port, speed, runtime, target in moves]
+    starts = [POSITIONS.degrees(port, target) for port, speed, runtime, target in moves]
+    for port, speed, runtime, target in moves:
+        BrickPi.MotorEnable[port] = 1
+    ends = sorted(set(runtime for port, speed, runtime, target in moves))
+    played = [0] #seconds of the moves run, at the start of the current update
+    def update():
+        elapsed = played[0] + time.perf_counter() - TIMER.start
+        for (port, speed, runtime, target), start in zip(moves, starts):
+            if feedback:
+                left = max(runtime - elapsed, 0)/runtime #fraction of the move still to do
+                BrickPi.MotorSpeed[port] = POSITIONS.power(port, speed if left > 0 else 0,
+                                                           target - (target - start)*left)
+            else:
+                BrickPi.MotorSpeed[port] = speed if runtime > played[0] else 0
+        BrickPiUpdateValues()
+    while played[0] < ends[-1] and not CONTROL.stopping():
+        if not CONTROL.playing.is_set(): #paused, the motors are held still but kept updated
+            for port, speed, runtime, target in moves:
+                BrickPi.MotorSpeed[port] = 0
+            TIMER.run(TIMER.period, BrickPiUpdateValues)
+            continue
+        #below: one update at a time, each port stopping on its own deadline
+        until = min(played[0] + TIMER.period, min(end for end in ends if end > played[0]))
+        TIMER.run(until - played[0], update)
+        played[0] = until
+    timeout = time.perf_counter() + PARAMS['position_timeout']
+    while (feedback and settle and time.perf_counter() < timeout and not CONTROL.stopping()
+           and not all(POSITIONS.reached(port, target, target) for port, speed, runtime, target in moves)):
+        TIMER.run(TIMER.period, update)
+    for port, speed, runtime, target in moves:
+        BrickPi.MotorSpeed[port] = 0 #prevents 'coasting'
+    TIMER.run(PARAMS['stop_buffer'], BrickPiUpdateValues)
+    return played[0]
+
+class SegmentTimer(object):
+    """
+    Section 14.b: Times motor movements against deadlines on the monotonic clock, so a change to
+        the system clock cannot stretch or cut short a movement.
+        Motors are updated 'motor_update_rate' times a second. In between it sleeps, and only
+            spins for the last 'timer_spin' seconds before each deadline, so a core is not kept busy
+            and the GUI and graph keep running.
+        A movement that follows straight on from the last one starts at its deadline rather than
+            when it was called, so small delays do not add up over a preset.
+    """
+    def __init__(self, rate, spin):
+        self.period = 1/rate
+        self.spin = spin
+        self.start = self.end = -np.inf #start and deadline of the last movement
+        self.reset()
+
+    def reset(self):
+        """Starts the counts for a new playback"""
+        self.wall = 0.0 #seconds spent running movements
+        self.cpu = 0.0 #processor seconds used while doing so
+        self.late = 0.0 #most any movement finished after its deadline, in seconds
+
+    def wait(self, deadline):
+        """Returns at deadline, a time.perf_counter() time"""
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin:
+            sleep(remaining - self.spin)
+        while time.perf_counter() < deadline:
+            pass
+
+    def run(self, runtime, update):
+        """Calls update at the update rate until runtime seconds have passed"""
+        now = time.perf_counter()
+        cpu = time.process_time()
+        start = self.end if 0 <= now - self.end < self.period else now
+        self.start = start
+        self.end = start + runtime
+        for count in range(int(np.ceil(runtime/self.period - 1e-9))):
+            update()
+            self.wait(min(start + (count + 1)*self.period, self.end))
+        finish = time.perf_counter()
+        self.late = max(self.late, finish - self.end)
+        self.wall += finish - now
+        self.cpu += time.process_time() - cpu
+
+    def summary(self):
+        """How the last playback went. Busy waiting used the processor for all of the time"""
+        return ('Played for {:.2f} s using {:.2f} s of processor time ({:.2f} s saved), '
+                'latest movement end {:.2f} ms'.format(self.wall, self.cpu, self.wall - self.cpu,
+                                                       1000*self.late))
+
+TIMER = SegmentTimer(PARAMS['motor_update_rate'], PARAMS['timer_spin'])
+
+def move_axes(targets, power):
+    """
+    Section 14.e: Moves the mirror on each port in targets to its position, all at the same time
+        (section 14.a.i), so it takes as long as the furthest rather than one after the other.
+        Any of PORT_A to PORT_D can be used. Positions are measured (section 11.a) where possible.
+
+    Parameters
+    -----------
+    targets = dictionary of port: mirror position (as section 11) to move to
+    power = motor power to move at, as it would be with 'pwrcoef' (section 11.b)
+    """
+    moves = []
+    for port, target in sorted(targets.items()):
+        position = POSITIONS.degrees(port, POSITIONS.expected(port))
+        if not POSITIONS.reached(port, target, position):
+            #below: more power makes the position go down (section 11). Moved at the speed power has
+            #with 'pwrcoef', so a motor with a dead zone (section 11.b) is still moved
+            speed = int(np.sign(position - target))*int(round(float(MOTORS.power(port, power*PARAMS['pwrcoef']))))
+            moves.append((port, speed, abs(target - position)/(power*PARAMS['pwrcoef']), target))
+    if RP is True:
+        drive_axes(moves)
+    for port, target in targets.items():
+        POSITIONS.set_expected(port, target)
+
+class MotorWorker(QThread):
+    """
+    Section 14.c: Moves the motors on their own thread, so the touchscreen keeps working while
+        a preset plays. MainWindow (section 16) sends it commands, which are carried out in order,
+        and it answers with signals, which Qt delivers on the GUI thread.
+        All motor movements (sections 12, 13 and 14) go through it, so only one thing
+            talks to the BrickPi at a time.
+        motor (section 14) writes to UI.label, so the worker passes itself as UI and the
+            text is sent on as the status signal.
+    """
+    status = pyqtSignal(str) #text for the label of the screen that sent the movement
+    progress = pyqtSignal(float, float) #seconds played, seconds in the preset
+    position = pyqtSignal(float, float) #MXPos, MYPos as measured (section 11.a)
+    done = pyqtSignal(str) #name of the command carried out
+    nowplaying = pyqtSignal(int) #number of the preset file that has started playing
+    skipped = pyqtSignal(int) #number of a playlist file skipped, as the motor cannot achieve its speed
+    timing = pyqtSignal(str) #TIMER's summary (section 14.b) of a preset file that has finished playing
+
+    def __init__(self, parent=None):
+        super(MotorWorker, self).__init__(parent)
+        self.commands = Queue()
+        self.label = self
+
+    def setText(self, text):
+        self.status.emit(text)
+
+    def send(self, name, function, *args):
+        """Adds function(*args) to the commands, done is signalled with name once it has run"""
+        self.commands.put((name, function, args))
+
+    def moved(self, played, total):
+        """Signals how far through a preset the motors are"""
+        self.progress.emit(played, total)
+        self.position.emit(*POSITIONS.mirrors())
+
+    def run(self):
+        while True:
+            name, function, args = self.commands.get()
+            if function is None:
+                return
+            try:
+                function(*args)
+            except Exception:
+                traceback.print_exc() #the worker carries on with the next command
+            CONTROL.clear()
+            self.position.emit(*POSITIONS.mirrors())
+            self.done.emit(name)
+
+    def drop(self):
+        """Drops the waiting commands and ends a playing preset (section 14.d)"""
+        while not self.commands.empty():
+            self.commands.get()
+        CONTROL.abort()
+
+    def abort(self):
+        """Ends a playing preset and returns the mirrors to 0, all together (section 13.c), from where they are"""
+        self.drop()
+        self.send('reset', resetpositions)
+
+    def stop(self):
+        """Ends a playing preset and waits for the thread to finish"""
+        self.drop()
+        self.send('stop', None)
+        self.wait()
+
+class PlaybackControl(object):
+    """
+    Section 14.d: Lets the GUI pause, resume, seek and abort a playing preset. Set from the GUI
+        thread and checked by the players (sections 12.f and 12.l), and by section 14.a.i within their
+        movements, before each motor update.
+        The motor worker (section 14.c) clears it after each command.
+    """
+    def __init__(self):
+        self.playing = threading.Event() #cleared while paused
+        self.aborted = threading.Event()
+        self.lock = threading.Lock()
+        self.target = None #seconds to seek to
+        self.clear()
+
+    def clear(self):
+        self.playing.set()
+        self.aborted.clear()
+        self.take_seek()
+
+    def pause(self):
+        self.playing.clear()
+
+    def resume(self):
+        self.playing.set()
+
+    def seek(self, seconds):
+        """Moves playback to seconds from the start of the preset"""
+        with self.lock:
+            self.target = seconds
+
+    def take_seek(self):
+        """The seconds to seek to, if a seek has been asked for since the last call, otherwise None"""
+        with self.lock:
+            seconds, self.target = self.target, None
+        return seconds
+
+    def stopping(self):
+        """If a movement should end where it is: the preset is aborted, or a seek is waiting to be taken"""
+        with self.lock:
+            return self.aborted.is_set() or self.target is not None
+
+    def abort(self):
+        self.aborted.set()
+        self.playing.set() #so a paused player sees it
+
+CONTROL = PlaybackControl()
+
+
+class Prefetcher(object):
+    """
+    Section 14.f: Prepares the files of a playlist (section 15.e) while others are playing: the
+        binary copy, pyramid and schedule of each (section 12.i) are made and stored by a separate
+        process, so the motor worker (section 14.c) is not held up, and play_next (section 12.n)
+        only has to read them.
+        It is made before the QApplication (see the end of the file), so its process is copied from
+            a program with no Qt state or other threads part way through something, which is not safe.
+    """
+    def __init__(self):
+        self.pool = ProcessPoolExecutor(max_workers=1)
+        self.pool.submit(int).result()
+        self.files = {}
+
+    def send(self, folder, file):
+        """Starts preparing a file, if it is not already being prepared"""
+        if (folder, file) not in self.files:
+            self.files[(folder, file)] = self.pool.submit(preprocess_file, folder, file, [PARAMS['mode']])
+
+    def warning(self, folder, file):
+        """
+        Waits for a file to be prepared
+
+        Returns
+        --------
+        warning = True if the motor cannot achieve the speed the file needs (see section 7)
+        """
+        self.send(folder, file)
+        try:
+            return self.files.pop((folder, file)).result()[2][PARAMS['mode']]
+        except Exception:
+            traceback.print_exc() #prepared here instead
+            return load_schedule(folder, file, PARAMS['mode'])['warning']
+
+    def stop(self):
+        """Ends the process, without waiting for files still being prepared"""
+        self.pool.shutdown(wait=False)
+
+
+def characterise(ports, powers, degrees):
+    """
+    Section 14.g: Measures how fast the motor on each port turns at each of powers, with the encoders
+        (section 11.a), for a MotorModel (section 11.b). Run from the command line (section 17).
+        Each power is run forwards then backwards, so the mirror stays near 0, for long enough to move
+            about degrees (as 'pwrcoef' has it) but at most 'characterise_seconds'. The speed is
+            measured over the second half of each run, once the motor is up to speed.
+
+    Parameters
+    -----------
+    ports = list of motor ports
+    powers = list of positive powers
+    degrees = how far each run should move the mirror
+
+    Returns
+    --------
+    fits = dictionary of port: (gain, dead_zone)
+    measurements = dictionary of port: list of [power, speed], speed as section 11.b
+    """
+    fits = {}
+    measurements = {}
+    for port in ports:
+        BrickPi.MotorEnable[port] = 1
+        rows = []
+        for power in powers:
+            runtime = min(PARAMS['characterise_seconds'],
+                          max(degrees/(power*PARAMS['pwrcoef']), 8.0/PARAMS['motor_update_rate']))
+            for direction in (1, -1):
+                readings = []
+                def update():
+                    BrickPi.MotorSpeed[port] = direction*power
                     BrickPiUpdateValues()
+                    readings.append((time.perf_counter(), BrickPi.Encoder[port]))
+                TIMER.run(runtime, update)
+                BrickPi.MotorSpeed[port] = 0
+                TIMER.run(PARAMS['stop_buffer'], BrickPiUpdateValues)
+                readings = np.array(readings[len(readings)//2:], dtype=float)
+                #below: 2 encoder counts to a degree, the speed makes the position go down (section 11.b)
+                speed = -PARAMS['encoder_sign']*np.diff(readings[[0, -1], 1])[0]/2/np.diff(readings[[0, -1], 0])[0]
+                rows.append([direction*power, float(speed)])
+        measurements[port] = rows
+        fits[port] = fit_motor(np.array(rows))
+    resetpositions()
+    return fits, measurements
+
+def fit_motor(rows):
+    """
+    Section 14.g.i: Fits speed = gain*(power - dead_zone) to the runs of section 14.g that moved, by least
+        squares over both directions at once
+
+    Parameters
+    -----------
+    rows = array of columns: power, speed
+
+    Returns
+    --------
+    gain = degrees a second for each unit of power above the dead zone
+    dead_zone = largest power that does not turn the motor
+    """
+    power = np.abs(rows[:, 0])
+    speed = np.sign(rows[:, 0])*rows[:, 1] #so a motor turning the way it was sent is positive
+    moving = speed > 0.05*np.max(speed)
+    if np.count_nonzero(moving) < 2:
+        raise ValueError('The motor did not turn at enough of the powers to be characterised')
+    gain, offset = np.linalg.lstsq(np.c_[power[moving], np.ones(np.count_nonzero(moving))], speed[moving], rcond=-1)[0]
+    return float(gain), float(max(-offset/gain, 0))
+
+def motor_table(rows):
+    """
+    Section 14.g.ii: The table MotorModel (section 11.b) interpolates a motor's speed from. The two
+        directions of each power are averaged, and a power is never taken as slower than a smaller one.
+        The table starts from the largest power that did not turn the motor, the dead zone, at 0
+
+    Parameters
+    -----------
+    rows = array of columns: power, speed, as measured by section 14.g
+
+    Returns
+    --------
+    power = array of powers, from the dead zone up
+    speed = array of the speed at each power, turning the way it was sent, going up
+    """
+    measured = np.abs(rows[:, 0])
+    powers = np.unique(measured)
+    speeds = np.array([np.mean(np.sign(rows[measured == power, 0])*rows[measured == power, 1]) for power in powers])
+    moving = speeds > 0.01*np.max(speeds) #slower is taken as the encoders' noise
+    if np.count_nonzero(moving) < 2:
+        raise ValueError('The motor did not turn at enough of the powers to be characterised')
+    first = np.argmax(moving)
+    power = np.append(powers[first - 1] if first else 0.0, powers[first:])
+    speed = np.append(0, np.maximum.accumulate(np.where(moving, speeds, 0)[first:]))
+    faster = np.append(True, np.diff(speed) > 0) #so the table can be looked up both ways
+    return power[faster], speed[faster]
+
+def home_mirrors(UI):
+    """
+    Section 14.h: Calibrates the mirrors on 'endstops' against their touch sensors, all at the same
+        time: each is driven quickly until its sensor is pressed, backs off 'home_backoff' degrees,
+        comes back slowly for an accurate position, and is then at its endstop's position
+        (section 11.a). The mirrors are then returned to 0. Run by the motor worker (section 14.c)
+        at startup, so the mirrors do not have to be calibrated by hand.
+    """
+    endstops = PARAMS['endstops']
+    for port, (sensor, position) in endstops.items():
+        BrickPi.SensorType[sensor] = TYPE_SENSOR_TOUCH
+        BrickPi.MotorEnable[port] = 1
+    BrickPiSetupSensors()
+    UI.label.setText('The mirrors are being homed')
+    backoff = []
+    for port, (sensor, position) in endstops.items():
+        speed = PARAMS['home_fast_power']*PARAMS['pwrcoef']
+        backoff.append((port, int(round(float(MOTORS.power(port, np.sign(position)*speed)))),
+                        PARAMS['home_backoff']/speed, None))
+    found = approach_endstops(endstops, PARAMS['home_fast_power'])
+    if found:
+        drive_axes(backoff)
+        found = approach_endstops(endstops, PARAMS['home_slow_power'])
+    if not found:
+        UI.label.setText('The endstops could not be found, please calibrate the mirrors by hand')
+        return
+    for port, (sensor, position) in endstops.items():
+        POSITIONS.calibrate(port, position)
+    POSITIONS.homed = PORT_A in endstops and PORT_B in endstops
+    move_axes(dict((port, 0) for port in endstops), PARAMS['return_pwr'])
+    UI.label.setText('The mirrors have been homed')
+
+def approach_endstops(endstops, power):
+    """
+    Section 14.h.i: Drives each mirror on endstops (as 'endstops') towards its touch sensor at power (as it
+        would be with 'pwrcoef'), reading the sensors on every update and stopping each mirror as soon as
+        its sensor is pressed
+
+    Returns
+    --------
+    found = True if every sensor was pressed within 'home_timeout' seconds
+    """
+    pressed = set()
+    speeds = {}
+    for port, (sensor, position) in endstops.items():
+        #below: more power makes the position go down (section 11), the endstop's position is towards
+        speeds[port] = int(round(float(MOTORS.power(port, -np.sign(position)*power*PARAMS['pwrcoef']))))
+    def update():
+        for port in endstops:
+            BrickPi.MotorSpeed[port] = 0 if port in pressed else speeds[port]
+        BrickPiUpdateValues()
+        for port, (sensor, position) in endstops.items():
+            if BrickPi.Sensor[sensor]:
+                pressed.add(port)
+                BrickPi.MotorSpeed[port] = 0
+    timeout = time.perf_counter() + PARAMS['home_timeout']
+    while len(pressed) < len(endstops) and time.perf_counter() < timeout:
+        TIMER.run(TIMER.period, update)
+    for port in endstops:
+        BrickPi.MotorSpeed[port] = 0 #prevents 'coasting'
+    TIMER.run(PARAMS['stop_buffer'], BrickPiUpdateValues)
+    return len(pressed) == len(endstops)
 
 
 class WelcomeScreenUI():
@@ -805,32 +2774,31 @@ class ChooseMovementUI(object):
         self.exitbtn = QPushButton(self.centralwidget)
         CreateButton().exitstyle(self.exitbtn)
 
+        #below: files chosen while the playlist button is down are played one after another
+        self.playlistbtn = QPushButton(self.centralwidget)
+        CreateButton().playbackstyle(self.playlistbtn, 'Preset', 1, 'Add files to a playlist')
+        self.playlistbtn.setCheckable(True)
+        self.playbtn = QPushButton(self.centralwidget)
+        CreateButton().playbackstyle(self.playbtn, 'Forward', 2, 'Play the playlist')
+
         self.filebuttons = {}
         count = 1
-        if RP is True:
-            for i in range(len(files_in_folder(PARAMS['RPFOLDER']))):
-                # keep a reference to the buttons
-                self.filebuttons[i] = QPushButton('{}'.format(files_in_folder(PARAMS['\
-RPFOLDER'])[i].replace(".csv", "")), self.centralwidget)
-                # add to the layout
-                CreateButton().namestyle(self.filebuttons[i], count)
-                count += 1
-                self.filebuttons[i].setStyleSheet("QPushButton {background-color: \
-black; color: white}")
-                self.filebuttons[i].setToolTip('Executes {} file'.format('{\
-}'.format(files_in_folder(PARAMS['RPFOLDER'])[i].replace(".csv", ""))))
-        else:
-            for i in range(len(files_in_folder(PARAMS['FOLDER']))):
-                # keep a reference to the buttons
-                self.filebuttons[i] = QPushButton('{}'.format(files_in_folder(PARAMS['\
-FOLDER'])[i].replace(".csv", "")), self.centralwidget)
-                # add to the layout
-                CreateButton().namestyle(self.filebuttons[i], count)
-                count += 1
-                self.filebuttons[i].setStyleSheet("QPushButton {background-color: \
+        files = files_in_folder(data_folder())
+        for i in range(len(files)):
+            # keep a reference to the buttons
+            self.filebuttons[i] = QPushButton('{}'.format(files[i].replace(".csv", "")), self.centralwidget)
+            # add to the layout
+            CreateButton().namestyle(self.filebuttons[i], count)
+            count += 1
+            self.filebuttons[i].setStyleSheet("QPushButton {background-color: \
 black; color: white}")
-                self.filebuttons[i].setToolTip('Executes {} file'.format('{\
-}'.format(files_in_folder(PARAMS['FOLDER'])[i].replace(".csv", ""))))
+            details = catalog(data_folder()).details(files[i])
+            self.filebuttons[i].setToolTip('Executes {} file\nPlays for {:.1f} s, {} data points, peak strain {:.3g}'.format(
+                files[i].replace(".csv", ""), details['duration']*PARAMS['time_scale'], details['samples'],
+                details['peak']))
+            iconsize = QSize(int(Window.width/9), int(Window.height/12))
+            self.filebuttons[i].setIcon(QIcon(thumbnail(data_folder(), files[i], iconsize.width(), iconsize.height())))
+            self.filebuttons[i].setIconSize(iconsize)
 
         mainwindow.setCentralWidget(self.centralwidget)
 
@@ -892,8 +2860,8 @@ class SpeedWarningUI():
 
 class MainWindow(QMainWindow):
     """Section 16: Class for calling all of the various user interfaces"""
-    def __init__(self, parent=None):
-        """Calls the various interfaces"""
+    def __init__(self, prefetcher, parent=None):
+        """Calls the various interfaces, prefetcher is the Prefetcher (section 14.f) for playlists"""
         super(MainWindow, self).__init__(parent)
         self.setParent(parent)
         self.uihome = HomeUI()
@@ -903,117 +2871,202 @@ class MainWindow(QMainWindow):
         self.uifilewarning = FileWarningUI()
         self.uispeedwarning = SpeedWarningUI()
         self.uiwelcomescreen = WelcomeScreenUI()
+        self.motorui = None #the screen whose label shows what the motors are doing
+        self.playing = None #name of the preset being played
+        self.played = 0 #seconds of it played
+        self.playingfile = None #number of the preset file being played
+        self.playlist = [] #numbers of the preset files chosen to play one after another
+        self.skipped = [] #names of the playlist files skipped (section 12.n)
+        self.timing = '' #how the timing of the last file played went (section 14.b)
+        self.prefetcher = prefetcher
+        self.motors = MotorWorker(self)
+        self.motors.status.connect(self.motorstatus)
+        self.motors.progress.connect(self.motorprogress)
+        self.motors.done.connect(self.motordone)
+        self.motors.nowplaying.connect(self.motorplaying)
+        self.motors.skipped.connect(self.motorskipped)
+        self.motors.timing.connect(self.motortiming)
+        self.motors.start()
         self.startWelcomeScreenUI()
 
+    def sendmotor(self, UI, mapower, matime, mbpower, mbtime, type):
+        """Sends a movement from the self movement or calibrate screen (UI) to the motor worker"""
+        self.motorui = UI
+        self.motors.send(type, motor, mapower, matime, mbpower, mbtime, type, self.motors)
+
+    def resetmotors(self):
+        """Returns both mirrors to their 0 positions, on the motor worker"""
+        self.motors.send('reset', resetpositions)
+
+    def motorstatus(self, text):
+        if self.motorui is None:
+            self.statusBar().showMessage(text)
+            return
+        try:
+            self.motorui.label.setText(text)
+        except (AttributeError, RuntimeError):
+            pass #the screen has been changed since the movement was sent
+
+    def motorprogress(self, played, total):
+        self.played = played
+        if self.playing is not None:
+            self.statusBar().showMessage('Performing {}  {:.0f}%{}'.format(
+                self.playing, min(100*played/total, 100) if total > 0 else 100, self.skippedtext()))
+
+    def motorplaying(self, file):
+        """Shows the next file of a playlist once the motor worker starts playing it (section 12.n)"""
+        if self.playing is None or file == self.playingfile:
+            return
+        name = files_in_folder(data_folder())[file]
+        self.playingfile = file
+        self.playing = name.replace('.csv', '')
+        self.played = 0
+        plot(self, file)
+        self.centralwidget.raise_() #keeps the buttons above the new graph
+        self.statusBar().showMessage('Performing {}{}'.format(self.playing, self.skippedtext()))
+
+    def motortiming(self, text):
+        """Keeps the timing of a file that has finished playing, shown once the preset ends"""
+        self.timing = text
+
+    def motorskipped(self, file):
+        """Shows a playlist file that was skipped (section 12.n) until the playlist ends"""
+        self.skipped.append(files_in_folder(data_folder())[file].replace('.csv', ''))
+        self.statusBar().showMessage(self.skippedtext().strip())
+
+    def skippedtext(self):
+        if not self.skipped:
+            return ''
+        return '  Skipped {}: the motor cannot achieve the required speed'.format(', '.join(self.skipped))
+
+    def motordone(self, name):
+        if name == 'pause': #after a preset (see startGraphUI)
+            self.playing = None
+            self.statusBar().showMessage('Returning motors to default position  {}{}'.format(
+                self.timing, self.skippedtext()))
+        if self.motorui is self.uiselfmovement and name in ('MirrorXTimed', 'MirrorYTimed'):
+            self.motorcheck(self.uiselfmovement)
+
     def motorcheck(self, UI):
         global MXPos
         global MYPos
         limit = PARAMS['degree_max']*PARAMS['manualbuffer']
         if MXPos >= limit or MXPos <= -limit:
             UI.warninglabel.setText("Warning: Mirror has reached limit\nThe mirrors will now return to their default positions.")
-            resetxpos()
+            self.motors.send('reset', resetxpos)
         else:
             UI.warninglabel.setText("")
         if MYPos >= limit or MYPos <= -limit:
             UI.warninglabel.setText("Warning: Mirror has reached limit\nThe mirrors will now return to their default positions.")
-            resetypos()
+            self.motors.send('reset', resetypos)
         else:
             UI.warninglabel.setText("")
 
     def MXFfdSelfMovement(self):
-        motor(-PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, -PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed')
 
     def MXFwdSelfMovement(self):
-        motor(-PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 0, 0, 'MirrorXTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, -PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 0, 0, 'MirrorXTimed')
 
     def MXBwdSelfMovement(self):
-        motor(PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 0, 0, 'MirrorXTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 0, 0, 'MirrorXTimed')
 
     def MXFrdSelfMovement(self):
-        motor(PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed')
 
     def MYFfdSelfMovement(self):
-        motor(0, 0, -PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, 0, 0, -PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed')
 
     def MYFwdSelfMovement(self):
-        motor(0, 0, -PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 'MirrorYTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, 0, 0, -PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 'MirrorYTimed')
 
     def MYBwdSelfMovement(self):
-        motor(0, 0, PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 'MirrorYTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, 0, 0, PARAMS['self_movement_pwr'], PARAMS['self_movement_run_time'], 'MirrorYTimed')
 
     def MYFrdSelfMovement(self):
-        motor(0, 0, PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed', self.uiselfmovement)
-        self.motorcheck(self.uiselfmovement)
+        self.sendmotor(self.uiselfmovement, 0, 0, PARAMS['self_movement_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['self_movement_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed')
 
     def SetCalibrate(self):
-        global MXPos
-        global MYPos
-        MXPos = 0
-        MYPos = 0
+        self.motors.send('calibrate', POSITIONS.zero)
         self.uicalibrate.label.setText("Calibration has been set")
 
     def MXFfdCalibrate(self):
-        motor(-PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, -PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed')
 
     def MXFwdCalibrate(self):
-        motor(-PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 0, 0, 'MirrorXTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, -PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 0, 0, 'MirrorXTimed')
 
     def MXBwdCalibrate(self):
-        motor(PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 0, 0, 'MirrorXTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 0, 0, 'MirrorXTimed')
 
     def MXFrdCalibrate(self):
-        motor(PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 0, 0, 'MirrorXTimed')
 
     def MYFfdCalibrate(self):
         self.uicalibrate.label.setText("Mirror Y is moving forward")
-        motor(0, 0, -PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, 0, 0, -PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed')
 
     def MYFwdCalibrate(self):
-        motor(0, 0, -PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 'MirrorYTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, 0, 0, -PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 'MirrorYTimed')
 
     def MYBwdCalibrate(self):
-        motor(0, 0, PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 'MirrorYTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, 0, 0, PARAMS['Calibrate_pwr'], PARAMS['Calibrate_run_time'], 'MirrorYTimed')
 
     def MYFrdCalibrate(self):
-        motor(0, 0, PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed', self.uicalibrate)
+        self.sendmotor(self.uicalibrate, 0, 0, PARAMS['Calibrate_pwr']*PARAMS['Fast_power_multiplier'], PARAMS['Calibrate_run_time']*PARAMS['Fast_time_multiplier'], 'MirrorYTimed')
 
     def file0caller(self):
-        self.startGraphUI(0)
+        self.choosefile(0)
     def file1caller(self):
-        self.startGraphUI(1)
+        self.choosefile(1)
     def file2caller(self):
-        self.startGraphUI(2)
+        self.choosefile(2)
     def file3caller(self):
-        self.startGraphUI(3)
+        self.choosefile(3)
     def file4caller(self):
-        self.startGraphUI(4)
+        self.choosefile(4)
     def file5caller(self):
-        self.startGraphUI(5)
+        self.choosefile(5)
     def file6caller(self):
-        self.startGraphUI(6)
+        self.choosefile(6)
     def file7caller(self):
-        self.startGraphUI(7)
+        self.choosefile(7)
     def file8caller(self):
-        self.startGraphUI(8)
+        self.choosefile(8)
     def file9caller(self):
-        self.startGraphUI(9)
+        self.choosefile(9)
     def file10caller(self):
-        self.startGraphUI(10)
+        self.choosefile(10)
     def file11caller(self):
-        self.startGraphUI(11)
+        self.choosefile(11)
     def file12caller(self):
-        self.startGraphUI(12)
+        self.choosefile(12)
+
+    def choosefile(self, file):
+        """Plays a preset file, or adds it to the playlist if the playlist button is down"""
+        if not self.uichoosemovement.playlistbtn.isChecked():
+            self.startGraphUI(file)
+            return
+        name = files_in_folder(data_folder())[file]
+        self.playlist.append(file)
+        self.prefetcher.send(data_folder(), name) #prepared while the rest are chosen and played
+        self.uichoosemovement.sublabel.setText('Playlist: {}'.format(', '.join(
+            files_in_folder(data_folder())[i].replace('.csv', '') for i in self.playlist)))
+
+    def playplaylist(self):
+        """Plays the files of the playlist one after another, without returning to 0 between them"""
+        if self.playlist:
+            playlist, self.playlist = self.playlist, []
+            self.startGraphUI(playlist[0], playlist[1:])
 
     def closeit(self):
         self.close()
 
+    def closeEvent(self, event):
+        self.motors.stop()
+        self.prefetcher.stop()
+        event.accept()
+
     def starthomeUI(self):
         self.uihome.setupui(self)
         self.uihome.selfmovementbtn.clicked.connect(self.startSelfMovementUI)
@@ -1024,10 +3077,20 @@ class MainWindow(QMainWindow):
 
     def startWelcomeScreenUI(self):
         self.uiwelcomescreen.setupui(self)
-        self.uiwelcomescreen.nextbtn.clicked.connect(self.startCalibrateUI)
+        self.uiwelcomescreen.nextbtn.clicked.connect(self.startfirstUI)
         self.uiwelcomescreen.exitbtn.clicked.connect(self.closeit)
+        if RP is True and PARAMS['endstops']:
+            self.uiwelcomescreen.sublabel.setText("Please wait while the mirrors are homed.")
+            self.motors.send('home', home_mirrors, self.motors) #status is shown on the status bar
         self.show()
 
+    def startfirstUI(self):
+        """After the welcome screen: the home screen once the mirrors are homed (section 14.h), otherwise calibration"""
+        if POSITIONS.homed:
+            self.starthomeUI()
+        else:
+            self.startCalibrateUI()
+
     def startSelfMovementUI(self):
         self.uiselfmovement.setupui(self)
         self.uiselfmovement.homebtn.clicked.connect(self.starthomeUI)
@@ -1073,49 +3136,74 @@ class MainWindow(QMainWindow):
 
 
     def startChooseMovementUI(self):
+        self.playlist = []
         if RP is True:
-            self.statusBar().showMessage('Returning motors to default position')
-            QApplication.processEvents()
-            resetxpos()
-            resetypos()
+            self.resetmotors()
             self.statusBar().showMessage('Choose a Movement Mode')
-            QApplication.processEvents()
-            if len(files_in_folder(PARAMS['RPFOLDER'])) >= 11:
+            files = files_in_folder(PARAMS['RPFOLDER'])
+            if len(files) >= 11:
                 self.startFileWarningUI()
-            elif len(files_in_folder(PARAMS['RPFOLDER'])) < 11:
+            elif len(files) < 11:
                 self.uichoosemovement.setupui(self)
                 self.uichoosemovement.homebtn.clicked.connect(self.starthomeUI)
                 self.uichoosemovement.exitbtn.clicked.connect(self.closeit)
-                for i in range(len(files_in_folder(PARAMS['RPFOLDER']))):
+                self.uichoosemovement.playbtn.clicked.connect(self.playplaylist)
+                for i in range(len(files)):
                     cmd = "self.uichoosemovement.filebuttons[%d].clicked.connect(self.file%dcaller)"%(i, i)
                     exec(cmd)
         else:
-            if len(files_in_folder(PARAMS['FOLDER'])) >= 11:
+            files = files_in_folder(PARAMS['FOLDER'])
+            if len(files) >= 11:
                 self.startFileWarningUI()
-            elif len(files_in_folder(PARAMS['FOLDER'])) < 11:
+            elif len(files) < 11:
                 self.uichoosemovement.setupui(self)
                 self.uichoosemovement.homebtn.clicked.connect(self.starthomeUI)
                 self.uichoosemovement.exitbtn.clicked.connect(self.closeit)
-                for i in range(len(files_in_folder(PARAMS['FOLDER']))):
+                self.uichoosemovement.playbtn.clicked.connect(self.playplaylist)
+                for i in range(len(files)):
                     cmd = "self.uichoosemovement.filebuttons[%d].clicked.connect(self.file%dcaller)"%(i, i)
                     exec(cmd)
         self.show()
 
+    def pauseplayback(self):
+        """Pauses or resumes the playing preset (section 14.d)"""
+        if CONTROL.playing.is_set():
+            CONTROL.pause()
+            self.pausebtn.setIcon(QIcon(IMAGE_LOCATION+os.sep+'Forward.png'))
+            self.pausebtn.setToolTip('Resume')
+        else:
+            CONTROL.resume()
+            self.pausebtn.setIcon(QIcon(IMAGE_LOCATION+os.sep+'Stop.png'))
+            self.pausebtn.setToolTip('Pause')
+
+    def seekplayback(self, seconds):
+        """Moves the playing preset on by seconds, or back if negative (section 14.d)"""
+        if self.playing is not None:
+            CONTROL.seek(max(self.played + seconds, 0))
+
     def clearGraphUI(self):
+        if RP is True and self.playing is not None:
+            #below: stops the preset and returns the mirrors to 0 from where they are
+            self.motors.abort()
+            self.playing = None
         plot(self, 0, clear=True) #0 simply fills in the file parameter
         self.starthomeUI()
 
-    def startGraphUI(self, file):
+    def startGraphUI(self, file, playlist=()):
+        """Plays a preset file, followed by the files of playlist (section 12.n) when the motors are used"""
         if RP is True:
-            if degree_velocity(PARAMS['RPFOLDER'], files_in_folder(PARAMS['RPFOLDER'])[file], 'warning_check')[1] == True:
+            name = files_in_folder(PARAMS['RPFOLDER'])[file]
+            #below: from the precompiled schedule (section 12.e), which movemotor (section 12) then plays
+            warning = preset_warning(PARAMS['RPFOLDER'], name)
+            if warning == True:
                 self.startSpeedWarningUI()
-            elif degree_velocity(PARAMS['RPFOLDER'], files_in_folder(PARAMS['RPFOLDER'])[file], 'warning_check')[1] == False:
+            elif warning == False:
                 self.setGeometry(Window.left, Window.top, Window.width, Window.height)
                 self.setWindowTitle(Window.title)
 
                 plot(self, file)
 
-                self.statusBar().showMessage('Performing {}'.format(files_in_folder(PARAMS['RPFOLDER'])[file].replace('.csv', '')))
+                self.statusBar().showMessage('Performing {}'.format(name.replace('.csv', '')))
                 self.centralwidget = QWidget(self)
                 self.setCentralWidget(self.centralwidget)
 
@@ -1125,22 +3213,39 @@ class MainWindow(QMainWindow):
                 self.exitbtn = QPushButton(self.centralwidget)
                 CreateButton().exitstyle(self.exitbtn)
                 self.exitbtn.clicked.connect(self.closeit)
-                QApplication.processEvents()
-                movemotor(self, file)
-                sleep(2)
-                self.statusBar().showMessage('Returning motors to default position')
-                QApplication.processEvents()
-                resetxpos()
-                resetypos()
+                self.rewindbtn = QPushButton(self.centralwidget)
+                CreateButton().playbackstyle(self.rewindbtn, 'Fast_Rewind', 1, 'Back {} s'.format(PARAMS['seek_step']))
+                self.rewindbtn.clicked.connect(lambda: self.seekplayback(-PARAMS['seek_step']))
+                self.pausebtn = QPushButton(self.centralwidget)
+                CreateButton().playbackstyle(self.pausebtn, 'Stop', 2, 'Pause')
+                self.pausebtn.clicked.connect(self.pauseplayback)
+                self.forwardbtn = QPushButton(self.centralwidget)
+                CreateButton().playbackstyle(self.forwardbtn, 'Fast_Forward', 3, 'Forward {} s'.format(PARAMS['seek_step']))
+                self.forwardbtn.clicked.connect(lambda: self.seekplayback(PARAMS['seek_step']))
+                #below: played on the motor worker (section 14.c) so the buttons keep working
+                self.playing = name.replace('.csv', '')
+                self.played = 0
+                self.playingfile = file
+                self.skipped = []
+                self.timing = ''
+                for i in playlist:
+                    self.prefetcher.send(PARAMS['RPFOLDER'], files_in_folder(PARAMS['RPFOLDER'])[i])
+                self.motors.send('preset', movemotor, self, file)
+                for i in playlist:
+                    self.motors.send('preset', play_next, self, i)
+                self.motors.send('pause', CONTROL.aborted.wait, 2)
+                self.resetmotors()
         else:
-            if degree_velocity(PARAMS['FOLDER'], files_in_folder(PARAMS['FOLDER'])[file], 'warning_check')[1] == True:
+            name = files_in_folder(PARAMS['FOLDER'])[file]
+            warning = preset_warning(PARAMS['FOLDER'], name)
+            if warning == True:
                 self.startSpeedWarningUI()
-            elif degree_velocity(PARAMS['FOLDER'], files_in_folder(PARAMS['FOLDER'])[file], 'warning_check')[1] == False:
+            elif warning == False:
                 self.setGeometry(Window.left, Window.top, Window.width, Window.height)
                 self.setWindowTitle(Window.title)
                 plot(self, file)
 
-                self.statusBar().showMessage('Performing {}'.format(files_in_folder(PARAMS['FOLDER'])[file].replace('.csv', '')))
+                self.statusBar().showMessage('Performing {}'.format(name.replace('.csv', '')))
                 self.centralwidget = QWidget(self)
                 self.setCentralWidget(self.centralwidget)
 
@@ -1153,7 +3258,78 @@ class MainWindow(QMainWindow):
         self.show()
 
 
+def command_line(arguments):
+    """
+    Section 17: Tools run from the command line rather than the GUI.
+        e.g. python Lego_LIGO_GUI.py benchmark "/home/pi/Documents/LEGO_LIGO/Test code"
+    """
+    parser = argparse.ArgumentParser(prog='Lego_LIGO_GUI.py')
+    modes = ['motor_stationary_points', 'time_spacing', 'pyramid'] #values of PARAMS['mode']
+    commands = parser.add_subparsers(dest='command')
+    benchmark = commands.add_parser('benchmark', help='time the stationary point search on each csv file')
+    benchmark.add_argument('folder', nargs='?', default=data_folder())
+    benchmark.add_argument('--repeats', type=int, default=5)
+    compiler = commands.add_parser('compile', help='precompile motor schedules for each csv file')
+    compiler.add_argument('folder', nargs='?', default=data_folder())
+    compiler.add_argument('--modes', nargs='+', default=modes, choices=modes)
+    player = commands.add_parser('play', help='play a csv file on the motors without the GUI')
+    player.add_argument('file', help='name of the csv file in the folder')
+    player.add_argument('folder', nargs='?', default=data_folder())
+    player.add_argument('--mode', default=PARAMS['mode'], choices=modes)
+    preprocess = commands.add_parser('preprocess', help='make the binary copies, pyramids and schedules '
+                                     'of every csv file in parallel')
+    preprocess.add_argument('folder', nargs='?', default=data_folder())
+    preprocess.add_argument('--modes', nargs='+', default=modes, choices=modes)
+    preprocess.add_argument('--workers', type=int, default=PARAMS['preprocess_workers'])
+    characteriser = commands.add_parser('characterise', help='measure the speed of each motor and store '
+                                        'its model in the motor profile')
+    characteriser.add_argument('--ports', nargs='+', type=int, default=[0, 1] + PARAMS['extra_ports'])
+    characteriser.add_argument('--powers', nargs='+', type=int, default=list(range(10, 256, 15)))
+    characteriser.add_argument('--degrees', type=float, default=45)
+    characteriser.add_argument('--profile', default=PARAMS['motor_profile'])
+    resampling = commands.add_parser('resample-error', help='compare the time_spacing resampling methods')
+    resampling.add_argument('folder', nargs='?', default=data_folder())
+    args = parser.parse_args(arguments)
+    if args.command == 'benchmark':
+        benchmark_stationary_points(args.folder, args.repeats)
+    if args.command == 'resample-error':
+        print('{:<35}{:>14}{:>14}{:>14}{:>14}'.format('File [degrees]', 'stride RMS', 'stride max',
+                                                    'sinc RMS', 'sinc max'))
+        for file in files_in_folder(args.folder):
+            errors = resample_error(args.folder, file)
+            print('{:<35}{:>14.3f}{:>14.3f}{:>14.3f}{:>14.3f}'.format(file, *(errors['stride'] + errors['sinc'])))
+    if args.command == 'compile':
+        compile_folder(args.folder, args.modes)
+    if args.command == 'preprocess':
+        if preprocess_folder(args.folder, args.modes, args.workers):
+            sys.exit(1)
+    if args.command == 'characterise':
+        if not POSITIONS.active():
+            print('The motor encoders are not being read, so the motors cannot be characterised.')
+            sys.exit(1)
+        fits, measurements = characterise(args.ports, args.powers, args.degrees)
+        MOTORS.save(args.profile, fits, measurements)
+        print('{:<8}{:>12}{:>12}{:>22}'.format('Port', 'gain', 'dead zone', 'RMS error [deg/s]'))
+        for port, (gain, dead_zone) in sorted(fits.items()):
+            rows = np.array(measurements[port])
+            error = MOTORS.speed(port, rows[:, 0]) - rows[:, 1]
+            print('{:<8}{:>12.3f}{:>12.1f}{:>22.1f}'.format(port, gain, dead_zone, np.sqrt(np.mean(error**2))))
+        print('Stored in {}'.format(args.profile))
+    if args.command == 'play':
+        schedule = load_schedule(args.folder, args.file, args.mode)
+        if schedule['warning']:
+            print('Warning: The motor cannot achieve the required speed.')
+        else:
+            TIMER.reset()
+            play_schedule(schedule)
+            print(TIMER.summary())
+
+
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    w = MainWindow()
-    sys.exit(app.exec_())
+    if len(sys.argv) > 1:
+        command_line(sys.argv[1:])
+    else:
+        prefetcher = Prefetcher() #before the QApplication, see section 14.f
+        app = QApplication(sys.argv)
+        w = MainWindow(prefetcher)
+        sys.exit(app.exec_())
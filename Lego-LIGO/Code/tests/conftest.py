@@ -0,0 +1,59 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+CODE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+#the modules under test are run from the Code folder rather than installed
+sys.path.insert(0, CODE)
+
+
+@pytest.fixture
+def gui(tmp_path, monkeypatch):
+    """Lego_LIGO_GUI.py, with nothing left in its waveform cache (section 5.a) by other tests and the
+    files it makes from csv files kept in tmp_path"""
+    import Lego_LIGO_GUI
+    Lego_LIGO_GUI.WAVEFORMS.clear()
+    monkeypatch.setitem(Lego_LIGO_GUI.PARAMS, 'cache_folder', str(tmp_path / 'cache'))
+    return Lego_LIGO_GUI
+
+
+@pytest.fixture
+def test_data():
+    """The folder of csv files that comes with the code"""
+    return os.path.join(os.path.dirname(CODE), 'Test code')
+
+
+@pytest.fixture
+def motors(gui, monkeypatch):
+    """A BrickPi without encoder readings, on ports 0 to 3, that records the powers of every update
+    in its 'sent'"""
+    brickpi = types.SimpleNamespace(MotorEnable=[0]*4, MotorSpeed=[0]*4, Encoder=[None]*4, sent=[])
+    monkeypatch.setattr(gui, 'BrickPi', brickpi, raising=False)
+    monkeypatch.setattr(gui, 'BrickPiUpdateValues', lambda: brickpi.sent.append(list(brickpi.MotorSpeed)),
+                        raising=False)
+    monkeypatch.setattr(gui, 'PORT_A', 0, raising=False)
+    monkeypatch.setattr(gui, 'PORT_B', 1, raising=False)
+    monkeypatch.setattr(gui, 'MXPos', 0)
+    monkeypatch.setattr(gui, 'MYPos', 0)
+    return brickpi
+
+
+@pytest.fixture(scope='session')
+def brickpi():
+    """BrickPi.py, loaded without a Raspberry Pi. Its ir_receiver_check is only on the Pi, so it is given
+    one that finds no IR receiver. Loaded under another name, and the stand-in taken away again, so
+    Lego_LIGO_GUI.py still finds no BrickPi and runs as it does off the Pi"""
+    pytest.importorskip('serial')
+    stand_in = types.ModuleType('ir_receiver_check')
+    stand_in.check_ir = lambda: False
+    spec = importlib.util.spec_from_file_location('brickpi_under_test', os.path.join(CODE, 'BrickPi.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['ir_receiver_check'] = stand_in
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        del sys.modules['ir_receiver_check']
+    return module
@@ -0,0 +1,230 @@
+"""Tests for the bit packing of BrickPi.py, without a BrickPi attached"""
+import random
+
+import pytest
+
+WIDTHS = [1, 2, 3, 5, 7, 8, 9, 10, 16, 23, 32]
+
+
+def fields(rng, count=40):
+    """Random (bits, value) fields, as a frame of BrickPiUpdateValues is made of"""
+    return [(bits, rng.getrandbits(bits)) for bits in (rng.choice(WIDTHS) for _ in range(count))]
+
+
+def written(brickpi, add, byte_offset, bit_offset, frame):
+    """The bytes of Array after adding every field of frame with add (AddBits or AddBitsPerBit)"""
+    brickpi.Array[:] = brickpi.EmptyArray
+    brickpi.Bit_Offset = 0
+    for bits, value in frame:
+        add(byte_offset, bit_offset, bits, value)
+    return bytes(brickpi.Array)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('bit_offset', [0, 3])
+def test_addbits_matches_per_bit(brickpi, seed, bit_offset):
+    frame = fields(random.Random(seed))
+    assert (written(brickpi, brickpi.AddBits, 1, bit_offset, frame)
+            == written(brickpi, brickpi.AddBitsPerBit, 1, bit_offset, frame))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('bit_offset', [0, 5])
+def test_getbits_matches_per_bit(brickpi, seed, bit_offset):
+    rng = random.Random(seed)
+    widths = [bits for bits, value in fields(rng)]
+    brickpi.Array[:] = bytes(rng.getrandbits(8) for _ in range(len(brickpi.Array)))
+    brickpi.Bit_Offset = 0
+    wanted = [brickpi.GetBitsPerBit(1, bit_offset, bits) for bits in widths]
+    brickpi.Bit_Offset = 0
+    assert [brickpi.GetBits(1, bit_offset, bits) for bits in widths] == wanted
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_packer_and_reader_match_addbits(brickpi, seed):
+    frame = fields(random.Random(seed))
+    packer = brickpi.BitPacker()
+    for bits, value in frame:
+        packer.add(bits, value)
+    packed = bytearray(256)
+    count = packer.write(packed, 1)
+    assert count == (sum(bits for bits, value in frame) + 7)//8
+    assert bytes(packed) == written(brickpi, brickpi.AddBits, 1, 0, frame)
+    reader = brickpi.BitReader(packed, 1, 1 + count)
+    assert [reader.get(bits) for bits, value in frame] == [value for bits, value in frame]
+
+
+class FakeSerial(object):
+    """Gives the bytes it is made with to BrickPiRx, in pieces of at most chunk bytes, and keeps what is
+    written to it"""
+    def __init__(self, data=b'', chunk=64):
+        self.data = bytearray(data)
+        self.chunk = chunk
+        self.timeout = None
+        self.sent = []
+
+    def isOpen(self):
+        return True
+
+    def inWaiting(self):
+        return min(len(self.data), self.chunk)
+
+    def read(self, size):
+        data = bytes(self.data[:size])
+        del self.data[:size]
+        return data
+
+    def readinto(self, buffer):
+        count = min(len(buffer), len(self.data), self.chunk)
+        buffer[:count] = self.data[:count]
+        del self.data[:count]
+        return count
+
+    def write(self, data):
+        self.sent.append(bytes(data))
+
+
+def frame(message):
+    """A reply as the BrickPi sends it: checksum, byte count, then the message"""
+    return bytes([(len(message) + sum(message)) % 256, len(message)]) + bytes(message)
+
+
+@pytest.fixture
+def serial_port(brickpi, monkeypatch):
+    """Connects a FakeSerial, with a new BrickPiReceiver and its error counts at 0"""
+    monkeypatch.setattr(brickpi, 'Receiver', brickpi.BrickPiReceiver())
+    monkeypatch.setattr(brickpi.BrickPi, 'RxErrors', {-2: 0, -4: 0, -5: 0, -6: 0})
+    monkeypatch.setattr(brickpi.BrickPi, 'RxStale', 0)
+    def connect(data=b'', chunk=64):
+        port = FakeSerial(data, chunk)
+        monkeypatch.setattr(brickpi, 'ser', port)
+        return port
+    return connect
+
+
+def test_tx_sends_one_frame(brickpi, serial_port):
+    port = serial_port()
+    brickpi.Array[:] = brickpi.EmptyArray
+    brickpi.Array[:4] = bytes([brickpi.MSG_TYPE_VALUES, 200, 100, 7])
+    brickpi.BrickPiTx(1, 4, brickpi.Array)
+    assert port.sent == [bytes([1, (1 + 4 + brickpi.MSG_TYPE_VALUES + 307) % 256, 4, brickpi.MSG_TYPE_VALUES, 200, 100, 7])]
+
+
+def test_rx_reads_frames_in_order(brickpi, serial_port):
+    first = [brickpi.MSG_TYPE_VALUES] + list(range(10))
+    second = [brickpi.MSG_TYPE_VALUES] + list(range(20, 35))
+    serial_port(frame(first) + frame(second), chunk=5)
+    for message in (first, second):
+        result, count, InArray = brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)
+        assert (result, count, bytes(InArray)) == (0, len(message), bytes(message))
+    assert brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)[0] == -2
+
+
+def test_rx_resyncs_after_garbage(brickpi, serial_port):
+    message = [brickpi.MSG_TYPE_VALUES] + list(range(40, 55))
+    serial_port(bytes([7, 2, 3, 1, 99]) + frame(message))
+    result, count, InArray = brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)
+    assert (result, bytes(InArray)) == (0, bytes(message))
+    assert brickpi.BrickPi.RxErrors[-5] == 1
+
+
+def test_rx_resyncs_past_a_header_too_long_to_come(brickpi, serial_port):
+    message = [brickpi.MSG_TYPE_VALUES] + list(range(40, 55))
+    serial_port(bytes([7, 200, 3]) + frame(message))
+    result, count, InArray = brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)
+    assert (result, bytes(InArray)) == (0, bytes(message))
+
+
+def test_rx_skips_stale_replies(brickpi, serial_port):
+    message = [brickpi.MSG_TYPE_VALUES, 1, 2, 3]
+    serial_port(frame([brickpi.MSG_TYPE_SENSOR_TYPE]) + frame(message))
+    result, count, InArray = brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)
+    assert (result, bytes(InArray)) == (0, bytes(message))
+    assert brickpi.BrickPi.RxStale == 1
+
+
+def test_rx_reports_a_cut_off_frame(brickpi, serial_port):
+    serial_port(frame([brickpi.MSG_TYPE_VALUES] + list(range(10)))[:6])
+    assert brickpi.BrickPiRx(0.01, brickpi.MSG_TYPE_VALUES)[0] == -6
+    assert brickpi.BrickPi.RxErrors[-6] == 1
+
+
+class LateSerial(FakeSerial):
+    """Answers each write with the next of replies, a pair of the bytes sent back straight away and the
+    bytes that only come once a read has timed out (a late reply)"""
+    def __init__(self, replies):
+        FakeSerial.__init__(self)
+        self.replies = list(replies)
+        self.late = b''
+
+    def write(self, data):
+        FakeSerial.write(self, data)
+        reply, self.late = self.replies.pop(0)
+        self.data += reply
+
+    def readinto(self, buffer):
+        count = FakeSerial.readinto(self, buffer)
+        if not count:
+            self.data += self.late
+            self.late = b''
+        return count
+
+
+def test_late_reply_not_taken_as_the_retrys(brickpi, serial_port, monkeypatch):
+    late = [brickpi.MSG_TYPE_VALUES, 1, 1, 1]
+    fresh = [brickpi.MSG_TYPE_VALUES, 2, 2, 2]
+    port = LateSerial([(b'', frame(late)), (frame(fresh), b'')])
+    monkeypatch.setattr(brickpi, 'ser', port)
+    for name in ('MotorEnable', 'EncoderOffset'):
+        monkeypatch.setattr(brickpi.BrickPi, name, [0]*4)
+    monkeypatch.setattr(brickpi, 'SensorsSetUp', set())
+    brickpi.BrickPi.MotorEnable[brickpi.PORT_A] = 1
+    monkeypatch.setattr(brickpi, 'CoreUsed', [True, False])
+    unpacked = []
+    monkeypatch.setattr(brickpi, 'BrickPiUnpackValues', lambda i, get: unpacked.append(bytes(brickpi.Array[:4])))
+    assert brickpi.BrickPiUpdateValues() == 0
+    assert len(port.sent) == 2 #the first reply timed out
+    assert unpacked == [bytes(fresh)]
+    assert port.data == bytearray() and brickpi.BrickPi.RxErrors[-2] == 1
+
+
+@pytest.fixture
+def idle(brickpi, monkeypatch):
+    """Nothing enabled, offset or set up on any port, and both cores used at the last update"""
+    for name in ('MotorEnable', 'EncoderOffset'):
+        monkeypatch.setattr(brickpi.BrickPi, name, [0]*4)
+    monkeypatch.setattr(brickpi.BrickPi, 'SensorType', [None]*4)
+    monkeypatch.setattr(brickpi, 'SensorsSetUp', set())
+    monkeypatch.setattr(brickpi, 'CoreUsed', [True, True])
+    monkeypatch.setattr(brickpi, 'SKIP_IDLE_CORES', True)
+    return brickpi.BrickPi
+
+
+def test_idle_cores_updated_once_more(brickpi, idle):
+    idle.MotorEnable[brickpi.PORT_B] = 1
+    assert brickpi.BrickPiCoresToUpdate() == [0, 1] #core 1 is told its motors are off
+    assert brickpi.BrickPiCoresToUpdate() == [0]
+    idle.MotorEnable[brickpi.PORT_B] = 0
+    idle.EncoderOffset[brickpi.PORT_D] = 90
+    assert brickpi.BrickPiCoresToUpdate() == [0, 1]
+    idle.EncoderOffset[brickpi.PORT_D] = 0
+    assert brickpi.BrickPiCoresToUpdate() == [1]
+    assert brickpi.BrickPiCoresToUpdate() == []
+
+
+def test_every_core_without_skipping(brickpi, idle, monkeypatch):
+    monkeypatch.setattr(brickpi, 'SKIP_IDLE_CORES', False)
+    brickpi.BrickPiCoresToUpdate()
+    assert brickpi.BrickPiCoresToUpdate() == [0, 1]
+
+
+def test_raw_sensor_keeps_its_core_updated(brickpi, idle, serial_port, monkeypatch):
+    """A raw sensor's type is 0, so the ports set up are kept apart from SensorType"""
+    port = LateSerial([(frame([brickpi.MSG_TYPE_SENSOR_TYPE]), b'')]*2)
+    monkeypatch.setattr(brickpi, 'ser', port)
+    idle.SensorType[brickpi.PORT_3] = brickpi.TYPE_SENSOR_RAW
+    assert brickpi.BrickPiSetupSensors() == 0
+    assert brickpi.SensorsSetUp == {brickpi.PORT_3}
+    assert [sent[4:6] for sent in port.sent] == [bytes([brickpi.TYPE_SENSOR_RAW])*2]*2 #no sensor is sent as raw
+    assert brickpi.BrickPiCoresToUpdate() == [0, 1]
+    assert brickpi.BrickPiCoresToUpdate() == [1]
@@ -0,0 +1,68 @@
+"""Tests for the cached folder listing and file details (section 4.a)"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def folder(tmp_path, test_data):
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    for name in ('Ring-down.csv', 'Merger.csv'):
+        shutil.copy(os.path.join(test_data, name), str(folder))
+    (folder / 'notes.txt').write_text(u'not a waveform')
+    (folder / 'old.csv.bak').write_text(u'not a waveform')
+    (folder / 'more.csv').mkdir()
+    return str(folder)
+
+
+def touch(path, seconds):
+    os.utime(path, (seconds, seconds))
+
+
+def test_lists_csv_files_only(gui, folder):
+    assert gui.FolderCatalog(folder).refresh() == ['Merger.csv', 'Ring-down.csv']
+
+
+def test_listed_again_only_when_the_folder_changes(gui, folder):
+    catalog = gui.FolderCatalog(folder)
+    touch(folder, 1000)
+    files = catalog.refresh()
+    shutil.copy(os.path.join(folder, 'Merger.csv'), os.path.join(folder, 'Added.csv'))
+    touch(folder, 1000) #as if the folder had not changed
+    assert catalog.refresh() is files
+    touch(folder, 2000)
+    assert catalog.refresh() == ['Added.csv', 'Merger.csv', 'Ring-down.csv']
+
+
+def test_details(gui, folder):
+    catalog = gui.FolderCatalog(folder)
+    details = catalog.details('Ring-down.csv')
+    data = np.loadtxt(os.path.join(folder, 'Ring-down.csv'), delimiter=',', skiprows=1)
+    assert details['samples'] == len(data)
+    assert details['duration'] == pytest.approx(data[-1, 0] - data[0, 0])
+    assert details['peak'] == pytest.approx(np.max(np.abs(data[:, 1])))
+    assert details['size'] == os.path.getsize(os.path.join(folder, 'Ring-down.csv'))
+    assert catalog.details('Ring-down.csv') is details
+
+
+def test_details_of_edited_file(gui, folder):
+    catalog = gui.FolderCatalog(folder)
+    path = os.path.join(folder, 'Ring-down.csv')
+    catalog.details('Ring-down.csv')
+    with open(path, 'w') as csv:
+        csv.write('Time,Strain\n0,1\n2,-3\n')
+    touch(path, 1000)
+    gui.WAVEFORMS.clear()
+    details = catalog.details('Ring-down.csv')
+    assert (details['samples'], details['duration'], details['peak']) == (2, 2, 3)
+
+
+def test_streamed_details_match(gui, folder, monkeypatch):
+    wanted = gui.FolderCatalog(folder).details('Merger.csv')
+    monkeypatch.setitem(gui.PARAMS, 'stream_above_bytes', 0)
+    streamed = gui.FolderCatalog(folder).details('Merger.csv')
+    for name in ('samples', 'duration', 'peak'):
+        assert streamed[name] == pytest.approx(wanted[name])
@@ -0,0 +1,43 @@
+"""Tests for the low-pass filter used before keeping every i-th point (sections 6.m to 6.o)"""
+import numpy as np
+import pytest
+
+
+def wave(frequency, count=2000, rate=1000.0):
+    times = np.arange(count)/rate
+    return np.c_[times, np.sin(2*np.pi*frequency*times)]
+
+
+@pytest.mark.parametrize('i', [1, 3, 8])
+def test_taps(gui, i):
+    taps = gui.lowpass_taps(1000.0, i)
+    assert len(taps) == 16*i + 1
+    assert np.sum(taps) == pytest.approx(1)
+    np.testing.assert_allclose(taps, taps[::-1])
+
+
+def test_keeps_every_ith_time(gui):
+    data = wave(5)
+    points = gui.decimate(data, 8, 1000.0)
+    np.testing.assert_array_equal(points[:, 0], data[::8, 0])
+
+
+def test_constant_is_unchanged(gui):
+    data = np.c_[np.arange(500)/1000.0, np.full(500, 3.0)]
+    np.testing.assert_allclose(gui.decimate(data, 8, 1000.0)[:, 1], 3.0)
+
+
+def test_passes_slow_and_removes_fast(gui):
+    #the new rate is 125 points a second, so 62.5 Hz is the fastest it can show
+    slow = gui.decimate(wave(5), 8, 1000.0)[20:-20]
+    np.testing.assert_allclose(slow[:, 1], np.sin(2*np.pi*5*slow[:, 0]), atol=0.01)
+    fast = gui.decimate(wave(110), 8, 1000.0)[20:-20]
+    assert np.max(np.abs(fast[:, 1])) < 0.01 #would alias to 15 Hz if kept
+
+
+@pytest.mark.parametrize('size', [7, 100, 2000])
+def test_streamed_matches(gui, size):
+    data = wave(20, count=1999)
+    chunks = [data[start:start + size] for start in range(0, len(data), size)]
+    streamed = np.concatenate(list(gui.stream_decimate(iter(chunks), 8, 1000.0)))
+    np.testing.assert_allclose(streamed, gui.decimate(data, 8, 1000.0), atol=1e-12)
@@ -0,0 +1,16 @@
+"""Tests for moving several mirror axes in one control loop (section 14.a.i)"""
+
+
+def test_each_port_stops_on_its_own_deadline(gui, motors):
+    rate = gui.PARAMS['motor_update_rate']
+    gui.drive_axes([(0, 50, 0.05, None), (1, -30, 0.1, None), (2, 80, 0, None)])
+    assert motors.MotorEnable[:2] == [1, 1]
+    assert motors.MotorEnable[2] == 0 #a move with no time is left out
+    moving = [sent[:2] for sent in motors.sent if sent[:2] != [0, 0]]
+    assert moving == [[50, -30]]*int(0.05*rate) + [[0, -30]]*int(0.05*rate)
+    assert motors.MotorSpeed == [0]*4
+
+
+def test_nothing_to_move(gui, motors):
+    gui.drive_axes([(0, 50, 0, None)])
+    assert motors.sent == []
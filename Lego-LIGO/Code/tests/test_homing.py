@@ -0,0 +1,29 @@
+"""Tests for finding the touch-sensor endstops of the mirrors (section 14.h.i)"""
+ENDSTOPS = {0: (2, 170), 1: (3, -170)} #motor port: (sensor port, mirror position at the sensor)
+
+
+def press_after(gui, motors, updates):
+    """Has each sensor of ENDSTOPS pressed once its motor has been sent its number of updates of power"""
+    motors.Sensor = [0]*5
+    def update():
+        motors.sent.append(list(motors.MotorSpeed))
+        for port, (sensor, position) in ENDSTOPS.items():
+            if sum(1 for sent in motors.sent if sent[port]) >= updates[port]:
+                motors.Sensor[sensor] = 1
+    gui.BrickPiUpdateValues = update
+
+
+def test_each_mirror_stops_at_its_endstop(gui, motors):
+    press_after(gui, motors, {0: 3, 1: 6})
+    assert gui.approach_endstops(ENDSTOPS, 60)
+    moving = [sent[:2] for sent in motors.sent if sent[:2] != [0, 0]]
+    #towards each endstop, so the position goes up for port 0 and down for port 1 (section 11)
+    assert moving == [[-60, 60]]*3 + [[0, 60]]*3
+    assert motors.MotorSpeed[:2] == [0, 0]
+
+
+def test_endstop_not_found(gui, motors, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'home_timeout', 0.05)
+    press_after(gui, motors, {0: 1, 1: 10**6})
+    assert not gui.approach_endstops(ENDSTOPS, 60)
+    assert motors.MotorSpeed[:2] == [0, 0]
@@ -0,0 +1,51 @@
+"""Tests for the shaped motor powers of preset movements (sections 12.m and 12.m.i)"""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('shape', ['trapezoid', 's-curve'])
+def test_same_degrees_in_same_time(gui, shape):
+    power = np.array([10.0, -40, 100])
+    duration = np.array([1.0, 0.5, 0.2])
+    peak, ramp, feasible = gui.motion_profile(power, duration, 5000, shape)
+    assert feasible.all()
+    np.testing.assert_allclose(peak*(duration - ramp), power*duration)
+    assert np.all(2*ramp <= duration)
+    assert np.all(np.abs(peak) >= np.abs(power))
+
+
+def test_infeasible_movements(gui):
+    peak, ramp, feasible = gui.motion_profile(np.array([100.0, 250, 300]), np.array([0.05, 10, 10]), 5000, 'trapezoid')
+    assert feasible.tolist() == [False, True, False]
+    assert np.all(np.abs(peak) <= 255)
+
+
+@pytest.mark.parametrize('shape', ['trapezoid', 's-curve'])
+def test_profile_distance(gui, shape):
+    duration, ramp = 1.0, 0.2
+    elapsed = np.linspace(-0.1, 1.1, 121)
+    gone = gui.profile_distance(elapsed, duration, ramp, shape)
+    assert gone[0] == 0
+    assert gone[-1] == pytest.approx(duration - ramp)
+    assert np.all(np.diff(gone) >= -1e-12)
+    #half way through the ramp, half way through the whole movement
+    assert gui.profile_distance(0.5, duration, ramp, shape) == pytest.approx((duration - ramp)/2)
+    assert gui.profile_distance(ramp, duration, ramp, shape) == pytest.approx(ramp/2)
+
+
+def test_ticks_ramp_from_rest(gui, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'motion_profile', 'trapezoid')
+    schedule = gui.dv_schedule(np.array([[0, 0, 0, 40, 1.0], [0, 0, 0, -20, 0.5]]))
+    rate = gui.PARAMS['motor_update_rate']
+    ticks = gui.tick_schedule(schedule, rate)
+    assert np.all(np.abs(ticks['power'][[0, -1]]) < np.abs(schedule['power'][0]))
+    assert len(ticks['power']) == int(np.ceil(np.sum(schedule['duration'])*rate))
+    np.testing.assert_allclose(ticks['end'], schedule['position'][-1], atol=0.1)
+
+
+def test_profiles_only_played_as_ticks(gui, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'motion_profile', 'trapezoid')
+    monkeypatch.setitem(gui.PARAMS, 'preset_player', 'segments')
+    assert not gui.profile_used()
+    monkeypatch.setitem(gui.PARAMS, 'preset_player', 'ticks')
+    assert gui.profile_used()
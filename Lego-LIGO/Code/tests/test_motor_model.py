@@ -0,0 +1,75 @@
+"""Tests for the per-port motor model and its fit to measured runs (sections 11.b and 14.g.i)"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def model(gui, tmp_path, monkeypatch):
+    """MOTORS with port 0 measured as gain 2.5, dead zone 20 and port 1 left as 'pwrcoef'"""
+    power = np.r_[np.arange(10, 260, 10), -np.arange(10, 260, 10)]
+    speed = np.sign(power)*2.5*np.maximum(np.abs(power) - 20, 0)
+    model = gui.MotorModel()
+    model.save(str(tmp_path / 'model.json'), {0: (2.5, 20.0)}, {0: np.c_[power, speed].tolist()})
+    monkeypatch.setattr(gui, 'MOTORS', model)
+    return model
+
+
+def test_fit_motor_both_directions(gui):
+    power = np.r_[np.arange(10, 260, 10), -np.arange(10, 260, 10)]
+    speed = np.sign(power)*np.maximum(2.5*(np.abs(power) - 30), 0)
+    gain, dead_zone = gui.fit_motor(np.c_[power, speed])
+    assert gain == pytest.approx(2.5)
+    assert dead_zone == pytest.approx(30)
+
+
+def test_fit_motor_needs_movement(gui):
+    with pytest.raises(ValueError):
+        gui.fit_motor(np.array([[50, 0.0], [100, 0.0], [150, 3.0]]))
+
+
+def test_profile_round_trip(gui, model, tmp_path):
+    loaded = gui.MotorModel()
+    loaded.load(str(tmp_path / 'model.json'))
+    assert loaded.fit(0) == (2.5, 20.0)
+    assert loaded.fit(1) == (gui.PARAMS['pwrcoef'], 0)
+    assert loaded.key() == model.key()
+
+
+def test_motor_table(gui):
+    rows = np.array([[50, 0.0], [-50, 0.0], [100, 90.0], [-100, -110.0], [150, 240.0], [-150, -240.0],
+                     [200, 230.0], [-200, -230.0], [250, 400.0], [-250, -400.0]])
+    power, speed = gui.motor_table(rows)
+    assert power.tolist() == [50, 100, 150, 250] #200 was measured slower than 150
+    assert speed.tolist() == [0, 100, 240, 400]
+    with pytest.raises(ValueError):
+        gui.motor_table(np.array([[50, 0.0], [100, 0.0], [150, 3.0]]))
+
+
+def test_speed_interpolates_the_measurements(gui, tmp_path, monkeypatch):
+    """A motor that is not linear is followed between its measured powers, not by the fitted line"""
+    power = np.array([50, 100, 150, 200, 250])
+    speed = 0.01*power**2
+    model = gui.MotorModel()
+    model.save(str(tmp_path / 'model.json'), {1: gui.fit_motor(np.c_[power, speed])}, {1: np.c_[power, speed].tolist()})
+    assert model.speed(1, np.array([-75.0, 0, 75, 100, 300])).tolist() == [-62.5, 0, 62.5, 100, 850]
+    np.testing.assert_allclose(model.power(1, np.array([-62.5, 0, 62.5, 850])), [-75, 0, 75, 300])
+    assert model.speed(1, 40.0) == 20 #down to 0 at no power, as nothing was measured still
+    assert model.proportional(1) is None
+    monkeypatch.setattr(gui, 'MOTORS', model)
+    assert set(np.abs(gui.carry_powers(np.full(50, 100.0), 1)).tolist()) == {100}
+
+
+def test_speed_and_power_invert(gui, model):
+    power = np.array([-200.0, -25, 0, 25, 200])
+    speed = model.speed(0, power)
+    assert speed.tolist() == [-450.0, -12.5, 0, 12.5, 450.0]
+    np.testing.assert_allclose(model.power(0, speed), power)
+    assert model.speed(0, np.array([-15.0, 15])).tolist() == [0, 0] #inside the dead zone
+
+
+def test_carry_powers_skip_dead_zone(gui, model):
+    """A speed too slow for any power outside the dead zone is made up with short bursts"""
+    speed = np.full(100, 5.0)
+    powers = gui.carry_powers(speed, 0)
+    assert set(powers.tolist()) <= {0, 22, 23}
+    assert abs(np.sum(model.speed(0, powers)) - np.sum(speed)) <= model.speed(0, 23)
@@ -0,0 +1,25 @@
+"""Tests for the motor worker thread (section 14.c)"""
+
+
+def test_commands_run_in_order(gui):
+    worker = gui.MotorWorker()
+    done, ran = [], []
+    worker.done.connect(done.append)
+    worker.send('first', ran.append, 1)
+    worker.send('fails', lambda: 1/0)
+    worker.send('second', ran.append, 2)
+    worker.send('stop', None)
+    worker.run() #on this thread, returning at the stop command
+    assert ran == [1, 2]
+    assert done == ['first', 'fails', 'second']
+
+
+def test_status_and_progress(gui):
+    worker = gui.MotorWorker()
+    status, progress = [], []
+    worker.status.connect(status.append)
+    worker.progress.connect(lambda played, total: progress.append((played, total)))
+    worker.label.setText('Moving')
+    worker.moved(1.0, 4.0)
+    assert status == ['Moving']
+    assert progress == [(1.0, 4.0)]
@@ -0,0 +1,109 @@
+"""Tests for pausing, seeking and aborting a playing preset (section 14.d)"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def control(gui, monkeypatch):
+    control = gui.PlaybackControl()
+    monkeypatch.setattr(gui, 'CONTROL', control)
+    return control
+
+
+def test_seek_is_taken_once(gui):
+    control = gui.PlaybackControl()
+    assert control.take_seek() is None
+    control.seek(3.5)
+    control.seek(4.0)
+    assert control.take_seek() == 4.0
+    assert control.take_seek() is None
+
+
+def test_abort_wakes_a_paused_player(gui):
+    control = gui.PlaybackControl()
+    control.pause()
+    assert not control.playing.is_set()
+    control.abort()
+    assert control.playing.is_set() and control.aborted.is_set()
+    control.seek(1)
+    control.clear()
+    assert control.playing.is_set() and not control.aborted.is_set()
+    assert control.take_seek() is None
+
+
+def ticks(rate, updates):
+    """Ticks (section 12.k) of updates at the same power, with the mirrors kept where they start"""
+    return {'power': np.tile([10, -10], (updates, 1)), 'position': np.zeros((updates, 2)), 'rate': rate,
+            'end': np.zeros(2)}
+
+
+def test_abort_within_an_update(gui, motors, control):
+    sent = motors.sent
+    def update():
+        sent.append(list(motors.MotorSpeed))
+        if len(sent) == 5:
+            control.abort()
+    gui.BrickPiUpdateValues = update
+    gui.play_ticks(ticks(100, 50))
+    moving = [powers for powers in sent if powers[:2] != [0, 0]]
+    assert len(moving) == 5
+    assert motors.MotorSpeed[:2] == [0, 0]
+
+
+def test_paused_motors_are_held(gui, motors, control):
+    played = []
+    def progress(seconds):
+        played.append(seconds)
+        if len(played) == 1:
+            control.pause()
+    def update():
+        motors.sent.append(list(motors.MotorSpeed))
+        if not control.playing.is_set() and motors.sent[-1][:2] == [0, 0] and len(motors.sent) > 20:
+            control.abort()
+    gui.BrickPiUpdateValues = update
+    gui.play_ticks(ticks(100, 50), progress)
+    moving = [powers for powers in motors.sent if powers[:2] != [0, 0]]
+    assert len(moving) == 10 #up to the first progress, a tenth of a second
+    assert played == [0.1]
+
+
+def test_abort_within_a_movement(gui, motors, control):
+    def update():
+        motors.sent.append(list(motors.MotorSpeed))
+        if len(motors.sent) == 5:
+            control.abort()
+    gui.BrickPiUpdateValues = update
+    played = gui.drive_axes([(0, 50, 1.8, None), (1, -30, 1.8, None)])
+    moving = [sent[:2] for sent in motors.sent if sent[:2] != [0, 0]]
+    assert moving == [[50, -30]]*5
+    assert played == pytest.approx(5/gui.PARAMS['motor_update_rate'])
+    assert motors.MotorSpeed[:2] == [0, 0]
+
+
+def test_paused_movement_carries_on(gui, motors, control):
+    rate = gui.PARAMS['motor_update_rate']
+    def update():
+        motors.sent.append(list(motors.MotorSpeed))
+        if len(motors.sent) == 3:
+            control.pause()
+        elif len(motors.sent) == 8:
+            control.resume()
+    gui.BrickPiUpdateValues = update
+    played = gui.drive_axes([(0, 50, 0.1, None)])
+    assert played == pytest.approx(0.1)
+    assert [sent[0] for sent in motors.sent[:8]] == [50]*3 + [0]*5 #held still while paused
+    assert len([sent for sent in motors.sent if sent[0] == 50]) == int(0.1*rate)
+
+
+def test_preset_position_when_seeked_away(gui, motors, control, monkeypatch):
+    monkeypatch.setattr(gui, 'RP', True)
+    def update():
+        motors.sent.append(list(motors.MotorSpeed))
+        if len(motors.sent) == 10:
+            control.seek(0)
+    gui.BrickPiUpdateValues = update
+    gui.motor(40, 1.0, -40, 1.0, 'preset', None)
+    played = 10/gui.PARAMS['motor_update_rate']
+    assert gui.MXPos == pytest.approx(-float(gui.MOTORS.speed(0, 40))*played)
+    assert gui.MYPos == pytest.approx(-float(gui.MOTORS.speed(1, -40))*played)
+    assert control.take_seek() == 0 #left for the player to take
@@ -0,0 +1,32 @@
+"""Tests for preparing and playing the files of a playlist (sections 12.n and 14.f)"""
+import os
+import types
+
+import pytest
+
+
+@pytest.fixture
+def prefetcher(gui):
+    prefetcher = gui.Prefetcher() #after the gui fixture, so its process keeps the files in tmp_path
+    yield prefetcher
+    prefetcher.stop()
+
+
+def test_prefetched_warning(gui, test_data, prefetcher):
+    mode = gui.PARAMS['mode']
+    prefetcher.send(test_data, 'Merger.csv')
+    prefetcher.send(test_data, 'Merger.csv') #already being prepared
+    assert len(prefetcher.files) == 1
+    assert prefetcher.warning(test_data, 'Merger.csv') == gui.load_schedule(test_data, 'Merger.csv', mode)['warning']
+    assert os.path.isfile(gui.schedule_path(test_data, 'Merger.csv', mode))
+    assert prefetcher.files == {}
+
+
+def test_skipped_file_is_signalled(gui, test_data, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'RPFOLDER', test_data)
+    window = types.SimpleNamespace(prefetcher=types.SimpleNamespace(warning=lambda folder, file: True),
+                                   motors=gui.MotorWorker())
+    skipped = []
+    window.motors.skipped.connect(skipped.append)
+    gui.play_next(window, 2)
+    assert skipped == [2]
@@ -0,0 +1,57 @@
+"""Tests for measuring the mirror positions with the motor encoders (section 11.a)"""
+import pytest
+
+
+@pytest.fixture
+def encoders(motors):
+    """A BrickPi whose encoders read 100 and 200 on ports 0 and 1"""
+    motors.Encoder[:2] = [100, 200]
+    return motors
+
+
+def test_open_loop_without_encoders(gui, monkeypatch):
+    monkeypatch.setattr(gui, 'MXPos', 12)
+    monkeypatch.setattr(gui, 'MYPos', -3)
+    positions = gui.PositionService()
+    if 'BrickPi' not in vars(gui):
+        assert not positions.active()
+    monkeypatch.setitem(gui.PARAMS, 'position_feedback', False)
+    assert positions.mirrors() == (12, -3)
+    assert positions.reached(0, 12, 12)
+
+
+def test_degrees_from_first_reading(gui, encoders):
+    positions = gui.PositionService()
+    assert positions.mirrors() == (0, 0)
+    encoders.Encoder[0] += 20 #10 degrees, the other way to the mirror position
+    encoders.Encoder[1] -= 4
+    assert positions.mirrors() == (-10, 2)
+    positions.zero()
+    assert positions.mirrors() == (0, 0)
+
+
+def test_power_corrects_error(gui, encoders):
+    positions = gui.PositionService()
+    positions.degrees(0, 0)
+    assert positions.power(0, 50, 0) == 50
+    encoders.Encoder[0] -= 10 #5 degrees, short of a target of 10
+    assert positions.power(0, 50, 10) == 50 - 2*5
+    assert not positions.reached(0, 10, 0)
+    assert positions.power(0, 0, 7) == -15 #at least 'position_min_power' while outside the tolerance
+    assert positions.power(0, 250, -20) == 255
+    assert positions.reached(0, 5.5, 0)
+
+
+def test_idle_port_read_before_its_zero(gui, encoders):
+    """A core with nothing enabled is not updated (BrickPi.py SKIP_IDLE_CORES), so its count may be old"""
+    def update():
+        encoders.sent.append(list(encoders.MotorSpeed))
+        encoders.Encoder[0] = 140 #the count the core has now
+    gui.BrickPiUpdateValues = update
+    positions = gui.PositionService()
+    assert positions.degrees(0, 0) == 0
+    assert encoders.MotorEnable[0] == 1
+    assert len(encoders.sent) == 1
+    assert positions.zeros[0] == 140
+    positions.degrees(0, 0)
+    assert len(encoders.sent) == 1 #only read again by the players
@@ -0,0 +1,47 @@
+"""Tests for preprocessing a folder of csv files (sections 12.i and 12.j)"""
+import os
+import shutil
+from collections import OrderedDict
+
+import pytest
+
+MODES = ['motor_stationary_points', 'time_spacing', 'pyramid']
+
+
+@pytest.fixture
+def folder(tmp_path, test_data):
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    for name in ('Ring-down.csv', 'Merger.csv', 'Complete Wave.csv'):
+        shutil.copy(os.path.join(test_data, name), str(folder))
+    return str(folder)
+
+
+def test_preprocess_file(gui, folder):
+    file, timings, warnings = gui.preprocess_file(folder, 'Merger.csv', MODES)
+    assert file == 'Merger.csv'
+    assert [step for step, seconds in timings] == ['read', 'levels'] + MODES
+    assert list(warnings) == MODES
+    for mode in MODES:
+        assert warnings[mode] == gui.load_schedule(folder, 'Merger.csv', mode)['warning']
+        assert os.path.isfile(gui.schedule_path(folder, 'Merger.csv', mode))
+    assert os.path.isfile(gui.sidecar_path(folder, 'Merger.csv'))
+    assert os.path.isfile(gui.pyramid_path(folder, 'Merger.csv'))
+
+
+def test_preprocess_folder(gui, folder, capsys):
+    assert gui.preprocess_folder(folder, MODES, 2) == []
+    output = capsys.readouterr().out
+    assert '3 files in' in output
+    for name in ('Ring-down.csv', 'Merger.csv', 'Complete Wave.csv'):
+        assert os.path.isfile(gui.schedule_path(folder, name, 'pyramid'))
+    lines = dict((line[:35].strip(), line) for line in output.splitlines())
+    for name in ('Ring-down.csv', 'Merger.csv', 'Complete Wave.csv'):
+        warnings = dict((mode, gui.load_schedule(folder, name, mode)['warning']) for mode in MODES)
+        assert lines[name].endswith(')' + gui.speed_warnings(warnings))
+
+
+def test_speed_warnings(gui):
+    assert gui.speed_warnings({'a': False}) == ''
+    warnings = OrderedDict([('a', True), ('b', False), ('c', True)])
+    assert gui.speed_warnings(warnings) == '  SPEED WARNING: a, c'
@@ -0,0 +1,60 @@
+"""Tests for the min/max waveform pyramid (section 6.q)"""
+import os
+
+import numpy as np
+import pytest
+
+
+def waveform(count, seed=0):
+    rng = np.random.RandomState(seed)
+    return np.c_[np.arange(count)/100.0, np.cumsum(rng.normal(size=count))]
+
+
+@pytest.mark.parametrize('count', [1000, 1024, 1])
+def test_buckets_hold_their_lowest_and_highest(gui, count):
+    data = waveform(count)
+    pyramid = gui.WaveformPyramid.build([data], 1)
+    for level in range(1, pyramid.first_level + len(pyramid.offsets) - 1):
+        size = 2**level
+        buckets = pyramid.levels[pyramid.offsets[level - 1]:pyramid.offsets[level]]
+        padded = np.concatenate((data[:, 1], np.repeat(data[-1, 1], (-count) % size))).reshape(-1, size)
+        np.testing.assert_array_equal(buckets[:, 1], padded.min(axis=1))
+        np.testing.assert_array_equal(buckets[:, 3], padded.max(axis=1))
+    assert pyramid.samples == count
+
+
+def test_chunks_give_the_same_pyramid(gui):
+    data = waveform(5000)
+    whole = gui.WaveformPyramid.build([data], 4)
+    chunked = gui.WaveformPyramid.build([data[start:start + 1024] for start in range(0, 5000, 1024)], 4)
+    np.testing.assert_array_equal(chunked.levels, whole.levels)
+    np.testing.assert_array_equal(chunked.offsets, whole.offsets)
+
+
+@pytest.mark.parametrize('budget', [10, 100, 1000])
+def test_points_keep_peaks_within_budget(gui, budget):
+    data = waveform(5000)
+    pyramid = gui.WaveformPyramid.build([data], 1)
+    points = pyramid.points(pyramid.level_for(budget))
+    assert len(points) <= budget
+    assert np.all(np.diff(points[:, 0]) > 0)
+    assert np.max(points[:, 1]) == np.max(data[:, 1]) and np.min(points[:, 1]) == np.min(data[:, 1])
+    np.testing.assert_array_equal(points[[0, -1]], data[[0, -1]])
+
+
+def test_stored_pyramid_is_used(gui, test_data):
+    pyramid = gui.load_pyramid(test_data, 'Inspiral.csv')
+    assert os.path.isfile(gui.pyramid_path(test_data, 'Inspiral.csv'))
+    gui.WAVEFORMS.clear()
+    stored = gui.load_pyramid(test_data, 'Inspiral.csv')
+    assert stored is not pyramid
+    np.testing.assert_array_equal(stored.levels, pyramid.levels)
+
+
+def test_pyramid_mode_follows_turns(gui, test_data):
+    budget = gui.PARAMS['pyramid_segments']
+    points = gui.pyramid_turns(test_data, 'Inspiral.csv', budget)
+    assert 0 < len(points) <= budget
+    assert len(gui.stationary_points(points[:, 1])) == len(points) - 2 #every point but the ends turns
+    dv_data, warning = gui.degree_velocity(test_data, 'Inspiral.csv', 'pyramid')
+    assert len(dv_data) == len(points) and not warning
@@ -0,0 +1,42 @@
+"""Tests for the precompiled motor schedules (section 12.a)"""
+import os
+
+import numpy as np
+
+
+def test_stored_schedule_is_used(gui, test_data):
+    schedule = gui.load_schedule(test_data, 'Merger.csv', 'motor_stationary_points')
+    assert os.path.isfile(gui.schedule_path(test_data, 'Merger.csv', 'motor_stationary_points'))
+    gui.WAVEFORMS.clear()
+    stored = gui.load_schedule(test_data, 'Merger.csv', 'motor_stationary_points')
+    for name in ('power', 'duration', 'position'):
+        np.testing.assert_array_equal(stored[name], schedule[name])
+    assert stored['warning'] == schedule['warning'] == gui.speed_warning(test_data, 'Merger.csv')
+
+
+def test_positions_follow_the_powers(gui, test_data):
+    schedule = gui.load_schedule(test_data, 'Ring-down.csv', 'motor_stationary_points')
+    moved = -np.cumsum(schedule['power']*schedule['duration'][:, None]*gui.PARAMS['pwrcoef'], axis=0)
+    np.testing.assert_allclose(schedule['position'], moved)
+    assert schedule['power'].dtype.kind == 'i'
+
+
+def test_changed_params_compile_again(gui, test_data, monkeypatch):
+    schedule = gui.load_schedule(test_data, 'Ring-down.csv', 'motor_stationary_points')
+    monkeypatch.setitem(gui.PARAMS, 'degree_max', gui.PARAMS['degree_max']/2)
+    gui.WAVEFORMS.clear()
+    smaller = gui.load_schedule(test_data, 'Ring-down.csv', 'motor_stationary_points')
+    np.testing.assert_allclose(smaller['position'][-1], schedule['position'][-1]/2, atol=2)
+
+
+def test_preset_warning_streams_long_files(gui, test_data, monkeypatch):
+    mode = gui.PARAMS['mode']
+    assert gui.preset_warning(test_data, 'Merger.csv') == gui.speed_warning(test_data, 'Merger.csv')
+    assert os.path.isfile(gui.schedule_path(test_data, 'Merger.csv', mode))
+    monkeypatch.setitem(gui.PARAMS, 'stream_above_bytes', 0) #every file is long
+    def compile_schedule(folder, file, mode):
+        raise AssertionError('a long file was compiled whole')
+    monkeypatch.setattr(gui, 'compile_schedule', compile_schedule)
+    for file in ('Ring-down.csv', 'Complete Wave.csv'):
+        assert gui.preset_warning(test_data, file) == gui.stream_warning(test_data, file)
+        assert not os.path.isfile(gui.schedule_path(test_data, file, mode))
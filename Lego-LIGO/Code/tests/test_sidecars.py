@@ -0,0 +1,60 @@
+"""Tests for the memory-mapped binary copies of the csv files (section 5.e)"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def folder(tmp_path, test_data):
+    """A folder with a copy of one of the test csv files, which the tests may edit"""
+    folder = tmp_path / 'data'
+    folder.mkdir()
+    shutil.copy(os.path.join(test_data, 'Ring-down.csv'), str(folder))
+    return str(folder)
+
+
+def test_sidecar_matches_csv(gui, folder):
+    data = gui.read_csvfile_in_folder(folder, 'Ring-down.csv')
+    np.testing.assert_array_equal(data, np.loadtxt(os.path.join(folder, 'Ring-down.csv'), delimiter=',', skiprows=1))
+    assert os.path.isfile(gui.sidecar_path(folder, 'Ring-down.csv'))
+    assert os.listdir(folder) == ['Ring-down.csv'] #nothing is added to the data folder
+    gui.WAVEFORMS.clear()
+    again = gui.read_csvfile_in_folder(folder, 'Ring-down.csv')
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(again, data)
+    assert gui.array_bytes(again) == 0
+
+
+def test_edited_csv_is_read_again(gui, folder):
+    path = os.path.join(folder, 'Ring-down.csv')
+    gui.read_csvfile_in_folder(folder, 'Ring-down.csv')
+    with open(path, 'w') as csv:
+        csv.write('Time,Strain\n0,1\n1,2\n2,3\n')
+    os.utime(path, (1, 1))
+    gui.WAVEFORMS.clear()
+    assert gui.read_csvfile_in_folder(folder, 'Ring-down.csv').tolist() == [[0, 1], [1, 2], [2, 3]]
+
+
+def test_lines_to_skip_has_its_own_sidecar(gui, folder, monkeypatch):
+    whole = gui.read_csvfile_in_folder(folder, 'Ring-down.csv')
+    monkeypatch.setitem(gui.PARAMS, 'LINES_TO_SKIP', 3)
+    gui.WAVEFORMS.clear()
+    np.testing.assert_array_equal(gui.read_csvfile_in_folder(folder, 'Ring-down.csv'), whole[2:])
+
+
+def test_unwritable_cache_folder_reads_csv(gui, folder, tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text(u'not a folder')
+    monkeypatch.setitem(gui.PARAMS, 'cache_folder', str(blocker / 'cache'))
+    data = gui.read_csvfile_in_folder(folder, 'Ring-down.csv')
+    assert not isinstance(data, np.memmap) and len(data) == 870
+
+
+def test_folders_with_the_same_name_do_not_share(gui, tmp_path):
+    first = gui.cache_path(str(tmp_path / 'a' / 'data'), 'x.csv', '.npy')
+    second = gui.cache_path(str(tmp_path / 'b' / 'data'), 'x.csv', '.npy')
+    assert first != second
+    assert os.path.basename(first) == 'x.csv.npy'
+    assert gui.cache_path(str(tmp_path), 'x.txt', '.npy') != gui.cache_path(str(tmp_path), 'x.csv', '.npy')
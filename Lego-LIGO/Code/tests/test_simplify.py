@@ -0,0 +1,52 @@
+"""Tests for joining nearly straight preset movements (section 12.h)"""
+import numpy as np
+import pytest
+
+
+def dv_data(gui, times, degrees):
+    """dv_data (section 6) moving from degrees[0] at times[0] through the rest"""
+    times = np.asarray(times, dtype=float)
+    degrees = np.asarray(degrees, dtype=float)
+    return gui.dv_columns(times[:-1], degrees[1:], degrees[:-1], np.diff(times))
+
+
+def test_zero_tolerance_changes_nothing(gui):
+    data = dv_data(gui, [0, 1, 2, 3], [0, 5, 4, 9])
+    simplified, error = gui.simplify_dv_data(data, 0)
+    assert simplified is data and error == 0
+
+
+def test_straight_line_is_one_movement(gui):
+    data = dv_data(gui, [0, 1, 2, 4], [0, 2, 4, 8])
+    simplified, error = gui.simplify_dv_data(data, 0.1)
+    np.testing.assert_allclose(simplified, dv_data(gui, [0, 4], [0, 8]))
+    assert error == pytest.approx(0)
+
+
+def test_corner_is_kept(gui):
+    data = dv_data(gui, [0, 1, 2, 3, 4], [0, 1, 2, 1, 0])
+    simplified, error = gui.simplify_dv_data(data, 0.5)
+    np.testing.assert_allclose(simplified, dv_data(gui, [0, 2, 4], [0, 2, 0]))
+
+
+@pytest.mark.parametrize('tolerance', [0.5, 1, 5])
+def test_error_is_bounded(gui, test_data, tolerance):
+    data = gui.degree_velocity(test_data, 'Merger.csv', 'time_spacing')[0]
+    simplified, error = gui.simplify_dv_data(data, tolerance)
+    assert len(simplified) < len(data)
+    assert error <= tolerance
+    #starts and ends in the same place at the same time
+    assert simplified[0, 0] == data[0, 0]
+    assert simplified[-1, 0] + simplified[-1, 4] == pytest.approx(data[-1, 0] + data[-1, 4])
+    assert simplified[-1, 2] == data[-1, 2]
+    #the positions it passes through are within tolerance of the original ones
+    ends = data[:, 0] + data[:, 4]
+    line = np.interp(ends, simplified[:, 0] + simplified[:, 4], simplified[:, 2])
+    assert np.max(np.abs(line - data[:, 2])) <= tolerance + 1e-9
+
+
+def test_schedule_records_simplifying(gui, test_data, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'simplify_tolerance', 1)
+    schedule = gui.compile_schedule(test_data, 'Merger.csv', 'time_spacing')
+    assert len(schedule['duration']) < schedule['segments']
+    assert 0 < schedule['max_error'] <= 1
@@ -0,0 +1,28 @@
+"""Tests for the vectorised peak and trough search (section 6.b)"""
+import numpy as np
+import pytest
+
+
+def test_plateaus(gui):
+    #a flat-topped peak gives the middle of the flat section, a 2 point trough its first point
+    strain = np.array([0, 1, 2, 2, 2, 1, 0, 0, 1], dtype=float)
+    assert gui.stationary_points(strain).tolist() == [3, 6]
+
+
+def test_single_points(gui):
+    assert gui.stationary_points(np.array([0, 1, 0, -1, 0], dtype=float)).tolist() == [1, 3]
+    assert gui.stationary_points(np.array([0, 1, 1, 2], dtype=float)).tolist() == []
+
+
+def test_hysteresis(gui):
+    #the dip to 9.9 is less than 5% of the largest strain, so is noise, and the higher peak is kept
+    strain = np.array([0, 10, 9.9, 10.2, 0, -10], dtype=float)
+    assert gui.stationary_points(strain).tolist() == [1, 2, 3]
+    assert gui.stationary_points(strain, 0.05).tolist() == [3]
+
+
+@pytest.mark.parametrize('file', ['Merger.csv', 'Ring-down.csv', 'LIGO, Livingston, GW150914.csv'])
+def test_matches_loop(gui, test_data, file):
+    old_data = np.array(gui.read_csvfile_in_folder(test_data, file))
+    np.testing.assert_array_equal(old_data[gui.stationary_points(old_data[:, 1])],
+                                  gui.stationary_points_loop(old_data))
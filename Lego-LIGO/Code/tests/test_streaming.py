@@ -0,0 +1,22 @@
+"""Tests that streaming a long file (section 6.h) gives what reading it all at once (section 6) does"""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('mode', ['motor_stationary_points', 'time_spacing'])
+@pytest.mark.parametrize('file', ['Merger.csv', 'Inspiral.csv'])
+@pytest.mark.parametrize('rows', [97, 4096])
+def test_stream_matches_in_memory(gui, test_data, file, mode, rows, monkeypatch):
+    monkeypatch.setitem(gui.PARAMS, 'stream_above_bytes', 0)
+    monkeypatch.setitem(gui.PARAMS, 'stream_chunk_rows', rows) #97 so turning points fall across chunks
+    assert gui.long_file(test_data, file)
+    streamed = np.concatenate(list(gui.stream_dv_data(test_data, file, mode)))
+    np.testing.assert_allclose(streamed, gui.degree_velocity(test_data, file, mode)[0], rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('file', ['Merger.csv', 'Complete Wave.csv'])
+def test_stream_warning_matches_in_memory(gui, test_data, file, monkeypatch):
+    wanted = gui.degree_velocity(test_data, file, 'warning_check')[1]
+    monkeypatch.setitem(gui.PARAMS, 'stream_above_bytes', 0)
+    monkeypatch.setitem(gui.PARAMS, 'stream_chunk_rows', 97)
+    assert gui.stream_warning(test_data, file) == wanted
@@ -0,0 +1,49 @@
+"""Tests for the motor powers of every update (sections 12.k and 12.k.i)"""
+import numpy as np
+import pytest
+
+
+def test_carry_powers_make_up_rounding(gui):
+    speed = np.full(100, 10.5*gui.PARAMS['pwrcoef']) #half way between two whole powers
+    powers = gui.carry_powers(speed, 0)
+    assert set(powers.tolist()) == {10, 11}
+    assert abs(np.sum(gui.MOTORS.speed(0, powers)) - np.sum(speed)) <= gui.PARAMS['pwrcoef']
+
+
+def test_carry_powers_at_once_as_looped(gui):
+    """Without a dead zone the powers come from the cumulative sum, the same as carrying each update's rounding"""
+    gain = gui.PARAMS['pwrcoef']
+    speed = np.random.RandomState(0).uniform(-200, 200, 5000)*gain
+    looped, owed = [], 0.0
+    for wanted in speed:
+        looped.append(int(np.floor((wanted + owed)/gain + 0.5)))
+        owed += wanted - looped[-1]*gain
+    np.testing.assert_array_equal(gui.carry_powers(speed, 0), looped)
+    assert gui.carry_powers(np.zeros(0), 0).shape == (0,)
+
+
+def test_carry_powers_limit(gui):
+    assert gui.carry_powers(np.array([-1000.0, 1000.0])*gui.PARAMS['pwrcoef'], 1).tolist() == [-255, 255]
+
+
+@pytest.mark.parametrize('file', ['Merger.csv', 'Ring-down.csv'])
+def test_tick_schedule_ends_where_schedule_does(gui, test_data, file):
+    schedule = gui.load_schedule(test_data, file, 'motor_stationary_points')
+    rate = gui.PARAMS['motor_update_rate']
+    ticks = gui.tick_schedule(schedule, rate)
+    power = ticks['power']
+    assert np.all(np.abs(power) <= 255)
+    assert len(power) == len(ticks['position']) == int(np.ceil(
+        np.sum(schedule['duration'] + gui.PARAMS['stop_buffer'])*rate))
+    #the positions are those the powers sent move the mirrors to
+    moved = -np.cumsum(gui.MOTORS.columns(gui.MOTORS.speed, power), axis=0)/rate
+    np.testing.assert_allclose(ticks['position'][1:], moved[:-1], atol=1e-9)
+    np.testing.assert_allclose(ticks['end'], moved[-1], atol=1e-9)
+    np.testing.assert_allclose(ticks['end'], schedule['position'][-1], atol=0.1)
+
+
+def test_tick_schedule_empty(gui):
+    schedule = {'power': np.zeros((0, 2), dtype=int), 'duration': np.zeros(0), 'position': np.zeros((0, 2))}
+    ticks = gui.tick_schedule(schedule, 100)
+    assert ticks['power'].shape == (0, 2)
+    assert ticks['end'].tolist() == [0, 0]
@@ -0,0 +1,44 @@
+"""Tests for the motor movement timer (section 14.b)"""
+import time
+import types
+
+
+def test_run_updates_at_rate(gui):
+    timer = gui.SegmentTimer(100, 0.002)
+    calls = []
+    start = time.perf_counter()
+    timer.run(0.1, lambda: calls.append(time.perf_counter()))
+    assert time.perf_counter() - start >= 0.1
+    assert len(calls) == 10
+    assert timer.late < 0.01
+
+
+def test_movements_follow_on(gui):
+    """A movement called straight after the last starts at its deadline"""
+    timer = gui.SegmentTimer(100, 0.002)
+    timer.run(0.05, lambda: None)
+    end = timer.end
+    timer.run(0.05, lambda: None)
+    assert timer.end == end + 0.05
+
+
+def test_summary(gui):
+    timer = gui.SegmentTimer(100, 0.002)
+    timer.run(0.05, lambda: None)
+    assert timer.wall >= 0.05
+    assert timer.summary().startswith('Played for ')
+    timer.reset()
+    assert timer.wall == timer.cpu == timer.late == 0
+
+
+def test_preset_timing_is_signalled(gui, test_data, monkeypatch):
+    """The GUI shows how the timing went once a preset ends, rather than it going to stdout"""
+    monkeypatch.setitem(gui.PARAMS, 'RPFOLDER', test_data)
+    monkeypatch.setattr(gui, 'play_schedule', lambda schedule, UI='GraphUI', progress=None, offset=0: None)
+    window = types.SimpleNamespace(motors=gui.MotorWorker())
+    timing, playing = [], []
+    window.motors.timing.connect(timing.append)
+    window.motors.nowplaying.connect(playing.append)
+    gui.movemotor(window, gui.files_in_folder(test_data).index('Merger.csv'))
+    assert timing == [gui.TIMER.summary()]
+    assert playing == [gui.files_in_folder(test_data).index('Merger.csv')]
@@ -0,0 +1,53 @@
+"""Tests for the least recently used waveform cache (section 5.a)"""
+import numpy as np
+
+
+def block(size):
+    return np.zeros(size, dtype=np.uint8)
+
+
+def test_least_recently_used_is_dropped(gui):
+    cache = gui.WaveformCache(250)
+    cache.put('a', block(100))
+    cache.put('b', block(100))
+    assert cache.get('a') is not None #so 'b' is now the least recently used
+    cache.put('c', block(100))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.used == 200
+
+
+def test_too_large_is_not_stored(gui):
+    cache = gui.WaveformCache(250)
+    cache.put('a', block(100))
+    cache.put('b', block(300))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+
+
+def test_storing_again_replaces(gui):
+    cache = gui.WaveformCache(250)
+    cache.put('a', block(100))
+    cache.put('a', block(200))
+    assert cache.get('a').nbytes == 200
+    assert cache.used == 200
+    cache.clear()
+    assert cache.get('a') is None and cache.used == 0
+
+
+def test_budget_is_read_when_storing(gui, monkeypatch):
+    cache = gui.WaveformCache()
+    monkeypatch.setitem(gui.PARAMS, 'cache_budget', 150)
+    cache.put('a', block(100))
+    cache.put('b', block(100))
+    assert cache.get('a') is None and cache.used == 100
+
+
+def test_tuples_are_counted(gui):
+    assert gui.array_bytes((block(100), (block(20), True))) == 120
+
+
+def test_degree_velocity_is_cached(gui, test_data):
+    first = gui.degree_velocity(test_data, 'Merger.csv', 'time_spacing')
+    assert gui.degree_velocity(test_data, 'Merger.csv', 'time_spacing') is first
+    assert not first[0].flags.writeable #shared, so must not be altered